@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Sprite Ripper Benchmark — Times each rip_sprites.py stage on synthetic sprites.
+
+Generates deterministic sprites (an anti-aliased character on a solid, gradient
+or noisy background) at several sizes and times every pipeline stage separately
+on both the numpy path and the pure-Pillow fallback. Results can be saved as a
+baseline JSON; later runs compare against it and exit non-zero when a stage got
+slower than the threshold allows.
+
+Usage:
+    python bench_rip_sprites.py                      # Run and compare with bench_baseline.json (if any)
+    python bench_rip_sprites.py --save-baseline      # Run and store the results as the new baseline
+    python bench_rip_sprites.py --sizes 256,1024     # Only these sprite sizes (numpy path)
+    python bench_rip_sprites.py --pillow-sizes 256   # Sizes for the Pillow fallback (no numpy)
+    python bench_rip_sprites.py --threshold 0.5      # Allow stages to get 50% slower before failing
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+from pathlib import Path
+from typing import Optional
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import rip_sprites as rs  # noqa: E402 — sibling script, not a package
+from PIL import Image, ImageChops, ImageDraw, ImageFilter  # noqa: E402
+
+DEFAULT_BASELINE = SCRIPT_DIR / "bench_baseline.json"
+DEFAULT_SIZES = (256, 1024, 2048, 4096)
+# The Pillow fallback works in Pillow's C code too (band point() tables,
+# ImageMath, mask runs), so it is timed at the same sizes as the numpy path
+DEFAULT_PILLOW_SIZES = (256, 1024, 2048, 4096)
+BACKGROUNDS = ("solid", "gradient", "noisy")
+# Pipeline order, as in rip_sprite()
+STAGES = (
+    "decode",
+    "detect_background_color",
+    "flood_fill_remove",
+    "clean_semitransparent_fringe",
+    "crop_to_content",
+    "downscale_nearest",
+    "save",
+)
+# Regressions smaller than this are timer noise, whatever the ratio
+MIN_REGRESSION_MS = 2.0
+BG_COLOR = (248, 246, 240)
+TARGET_SIZE = rs.TARGET_SIZES["characters"]
+
+
+def make_sprite(size: int, background: str, seed: int = 0) -> Image.Image:
+    """Deterministic size x size RGB test sprite on the given background kind.
+
+    The character is a few blocky shapes with a dark outline, composited
+    through a supersampled mask so its edge has the anti-aliased fringe
+    that AI generators produce.
+    """
+    rng = random.Random(f"{seed}:{size}:{background}")
+    if background == "solid":
+        img = Image.new("RGB", (size, size), BG_COLOR)
+    elif background == "gradient":
+        ramp = Image.linear_gradient("L").resize((size, size))
+        img = Image.merge("RGB", [ramp.point(lambda v, c=c: c - v * 24 // 255) for c in BG_COLOR])
+    elif background == "noisy":
+        # Uniform +/-6 noise per channel, like JPEG-ish generator output
+        img = Image.new("RGB", (size, size), BG_COLOR)
+        noise = Image.merge("RGB", [
+            Image.frombytes("L", (size, size), rng.randbytes(size * size)).point(lambda v: 122 + v * 13 // 256)
+            for _ in range(3)
+        ])
+        img = ImageChops.add(img, noise, offset=-128)
+    else:
+        raise ValueError(f"unknown background: {background}")
+
+    # Character layer and its coverage mask, drawn at 4x then reduced
+    ss = 4
+    big = size * ss
+    mask = Image.new("L", (big, big), 0)
+    draw = ImageDraw.Draw(mask)
+    cx, cy = big // 2, big // 2
+    body = big * 3 // 10
+    draw.ellipse((cx - body, cy - body // 2, cx + body, cy + body * 5 // 4), fill=255)
+    head = big // 6
+    draw.ellipse((cx - head, cy - body // 2 - head * 3 // 2, cx + head, cy - body // 2 + head // 2), fill=255)
+    for _ in range(6):
+        x0 = rng.randrange(cx - body, cx + body)
+        y0 = rng.randrange(cy - body // 2, cy + body)
+        draw.rectangle((x0, y0, x0 + big // 12, y0 + big // 10), fill=255)
+    mask = mask.resize((size, size), Image.BOX)
+
+    colors = Image.new("RGB", (size, size), (70, 40, 30))
+    cells = max(1, size // 32)
+    palette = [(200, 120, 60), (240, 200, 150), (90, 60, 140), (40, 160, 90)]
+    fill = ImageDraw.Draw(colors)
+    for y in range(0, size, cells * 4):
+        for x in range(0, size, cells * 4):
+            fill.rectangle((x, y, x + cells * 4 - 1, y + cells * 4 - 1), fill=rng.choice(palette))
+    # Dark outline: everything near the edge of the shape
+    inner = mask.filter(ImageFilter.MinFilter(max(3, size // 128 * 2 + 1)))
+    colors.paste((30, 20, 25), (0, 0), ImageChops.subtract(mask, inner))
+    img.paste(colors, (0, 0), mask)
+    return img
+
+
+@contextlib.contextmanager
+def _numpy_path(enabled: bool):
+    """Temporarily force rip_sprites onto (or off) its numpy code path."""
+    saved = rs.HAS_NUMPY
+    rs.HAS_NUMPY = enabled and saved
+    try:
+        yield
+    finally:
+        rs.HAS_NUMPY = saved
+
+
+def direct_decode_works() -> bool:
+    """Whether rs._decode_direct() still decodes RGBA and RGB PNGs into the
+    caller's array (it relies on a Pillow implementation detail)."""
+    for mode in rs.DIRECT_DECODE_LAYOUTS:
+        source = Image.new(mode, (5, 3), (10, 20, 30, 40)[:len(mode)])
+        buffer = io.BytesIO()
+        source.save(buffer, "PNG")
+        arr = rs.np.zeros((3, 5, 4), dtype=rs.np.uint8)
+        with Image.open(buffer) as src:
+            if not rs._decode_direct(src, arr):
+                return False
+        if not rs.np.array_equal(arr, rs.np.asarray(source.convert("RGBA"))):
+            return False
+    return True
+
+
+def time_pipeline(png_bytes: bytes, tolerance: int = rs.DEFAULT_TOLERANCE) -> dict[str, float]:
+    """Run one rip of png_bytes stage by stage; seconds per stage."""
+    timings: dict[str, float] = {}
+    save_args = argparse.Namespace(encode_profile=None)
+
+    def timed(stage, fn, *fn_args, **fn_kwargs):
+        start = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    sprite = timed("decode", rs._decode_rgba, io.BytesIO(png_bytes))
+    bg_color, _confidence = timed("detect_background_color", rs.detect_background_color, sprite)
+    timed("flood_fill_remove", rs.flood_fill_remove, sprite, bg_color, tolerance)
+    timed("clean_semitransparent_fringe", rs.clean_semitransparent_fringe, sprite, bg_color)
+    sprite = timed("crop_to_content", rs.crop_to_content, sprite)
+    # Rebuilding the PIL image is part of getting to the resize, as in rip_sprite()
+    img = timed("downscale_nearest", lambda s: rs.downscale_nearest(rs._to_image(s), TARGET_SIZE), sprite)
+    timed("save", rs._save_image, img, io.BytesIO(), save_args)
+    return timings
+
+
+def run_case(png_bytes: bytes, repeats: int) -> dict[str, float]:
+    """Median milliseconds per stage over repeats runs."""
+    runs = [time_pipeline(png_bytes) for _ in range(repeats)]
+    return {stage: round(statistics.median(run[stage] for run in runs) * 1000, 3) for stage in STAGES}
+
+
+def run_benchmarks(
+    sizes: list[int], pillow_sizes: list[int], backgrounds: list[str], repeats: int
+) -> dict[str, dict[str, float]]:
+    """Time every (path, background, size) case; keys are "path/background/size"."""
+    cases = [("numpy", size) for size in sizes] if rs.HAS_NUMPY else []
+    if not rs.HAS_NUMPY and sizes:
+        print("  numpy not installed — numpy path skipped")
+    cases += [("pillow", size) for size in pillow_sizes]
+
+    results: dict[str, dict[str, float]] = {}
+    for path, size in cases:
+        for background in backgrounds:
+            buffer = io.BytesIO()
+            make_sprite(size, background).save(buffer, "PNG")
+            key = f"{path}/{background}/{size}"
+            with _numpy_path(path == "numpy"):
+                stages = run_case(buffer.getvalue(), repeats)
+            results[key] = stages
+            print(f"  {key:<22} " + " ".join(f"{stages[s]:>9.1f}" for s in STAGES)
+                  + f" {sum(stages.values()):>10.1f}")
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float
+) -> list[str]:
+    """Descriptions of every stage slower than baseline * (1 + threshold)."""
+    regressions = []
+    for key, stages in results.items():
+        for stage, ms in stages.items():
+            base_ms = baseline.get(key, {}).get(stage)
+            if base_ms is None:
+                continue
+            if ms > base_ms * (1 + threshold) and ms - base_ms > MIN_REGRESSION_MS:
+                regressions.append(f"{key} {stage}: {base_ms:.1f} ms → {ms:.1f} ms ({ms / base_ms - 1:+.0%})")
+    return regressions
+
+
+def _int_list(value: str) -> list[int]:
+    """argparse type for comma-separated sizes (empty string = none)."""
+    try:
+        return [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got {value!r}")
+
+
+def _environment() -> dict:
+    """Versions that matter when comparing against a baseline."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pillow": Image.__version__,
+        "numpy": rs.np.__version__ if rs.HAS_NUMPY else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the rip_sprites.py pipeline stage by stage",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python art/bench_rip_sprites.py                        Compare against art/bench_baseline.json
+  python art/bench_rip_sprites.py --save-baseline        Record a new baseline on this machine
+  python art/bench_rip_sprites.py --sizes 1024 --pillow-sizes ""
+                                                         Quick numpy-only check at 1024px
+  python art/bench_rip_sprites.py --backgrounds noisy --repeats 5
+        """,
+    )
+    parser.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES), metavar="N,N",
+                        help=f"Sprite sizes for the numpy path (default: {','.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument("--pillow-sizes", type=_int_list, default=list(DEFAULT_PILLOW_SIZES), metavar="N,N",
+                        help="Sprite sizes for the pure-Pillow fallback "
+                             f"(default: {','.join(map(str, DEFAULT_PILLOW_SIZES))})")
+    parser.add_argument("--backgrounds", type=lambda v: [b for b in v.split(",") if b],
+                        default=list(BACKGROUNDS), metavar="KIND,KIND",
+                        help=f"Background kinds: {', '.join(BACKGROUNDS)} (default: all)")
+    parser.add_argument("--repeats", type=int, default=3, metavar="N",
+                        help="Runs per case; the median is kept (default: 3)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, metavar="PATH",
+                        help=f"Baseline JSON to compare with or save to (default: {DEFAULT_BASELINE.name})")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Write this run's results to --baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, metavar="FRACTION",
+                        help="Fail when a stage is this much slower than baseline (default: 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    unknown = [b for b in args.backgrounds if b not in BACKGROUNDS]
+    if unknown:
+        print(f"ERROR: Unknown background kind(s): {', '.join(unknown)} (use {', '.join(BACKGROUNDS)})")
+        sys.exit(1)
+    if args.repeats < 1:
+        print(f"ERROR: --repeats must be at least 1 (got {args.repeats})")
+        sys.exit(1)
+
+    print("\n" + "=" * 70)
+    print("MOMI'S ADVENTURE — SPRITE RIPPER BENCHMARK")
+    print("=" * 70)
+    print(f"\nSizes: {args.sizes or 'none'} (numpy), {args.pillow_sizes or 'none'} (pillow)")
+    print(f"Backgrounds: {', '.join(args.backgrounds)}")
+    print(f"Repeats: {args.repeats} (median)")
+    if rs.HAS_NUMPY and not direct_decode_works():
+        print(f"WARNING: PNGs no longer decode straight into the array on Pillow "
+              f"{Image.__version__}; decode times include a copy")
+    baseline: Optional[dict] = None
+    if args.save_baseline:
+        print(f"Baseline: save to {args.baseline}")
+    elif args.baseline.is_file():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        print(f"Baseline: {args.baseline} (fail above +{args.threshold:.0%})")
+    else:
+        print("Baseline: none (run with --save-baseline to record one)")
+    print("=" * 70)
+
+    short = {"decode": "decode", "detect_background_color": "detect", "flood_fill_remove": "flood",
+             "clean_semitransparent_fringe": "fringe", "crop_to_content": "crop",
+             "downscale_nearest": "downscale", "save": "save"}
+    print(f"  {'case (ms)':<22} " + " ".join(f"{short[s]:>9}" for s in STAGES) + f" {'total':>10}")
+    results = run_benchmarks(args.sizes, args.pillow_sizes, args.backgrounds, args.repeats)
+
+    if args.save_baseline:
+        data = {"environment": _environment(), "repeats": args.repeats, "results": results}
+        args.baseline.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+        print(f"\n  Baseline saved: {args.baseline}")
+        return
+
+    if baseline is None:
+        return
+    if baseline.get("environment") != _environment():
+        print("\n  NOTE: baseline was recorded with a different environment:")
+        print(f"    {baseline.get('environment')}")
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"\n  REGRESSIONS ({len(regressions)}):")
+        for line in regressions:
+            print(f"    {line}")
+        sys.exit(1)
+    print("\n  No stage regressed past the threshold.")
+
+
+if __name__ == "__main__":
+    main()
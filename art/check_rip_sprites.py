@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Sprite Ripper Equivalence Check — Randomized same-output checks for rip_sprites.py.
+
+Several rip_sprites.py engines promise exactly the output of a simpler one:
+the vector flood fill and the per-pixel BFS, the frontier fringe passes and
+a whole-image rescan per pass, the Pillow fallback and the numpy path, the
+one-map tolerance sweep and one flood fill per tolerance, --stack and the
+per-image rip, --tile-threads and the untiled rip. This script rips small
+random sprites (odd sizes, bands of a few rows, mazes that cross band
+borders) both ways and exits non-zero on the first case that differs.
+
+Usage:
+    python check_rip_sprites.py                      # Every check, 200 random cases each
+    python check_rip_sprites.py --cases 1000         # More cases per check
+    python check_rip_sprites.py --checks flood,stack # Only these checks
+    python check_rip_sprites.py --seed 7             # Another random sequence (printed on failure)
+"""
+
+import sys
+import argparse
+import contextlib
+from pathlib import Path
+from typing import Callable, Optional
+
+SCRIPT_DIR = Path(__file__).parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import rip_sprites as rs  # noqa: E402 — sibling script, not a package
+from PIL import Image  # noqa: E402
+
+np = rs.np if rs.HAS_NUMPY else None
+
+DEFAULT_CASES = 200
+DEFAULT_SEED = 1
+
+
+def make_sprite(rng: "np.random.Generator", h: int, w: int, bg: Optional[tuple] = None) -> "np.ndarray":
+    """Random (h, w, 4) RGBA sprite: a noisy background, solid blocks, and
+    sometimes thin walls or holes that make the flood fill wind across rows."""
+    if bg is None:
+        bg = tuple(int(c) for c in rng.integers(0, 256, 3))
+    arr = np.empty((h, w, 4), dtype=np.uint8)
+    arr[..., :3] = np.clip(np.array(bg) + rng.integers(-30, 31, (h, w, 3)), 0, 255)
+    arr[..., 3] = 255
+    for _ in range(int(rng.integers(0, 12))):
+        y0, x0 = int(rng.integers(0, h)), int(rng.integers(0, w))
+        arr[y0:y0 + int(rng.integers(1, h + 1)), x0:x0 + int(rng.integers(1, w + 1)), :3] = rng.integers(0, 256, 3)
+    if rng.random() < 0.5:
+        # Vertical walls from random heights down: a maze across band borders
+        for x in range(int(rng.integers(0, 3)), w, 3):
+            arr[int(rng.integers(0, h)):, x, :3] = [255 - c for c in bg]
+    if rng.random() < 0.3:
+        arr[rng.random((h, w)) < 0.4, 3] = 0
+    if rng.random() < 0.2:
+        arr[rng.random((h, w)) < 0.05, 3] = rng.integers(1, 255)
+    return arr
+
+
+def _case(rng: "np.random.Generator") -> dict:
+    """Random size, band height, tolerance and fringe passes for one case."""
+    return {
+        "h": int(rng.integers(1, 90)),
+        "w": int(rng.integers(1, 60)),
+        "band_rows": int(rng.integers(1, 30)),
+        "tolerance": int(rng.integers(0, 120)),
+        "passes": int(rng.integers(0, 4)),
+    }
+
+
+@contextlib.contextmanager
+def _pillow_path():
+    """Temporarily force rip_sprites onto its Pillow fallback."""
+    saved = rs.HAS_NUMPY
+    rs.HAS_NUMPY = False
+    try:
+        yield
+    finally:
+        rs.HAS_NUMPY = saved
+
+
+def _fringe_rescan(arr: "np.ndarray", bg_color: tuple, fringe_tolerance: int, passes: int) -> int:
+    """Reference fringe cleaning: every pass rescans the whole image for
+    non-transparent pixels with a transparent 4-neighbour."""
+    total = 0
+    for _pass in range(passes):
+        transparent = arr[..., 3] == 0
+        neighbor = np.zeros_like(transparent)
+        neighbor[1:] |= transparent[:-1]
+        neighbor[:-1] |= transparent[1:]
+        neighbor[:, 1:] |= transparent[:, :-1]
+        neighbor[:, :-1] |= transparent[:, 1:]
+        clear = neighbor & ~transparent & rs._background_close(arr, bg_color, fringe_tolerance)
+        arr[clear] = 0
+        total += int(clear.sum())
+    return total
+
+
+def check_flood(rng: "np.random.Generator") -> Optional[str]:
+    """Vector flood fill (any band height) == per-pixel BFS."""
+    case = _case(rng)
+    arr = make_sprite(rng, case["h"], case["w"])
+    bg_color = rs.detect_background_color(arr)[0]
+    bfs, vector = arr.copy(), arr.copy()
+    bfs_count = rs.flood_fill_remove(bfs, bg_color, case["tolerance"], engine="bfs")
+    vector_count = rs.flood_fill_remove(vector, bg_color, case["tolerance"], band_rows=case["band_rows"])
+    if bfs_count != vector_count or not np.array_equal(bfs, vector):
+        return f"{case}: bfs removed {bfs_count}, vector {vector_count}"
+    return None
+
+
+def check_fringe(rng: "np.random.Generator") -> Optional[str]:
+    """Banded first pass + frontier passes == a whole-image rescan per pass."""
+    case = _case(rng)
+    arr = make_sprite(rng, case["h"], case["w"])
+    bg_color = rs.detect_background_color(arr)[0]
+    rs.flood_fill_remove(arr, bg_color, case["tolerance"])
+    rescan, frontier = arr.copy(), arr.copy()
+    rescan_count = _fringe_rescan(rescan, bg_color, 80, case["passes"])
+    frontier_count = rs.clean_semitransparent_fringe(
+        frontier, bg_color, passes=case["passes"], band_rows=case["band_rows"],
+    )
+    if rescan_count != frontier_count or not np.array_equal(rescan, frontier):
+        return f"{case}: rescan cleaned {rescan_count}, frontier {frontier_count}"
+    return None
+
+
+def check_pillow(rng: "np.random.Generator") -> Optional[str]:
+    """Pillow fallback background, flood fill, fringe and bbox == the numpy path."""
+    case = _case(rng)
+    arr = make_sprite(rng, case["h"], case["w"])
+    img = Image.fromarray(arr.copy(), "RGBA")  # fromarray may share the array's buffer
+    bg_color = rs.detect_background_color(arr)[0]
+    flood = rs.flood_fill_remove(arr, bg_color, case["tolerance"])
+    fringe = rs.clean_semitransparent_fringe(arr, bg_color, passes=case["passes"])
+    with _pillow_path():
+        pillow_bg = rs.detect_background_color(img)[0]
+        pillow_flood = rs.flood_fill_remove(img, pillow_bg, case["tolerance"], band_rows=case["band_rows"])
+        pillow_fringe = rs.clean_semitransparent_fringe(
+            img, pillow_bg, passes=case["passes"], band_rows=case["band_rows"],
+        )
+    if (pillow_bg, pillow_flood, pillow_fringe) != (bg_color, flood, fringe) or not np.array_equal(
+        np.asarray(img), arr
+    ):
+        return (f"{case}: numpy bg {bg_color} removed {flood}+{fringe}, "
+                f"pillow bg {pillow_bg} removed {pillow_flood}+{pillow_fringe}")
+    if rs._alpha_bbox(arr) != img.getbbox():
+        return f"{case}: numpy bbox {rs._alpha_bbox(arr)}, pillow bbox {img.getbbox()}"
+    return None
+
+
+def check_sweep(rng: "np.random.Generator") -> Optional[str]:
+    """sweep_removal_levels() == one flood fill per tolerance."""
+    case = _case(rng)
+    arr = make_sprite(rng, case["h"], case["w"])
+    bg_color = rs.detect_background_color(arr)[0]
+    tolerances = sorted({int(t) for t in rng.integers(0, 150, int(rng.integers(1, 8)))})
+    levels = rs.sweep_removal_levels(arr, bg_color, tolerances, case["band_rows"])
+    for k, tolerance in enumerate(tolerances):
+        flooded, expected = arr.copy(), arr.copy()
+        rs.flood_fill_remove(flooded, bg_color, tolerance)
+        expected[levels <= k] = 0
+        if not np.array_equal(flooded, expected):
+            return f"{case}: tolerance {tolerance} of {tolerances} differs from its flood fill"
+    return None
+
+
+def _removal_with_bbox(sprite: "np.ndarray", config: "rs.RipConfig") -> dict:
+    """_remove_background() plus the crop bbox, like a --stack result."""
+    removal = rs._remove_background(sprite, config)
+    if not removal["transparent"]:
+        removal["bbox"] = rs._alpha_bbox(sprite)
+    return removal
+
+
+def check_stack(rng: "np.random.Generator") -> Optional[str]:
+    """_remove_background_stack() == _remove_background() per image."""
+    case = _case(rng)
+    n = int(rng.integers(1, 7))
+    # Generator batches usually share one background; mix both kinds
+    shared = tuple(int(c) for c in rng.integers(0, 256, 3)) if rng.random() < 0.4 else None
+    stack = np.stack([make_sprite(rng, case["h"], case["w"], shared) for _ in range(n)])
+    config = rs.RipConfig(tolerance=case["tolerance"], fringe_passes=case["passes"], band_rows=case["band_rows"])
+    singles = stack.copy()
+    stacked = rs._remove_background_stack(stack, config)
+    for i in range(n):
+        single = _removal_with_bbox(singles[i], config)
+        if stacked[i] != single:
+            return f"{case}: image {i} of {n}: stack {stacked[i]}, single {single}"
+        # Already-transparent images are skipped unchanged, whatever the stack did to them
+        if not single["transparent"] and not np.array_equal(stack[i], singles[i]):
+            return f"{case}: image {i} of {n}: pixels differ"
+    return None
+
+
+def check_tiles(rng: "np.random.Generator") -> Optional[str]:
+    """--tile-threads rip (tiled run labels, bands on threads) == the untiled rip."""
+    case = _case(rng)
+    arr = make_sprite(rng, case["h"], case["w"])
+    threads = int(rng.choice([0, 2, 3, 4]))
+    config = rs.RipConfig(tolerance=case["tolerance"], fringe_passes=case["passes"], band_rows=case["band_rows"])
+    untiled, tiled = arr.copy(), arr.copy()
+    untiled_removal = _removal_with_bbox(untiled, config)
+    tiled_removal = rs._remove_background(tiled, rs.dataclasses.replace(config, tile_threads=threads))
+    if not tiled_removal["transparent"]:
+        tiled_removal["bbox"] = rs._alpha_bbox(tiled, threads)
+    if untiled_removal != tiled_removal or not np.array_equal(untiled, tiled):
+        return f"{case}, {threads} threads: untiled {untiled_removal}, tiled {tiled_removal}"
+
+    # The labels themselves, not just the kept runs
+    run_row, run_start, run_end = rs._row_runs(rng.random((case["h"], case["w"])) < rng.random())
+    labels = rs._union_runs(np.arange(len(run_row)), *rs._run_links(run_row, run_start, run_end, case["w"]))
+    if len(run_row):
+        tiled_labels = rs._tiled_run_labels(
+            run_row, run_start, run_end, case["w"], case["h"], case["band_rows"], threads,
+        )
+        if not np.array_equal(labels, tiled_labels):
+            return f"{case}, {threads} threads: tiled run labels differ"
+    return None
+
+
+CHECKS: dict[str, Callable[["np.random.Generator"], Optional[str]]] = {
+    "flood": check_flood,
+    "fringe": check_fringe,
+    "pillow": check_pillow,
+    "sweep": check_sweep,
+    "stack": check_stack,
+    "tiles": check_tiles,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check that the rip_sprites.py engines give identical output on random sprites",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python art/check_rip_sprites.py                        Every check, 200 cases each
+  python art/check_rip_sprites.py --checks tiles --cases 2000
+                                                         Hammer the tiled flood fill
+        """,
+    )
+    parser.add_argument("--cases", type=int, default=DEFAULT_CASES, metavar="N",
+                        help=f"Random cases per check (default: {DEFAULT_CASES})")
+    parser.add_argument("--checks", type=lambda v: [c for c in v.split(",") if c],
+                        default=list(CHECKS), metavar="NAME,NAME",
+                        help=f"Checks to run: {', '.join(CHECKS)} (default: all)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, metavar="N",
+                        help=f"Random seed (default: {DEFAULT_SEED})")
+    args = parser.parse_args()
+
+    if not rs.HAS_NUMPY:
+        print("ERROR: numpy not installed — every check compares against the numpy path")
+        sys.exit(1)
+    unknown = [c for c in args.checks if c not in CHECKS]
+    if unknown:
+        print(f"ERROR: Unknown check(s): {', '.join(unknown)} (use {', '.join(CHECKS)})")
+        sys.exit(1)
+    if args.cases < 1:
+        print(f"ERROR: --cases must be at least 1 (got {args.cases})")
+        sys.exit(1)
+
+    print("\n" + "=" * 70)
+    print("MOMI'S ADVENTURE — SPRITE RIPPER EQUIVALENCE CHECK")
+    print("=" * 70)
+    print(f"\nChecks: {', '.join(args.checks)}")
+    print(f"Cases: {args.cases} per check (seed {args.seed})")
+    print("=" * 70)
+
+    failures = 0
+    for name in args.checks:
+        rng = np.random.default_rng([args.seed, list(CHECKS).index(name)])
+        for case in range(args.cases):
+            problem = CHECKS[name](rng)
+            if problem is not None:
+                print(f"  FAIL {name} (case {case + 1}): {problem}")
+                failures += 1
+                break
+        else:
+            print(f"  OK   {name}: {args.cases} cases identical")
+
+    if failures:
+        print(f"\n  {failures} check(s) failed.")
+        sys.exit(1)
+    print("\n  Every engine matched its reference.")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,22 +10,52 @@ Usage:
     python rip_sprites.py                        # Process all PNGs in art/generated/
     python rip_sprites.py path/to/image.png      # Process a single file
     python rip_sprites.py --tolerance 30         # Adjust color match tolerance (default: 40)
+    python rip_sprites.py --tolerance-sweep 20:80:5  # Grid preview + stats for every tolerance, no ripping
     python rip_sprites.py --scale 32             # Downscale to 32px (longest edge)
+    python rip_sprites.py --pixel-grid           # Downscale to the detected art pixel grid
     python rip_sprites.py --no-preview           # Skip checkerboard preview
-
-Output: Overwrites originals with transparent versions + saves _preview.png with checkerboard.
+    python rip_sprites.py --watch                # Keep ripping new PNGs as generators write them
+    python rip_sprites.py --memory-budget 256    # Band 4K images to stay under 256 MB peak RSS
+    python rip_sprites.py --stack                # Rip same-sized batches 8 images per array op
+    python rip_sprites.py --tile-threads 0       # Rip each big sheet in row tiles on every CPU
+    python rip_sprites.py --atlas                # Also pack each folder into atlas pages + SpriteFrames .tres
+
+Output: Overwrites originals with transparent versions + writes a labelled checkerboard contact
+sheet per folder (_preview_sheet_NN.png; --preview file for one _preview.png per sprite).
+Directory runs record content hashes in .rip_cache.json and skip files whose input and
+settings are unchanged (--no-cache to force a full re-rip). Every finished file is also
+appended to _rip_journal.jsonl as it completes, so an interrupted run can --resume and
+_rip_report.json is streamed from the journal.
+
+Library use (no disk round trip, nothing printed):
+    from rip_sprites import RipConfig, rip_image
+    result = rip_image(png_bytes, RipConfig(scale=64, split_frames="auto"))
+    result["image"].save(path)     # also result["frames"], result["stats"]
 """
 
+import io
+import os
+import re
 import sys
 import math
 import time
 import json
 import argparse
 import pathlib
+import select
+import struct
 import shutil
+import hashlib
+import contextlib
+import dataclasses
+import ctypes
+import ctypes.util
+import functools
+import tracemalloc
 from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Optional, TextIO
 
 # Windows UTF-8 stdout
 if sys.platform == "win32":
@@ -35,7 +65,7 @@ if sys.platform == "win32":
         pass
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageMath
 except ImportError:
     print("Pillow not installed. Run: pip install Pillow")
     sys.exit(1)
@@ -47,6 +77,11 @@ except ImportError:
     np = None  # type: ignore[assignment]
     HAS_NUMPY = False
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
 # Paths
 SCRIPT_DIR = pathlib.Path(__file__).parent
 PROJECT_ROOT = SCRIPT_DIR.parent
@@ -74,32 +109,53 @@ def color_distance(c1: tuple, c2: tuple) -> float:
     return math.sqrt(sum((a - b) ** 2 for a, b in zip(c1[:3], c2[:3])))
 
 
-def detect_background_color(img: Image.Image) -> tuple[tuple, float]:
-    """
-    Detect the background color by sampling corners and edges.
-    Returns (bg_color, confidence) tuple.
-    """
-    pixels = img.load()
-    w, h = img.size
+def _background_sample_points(w: int, h: int) -> list[tuple[int, int]]:
+    """(x, y) points sampled for background detection, in sampling order."""
+    points: list[tuple[int, int]] = []
 
     # Sample corners (4 corners, 5x5 patch each)
-    samples: list[tuple] = []
     patch = 5
     for cy, cx in [(0, 0), (0, w-1), (h-1, 0), (h-1, w-1)]:
         for dy in range(patch):
             for dx in range(patch):
                 sy = min(max(cy + dy - patch//2, 0), h - 1)
                 sx = min(max(cx + dx - patch//2, 0), w - 1)
-                samples.append(pixels[sx, sy][:3])
+                points.append((sx, sy))
 
     # Sample edges (every 10th pixel along all 4 edges)
     step = max(1, min(w, h) // 20)
     for x in range(0, w, step):
-        samples.append(pixels[x, 0][:3])
-        samples.append(pixels[x, h-1][:3])
+        points.append((x, 0))
+        points.append((x, h-1))
     for y in range(0, h, step):
-        samples.append(pixels[0, y][:3])
-        samples.append(pixels[w-1, y][:3])
+        points.append((0, y))
+        points.append((w-1, y))
+
+    return points
+
+
+def _buffer_size(img: "Image.Image | np.ndarray") -> tuple[int, int]:
+    """(width, height) of a PIL image or an (h, w, 4) RGBA array."""
+    if HAS_NUMPY and isinstance(img, np.ndarray):
+        return img.shape[1], img.shape[0]
+    return img.size
+
+
+def detect_background_color(img: "Image.Image | np.ndarray") -> tuple[tuple, float]:
+    """
+    Detect the background color by sampling corners and edges.
+    Accepts a PIL image or an (h, w, 4) uint8 RGBA array.
+    Returns (bg_color, confidence) tuple.
+    """
+    w, h = _buffer_size(img)
+    points = _background_sample_points(w, h)
+
+    if HAS_NUMPY and isinstance(img, np.ndarray):
+        xs, ys = zip(*points)
+        samples = [tuple(s) for s in img[list(ys), list(xs), :3].tolist()]
+    else:
+        pixels = img.load()
+        samples = [pixels[x, y][:3] for x, y in points]
 
     # Find the most common color among edge samples
     counter = Counter(samples)
@@ -113,36 +169,154 @@ def detect_background_color(img: Image.Image) -> tuple[tuple, float]:
     return bg_color, confidence
 
 
-def is_already_transparent(img: Image.Image, threshold: float = 0.3) -> bool:
+# Background detectors selectable with --bg-detect ("sample" is the original
+# corner/edge sampler, "histogram" the quantized border-band histogram)
+BG_DETECT_METHODS = ("sample", "histogram")
+
+
+def _border_bands(img: "Image.Image | np.ndarray", band: int) -> "np.ndarray":
+    """RGB values of the `band`-pixel-wide border of an image, as an (n, 3) uint8 array.
+
+    Slices the four bands directly (corners are counted once); images too
+    small to have an interior contribute every pixel.
+    """
+    w, h = _buffer_size(img)
+    if min(w, h) <= 2 * band:
+        boxes = [(0, 0, w, h)]
+    else:
+        boxes = [
+            (0, 0, w, band), (0, h - band, w, h),
+            (0, band, band, h - band), (w - band, band, w, h - band),
+        ]
+    if isinstance(img, np.ndarray):
+        regions = [img[top:bottom, left:right] for left, top, right, bottom in boxes]
+    else:
+        regions = [np.asarray(img.crop(box).convert("RGBA")) for box in boxes]
+    return np.concatenate([region.reshape(-1, 4)[:, :3] for region in regions])
+
+
+def detect_background_clusters(
+    img: "Image.Image | np.ndarray", k: int = 1, min_share: float = 0.02
+) -> list[tuple[tuple, float]]:
+    """
+    Detect up to k background colors from a quantized histogram of the border bands.
+
+    Border pixels are binned at 4 bits per channel with np.bincount and the
+    histogram is box-smoothed over neighbouring bins, so noisy backgrounds
+    where no exact color repeats still form one clear peak. Each peak's color
+    is the per-channel median of the pixels around it; its share is the
+    fraction of all border pixels within distance 30 of that color (the same
+    test the sampler uses for confidence). Peaks are taken strongest first
+    and clusters covering less than min_share are dropped, so k > 1 returns
+    the main shades of a gradient background.
+
+    Accepts a PIL image or an (h, w, 4) uint8 RGBA array (numpy required).
+    Returns [(bg_color, share), ...], best first; the first share is the
+    confidence.
+    """
+    w, h = _buffer_size(img)
+    band = max(2, min(w, h) // 128)
+    pixels = _border_bands(img, band)
+    total = len(pixels)
+    channels = [pixels[:, c] for c in range(3)]
+
+    quant = pixels >> 4
+    packed = (quant[:, 0].astype(np.int32) << 8) | (quant[:, 1].astype(np.int32) << 4) | quant[:, 2]
+    hist = np.bincount(packed, minlength=4096).reshape(16, 16, 16)
+
+    # 3x3x3 box sum (separable) — a color sitting on a bin edge still peaks in one place
+    smooth = hist
+    for axis in range(3):
+        padded = np.pad(smooth, [(1, 1) if a == axis else (0, 0) for a in range(3)])
+        smooth = padded[(slice(None),) * axis + (slice(0, 16),)] \
+            + padded[(slice(None),) * axis + (slice(1, 17),)] \
+            + padded[(slice(None),) * axis + (slice(2, 18),)]
+
+    clusters: list[tuple[tuple, float]] = []
+    while len(clusters) < k:
+        peak = np.unravel_index(int(np.argmax(smooth)), smooth.shape)
+        if smooth[peak] == 0:
+            break
+
+        # Pixels whose bin is in the peak's 3x3x3 neighbourhood -> per-channel median
+        window = tuple(slice(max(0, c - 1), c + 2) for c in peak)
+        in_window = np.zeros((16, 16, 16), dtype=bool)
+        in_window[window] = True
+        near = in_window.reshape(-1)[packed]
+        color = []
+        for channel in channels:
+            cumulative = np.cumsum(np.bincount(channel[near], minlength=256))
+            color.append(int(np.searchsorted(cumulative, (cumulative[-1] + 1) // 2)))
+        color = tuple(color)
+
+        dist_sq = np.zeros(total, dtype=np.int32)
+        for channel, value in zip(channels, color):
+            d = channel.astype(np.int32) - value
+            dist_sq += d * d
+        share = int(np.count_nonzero(dist_sq < 900)) / total
+        if clusters and share < min_share:
+            break
+        clusters.append((color, share))
+
+        # Suppress this mode's neighbourhood before looking for the next one
+        smooth[tuple(slice(max(0, c - 2), c + 3) for c in peak)] = 0
+
+    return clusters
+
+
+def _detect_background(
+    img: "Image.Image | np.ndarray", args: argparse.Namespace
+) -> tuple[tuple, float, Optional[list[tuple[tuple, float]]]]:
+    """Detect the background with the --bg-detect method from args.
+
+    Returns (bg_color, confidence, clusters); clusters is the full
+    detect_background_clusters() result for the histogram method, else None.
+    The histogram method needs numpy and falls back to sampling without it.
+    """
+    method: str = getattr(args, "bg_detect", "sample")
+    if method == "histogram" and HAS_NUMPY:
+        k: int = max(1, getattr(args, "bg_clusters", 1))
+        clusters = detect_background_clusters(img, k)
+        bg_color, confidence = clusters[0]
+        return bg_color, confidence, clusters
+    bg_color, confidence = detect_background_color(img)
+    return bg_color, confidence, None
+
+
+def is_already_transparent(
+    img: "Image.Image | np.ndarray", threshold: float = 0.3, threads: int = 1
+) -> bool:
     """Check if an image already has significant transparency (>threshold fraction).
 
     Used to skip images that have already been processed or were generated
     with transparent backgrounds. Returns True if more than threshold fraction
-    of pixels are fully transparent (alpha == 0).
+    of pixels are fully transparent (alpha == 0). Accepts a PIL image or an
+    (h, w, 4) uint8 RGBA array (scanned in bands on `threads` tile threads).
     """
-    w, h = img.size
+    w, h = _buffer_size(img)
     total_pixels = w * h
     if total_pixels == 0:
         return False
 
     if HAS_NUMPY:
-        arr = np.array(img)
-        transparent_pixels = int(np.sum(arr[:, :, 3] == 0))
+        if isinstance(img, np.ndarray):
+            opaque = sum(_map_bands(
+                lambda top: int(np.count_nonzero(img[top:top + DEFAULT_BAND_ROWS, :, 3])),
+                h, DEFAULT_BAND_ROWS, threads,
+            ))
+        else:
+            opaque = int(np.count_nonzero(np.asarray(img.getchannel("A"))))
+        transparent_pixels = total_pixels - opaque
         return (transparent_pixels / total_pixels) > threshold
 
-    # Pillow fallback
-    pixels = img.load()
-    transparent_count = 0
-    for y in range(h):
-        for x in range(w):
-            if pixels[x, y][3] == 0:
-                transparent_count += 1
+    # Pillow fallback: bucket 0 of the alpha channel histogram
+    transparent_count = img.getchannel("A").histogram()[0]
     return (transparent_count / total_pixels) > threshold
 
 
-def _flood_fill_remove_pillow(img: Image.Image, bg_color: tuple, tolerance: int) -> int:
+def _flood_fill_remove_pillow_bfs(img: Image.Image, bg_color: tuple, tolerance: int) -> int:
     """
-    Pure-Pillow flood-fill fallback (used when numpy is not available).
+    Legacy pure-Pillow flood-fill (per-pixel queue), kept for timing comparisons.
     Flood-fill from all 4 corners + edge midpoints to remove background.
     Only removes connected regions (won't punch holes in the sprite).
     Returns count of pixels made transparent.
@@ -247,158 +421,771 @@ def _flood_fill_remove_numpy(img: Image.Image, bg_color: tuple, tolerance: int)
     return transparent_count
 
 
-def flood_fill_remove(img: Image.Image, bg_color: tuple, tolerance: int) -> int:
+# Full-size work is done in row bands of this many rows, so the decoded RGBA
+# buffer is the only image-sized allocation (--memory-budget derives the
+# band height from a per-image budget instead)
+DEFAULT_BAND_ROWS = 256
+
+
+# --tile-threads: the band loops (transparency scan, distance maps and runs,
+# flood-fill labels and paint-back, fringe shifts, alpha bbox) of an image
+# taller than one band run on a thread pool. numpy releases the GIL inside
+# them and each band only reads its own rows (plus a halo), so the results
+# are the same as the serial loop's.
+@functools.lru_cache(maxsize=None)
+def _tile_pool(threads: int) -> ThreadPoolExecutor:
+    """The shared pool of `threads` tile threads, kept for the rest of the run."""
+    return ThreadPoolExecutor(threads, thread_name_prefix="rip-tile")
+
+
+def _map_bands(fn: Callable[[int], object], h: int, band_rows: int, threads: int = 1) -> list:
+    """[fn(top) for every band of an h-row image], in band order.
+
+    Bands are spread over `threads` tile threads (0 = one per CPU) when
+    there is more than one band; threads 1 runs them in turn.
+    """
+    tops = range(0, h, band_rows)
+    if threads <= 0:
+        threads = os.cpu_count() or 1
+    if threads == 1 or len(tops) <= 1:
+        return [fn(top) for top in tops]
+    return list(_tile_pool(threads).map(fn, tops))
+
+
+@functools.lru_cache(maxsize=64)
+def _distance_luts(bg_color: tuple) -> "np.ndarray":
+    """(3, 256) int32 tables of (v - bg_color[c])^2 per RGB channel."""
+    values = np.arange(256, dtype=np.int32)
+    return np.stack([(values - int(c)) ** 2 for c in bg_color[:3]])
+
+
+def _background_close(pixels: "np.ndarray", bg_color: tuple, tolerance: int) -> "np.ndarray":
+    """True where RGBA pixels (any (..., 4) uint8 array) are within tolerance of bg_color.
+
+    Squared distances come from per-channel lookup tables on the uint8
+    data, so the only temporary is one int32 plane the size of pixels.
+    """
+    luts = _distance_luts(tuple(bg_color))
+    dist_sq = luts[0][pixels[..., 0]]
+    dist_sq += luts[1][pixels[..., 1]]
+    dist_sq += luts[2][pixels[..., 2]]
+    return dist_sq <= tolerance * tolerance
+
+
+def _edge_seeds(w: int, h: int) -> list[tuple[int, int]]:
+    """Flood-fill seed points: all 4 corners + edge midpoints, as (x, y)."""
+    return [
+        (0, 0), (w - 1, 0), (0, h - 1), (w - 1, h - 1),
+        (w // 2, 0), (w // 2, h - 1), (0, h // 2), (w - 1, h // 2),
+    ]
+
+
+def _row_runs(mask: "np.ndarray") -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """(row, start, end) of every horizontal run of True in a 2-D mask, row-major."""
+    h, w = mask.shape
+    # Value changes along each padded row alternate run start, run end
+    padded = np.zeros((h, w + 2), dtype=bool)
+    padded[:, 1:-1] = mask
+    edge_row, edge_col = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    return edge_row[0::2], edge_col[0::2], edge_col[1::2]
+
+
+def _run_links(
+    run_row: "np.ndarray", run_start: "np.ndarray", run_end: "np.ndarray", w: int
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """(src, dst) index pairs of runs (row-major, from _row_runs) that
+    overlap between adjacent rows, i.e. are 4-connected."""
+    n_runs = len(run_row)
+    # Row-major keys; stride w+1 keeps exclusive ends from spilling into the next row
+    stride = w + 1
+    start_key = run_row.astype(np.int64) * stride + run_start
+    end_key = run_row.astype(np.int64) * stride + run_end
+
+    # Runs in row r+1 overlapping run i form a contiguous index range [lo, hi)
+    below = (run_row.astype(np.int64) + 1) * stride
+    lo = np.searchsorted(end_key, below + run_start, side="right")
+    hi = np.searchsorted(start_key, below + run_end, side="left")
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    src = np.repeat(np.arange(n_runs), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return src, np.repeat(lo, counts) + offsets
+
+
+def _union_runs(labels: "np.ndarray", src: "np.ndarray", dst: "np.ndarray") -> "np.ndarray":
+    """Merge the components of linked runs with vectorized union-find
+    (min-label hooking + pointer jumping).
+
+    labels must be a flat forest (every run labelled with its root, e.g.
+    np.arange to start); returns each run's component label, the lowest
+    run index in the component.
+    """
+    while len(src):
+        la = labels[src]
+        lb = labels[dst]
+        if np.array_equal(la, lb):
+            break
+        # Hook both roots onto the smaller label, then flatten the trees
+        low = np.minimum(la, lb)
+        np.minimum.at(labels, la, low)
+        np.minimum.at(labels, lb, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+def _tiled_run_labels(
+    run_row: "np.ndarray",
+    run_start: "np.ndarray",
+    run_end: "np.ndarray",
+    w: int,
+    h: int,
+    band_rows: int,
+    threads: int,
+) -> "np.ndarray":
+    """_union_runs() labels of all runs, resolved band by band on the tile
+    threads and then merged across the band borders.
+
+    Each band's runs are labelled on their own; the only links left are
+    between the last row of a band and the first row of the next, and
+    resolving those over the band labels gives the untiled result.
+    """
+    bounds = np.searchsorted(run_row, np.arange(0, h + band_rows, band_rows))
+
+    def band_labels(top: int) -> "np.ndarray":
+        first, last = bounds[top // band_rows], bounds[top // band_rows + 1]
+        links = _run_links(run_row[first:last], run_start[first:last], run_end[first:last], w)
+        return first + _union_runs(np.arange(last - first), *links)
+
+    labels = np.concatenate(_map_bands(band_labels, h, band_rows, threads))
+    src, dst = [], []
+    for top in range(band_rows, h, band_rows):
+        first, last = np.searchsorted(run_row, (top - 1, top + 1))
+        border_src, border_dst = _run_links(run_row[first:last], run_start[first:last], run_end[first:last], w)
+        src.append(border_src + first)
+        dst.append(border_dst + first)
+    if not src:
+        return labels
+    return _union_runs(labels, np.concatenate(src), np.concatenate(dst))
+
+
+def _seed_connected_runs(
+    run_row: "np.ndarray",
+    run_start: "np.ndarray",
+    run_end: "np.ndarray",
+    w: int,
+    seeds: list[tuple[int, int]],
+    labels: "Optional[np.ndarray]" = None,
+) -> "np.ndarray":
+    """Which runs (row-major, from _row_runs) are 4-connected to a seed pixel.
+
+    Runs that overlap between adjacent rows are linked and the run graph is
+    resolved with vectorized union-find (_union_runs), unless their labels
+    are given (see _tiled_run_labels). Seeds outside every run start
+    nothing, exactly like the BFS. Cost scales with the number of runs,
+    not pixels. Returns a bool per run.
+    """
+    n_runs = len(run_row)
+    if n_runs == 0:
+        return np.zeros(0, dtype=bool)
+
+    if labels is None:
+        labels = _union_runs(np.arange(n_runs), *_run_links(run_row, run_start, run_end, w))
+
+    stride = w + 1
+    start_key = run_row.astype(np.int64) * stride + run_start
+    seed_labels = []
+    for sx, sy in seeds:
+        run = int(np.searchsorted(start_key, sy * stride + sx, side="right")) - 1
+        if run >= 0 and run_row[run] == sy and run_start[run] <= sx < run_end[run]:
+            seed_labels.append(labels[run])
+    if not seed_labels:
+        return np.zeros(n_runs, dtype=bool)
+    return np.isin(labels, seed_labels)
+
+
+def _flood_fill_remove_vector(
+    arr: "np.ndarray",
+    bg_color: tuple,
+    tolerance: int,
+    band_rows: int = DEFAULT_BAND_ROWS,
+    threads: int = 1,
+) -> int:
+    """
+    Whole-array flood-fill from all 4 corners + edge midpoints, in place on
+    an (h, w, 4) uint8 RGBA array.
+    The tolerance mask is built band by band and only kept as horizontal
+    runs; the runs connected to the edge seeds (see _seed_connected_runs)
+    are painted back band by band, so no image-sized temporary is needed.
+    With threads other than 1 the bands are tiles on the tile threads and
+    the connectivity is merged across their borders (_tiled_run_labels).
+    Removes exactly the same pixels as the BFS implementations.
+    Returns count of pixels made transparent.
+    """
+    h, w = arr.shape[:2]
+
+    def band_runs(top: int) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        band_row, band_start, band_end = _row_runs(
+            _background_close(arr[top:top + band_rows], bg_color, tolerance)
+        )
+        return band_row + top, band_start, band_end
+
+    bands = _map_bands(band_runs, h, band_rows, threads)
+    run_row, run_start, run_end = (np.concatenate(parts) for parts in zip(*bands))
+    labels = None
+    if threads != 1 and len(bands) > 1:
+        labels = _tiled_run_labels(run_row, run_start, run_end, w, h, band_rows, threads)
+    keep = _seed_connected_runs(run_row, run_start, run_end, w, _edge_seeds(w, h), labels)
+    run_row, run_start, run_end = run_row[keep], run_start[keep], run_end[keep]
+
+    transparent_count = int((run_end - run_start).sum())
+    if transparent_count:
+        _paint_runs(arr, run_row, run_start, run_end, band_rows, threads)
+    return transparent_count
+
+
+def _paint_runs(
+    arr: "np.ndarray",
+    run_row: "np.ndarray",
+    run_start: "np.ndarray",
+    run_end: "np.ndarray",
+    band_rows: int,
+    threads: int = 1,
+) -> None:
+    """Clear the pixels of row-major runs (from _row_runs) in an (h, w, 4)
+    array, band by band (on `threads` tile threads)."""
+    h, w = arr.shape[:2]
+    bounds = np.searchsorted(run_row, np.arange(0, h + band_rows, band_rows))
+
+    def paint_band(top: int) -> None:
+        first, last = bounds[top // band_rows], bounds[top // band_rows + 1]
+        if first == last:
+            return
+        # +1 at start, -1 at end, cumulative sum per row
+        band = arr[top:top + band_rows]
+        marks = np.zeros((band.shape[0], w + 1), dtype=np.int8)
+        marks[run_row[first:last] - top, run_start[first:last]] = 1
+        marks[run_row[first:last] - top, run_end[first:last]] = -1
+        np.cumsum(marks, axis=1, dtype=np.int8, out=marks)
+        band[marks[:, :w] > 0] = 0
+
+    _map_bands(paint_band, h, band_rows, threads)
+
+
+def sweep_removal_levels(
+    arr: "np.ndarray", bg_color: tuple, tolerances: list[int], band_rows: int = DEFAULT_BAND_ROWS
+) -> "np.ndarray":
+    """
+    Flood-fill removal for every tolerance at once (--tolerance-sweep), from
+    an (h, w, 4) uint8 RGBA array that is left untouched.
+
+    flood_fill_remove at tolerance t clears a pixel exactly when some
+    4-connected path from an edge seed reaches it through pixels all within
+    t of the background — when its minimax path distance (the largest
+    distance along the path, minimized over paths) is <= t. The distance
+    map is computed once, quantized to the sorted tolerances as a uint8
+    level map; each level's seed-connected runs come from the same run
+    union-find as the vector engine, and the nested run sets are painted
+    back in one cumulative sum.
+    Returns an (h, w) uint8 array holding the index of the smallest
+    tolerance that removes each pixel (len(tolerances) where none does),
+    so `levels <= k` is the flood mask of tolerances[k].
+    """
+    h, w = arr.shape[:2]
+    level_count = len(tolerances)
+    limits = np.array([t * t for t in tolerances], dtype=np.int32)
+    luts = _distance_luts(tuple(bg_color))
+    levels = np.empty((h, w), dtype=np.uint8)
+    for top in range(0, h, band_rows):
+        band = arr[top:top + band_rows]
+        dist_sq = luts[0][band[..., 0]]
+        dist_sq += luts[1][band[..., 1]]
+        dist_sq += luts[2][band[..., 2]]
+        levels[top:top + band_rows] = np.searchsorted(limits, dist_sq, side="left")
+
+    # Rows holding pixels of each level — level k only changes those rows' runs
+    row_levels = np.zeros((h, level_count + 1), dtype=bool)
+    for top in range(0, h, band_rows):
+        band = levels[top:top + band_rows]
+        row_levels[np.arange(top, top + band.shape[0])[:, np.newaxis], band] = True
+
+    seeds = _edge_seeds(w, h)
+    first_level = min(int(levels[sy, sx]) for sx, sy in seeds)
+    rows, starts, ends = [], [], []
+    for k in range(first_level, level_count):
+        changed = np.arange(h) if k == first_level else np.flatnonzero(row_levels[:, k])
+        if len(changed) == 0:
+            # Same mask as level k - 1, so the same connected runs
+            rows.append(rows[-1])
+            starts.append(starts[-1])
+            ends.append(ends[-1])
+            continue
+        if k == first_level:
+            level_rows, level_starts, level_ends = [], [], []
+        else:
+            unchanged = ~row_levels[run_row, k]
+            level_rows, level_starts, level_ends = [run_row[unchanged]], [run_start[unchanged]], [run_end[unchanged]]
+        for first in range(0, len(changed), band_rows):
+            band_rows_at = changed[first:first + band_rows]
+            band_row, band_start, band_end = _row_runs(levels[band_rows_at] <= k)
+            level_rows.append(band_rows_at[band_row])
+            level_starts.append(band_start)
+            level_ends.append(band_end)
+        run_row, run_start, run_end = (np.concatenate(parts) for parts in (level_rows, level_starts, level_ends))
+        if k > first_level:
+            order = np.argsort(run_row * (w + 1) + run_start)
+            run_row, run_start, run_end = run_row[order], run_start[order], run_end[order]
+        keep = _seed_connected_runs(run_row, run_start, run_end, w, seeds)
+        rows.append(run_row[keep])
+        starts.append(run_start[keep])
+        ends.append(run_end[keep])
+    if not rows:
+        levels[:] = level_count
+        return levels
+
+    # Removed at tolerance k => removed at every larger one, so the number
+    # of levels whose runs cover a pixel is level_count - its minimax level
+    run_row, run_start, run_end = (np.concatenate(parts) for parts in (rows, starts, ends))
+    order = np.argsort(run_row, kind="stable")
+    run_row, run_start, run_end = run_row[order], run_start[order], run_end[order]
+    bounds = np.searchsorted(run_row, np.arange(0, h + band_rows, band_rows))
+    for top, first, last in zip(range(0, h, band_rows), bounds[:-1], bounds[1:]):
+        band = levels[top:top + band_rows]
+        size = band.shape[0] * (w + 1)
+        offset = (run_row[first:last] - top) * (w + 1)
+        marks = np.bincount(offset + run_start[first:last], minlength=size)
+        marks -= np.bincount(offset + run_end[first:last], minlength=size)
+        band[:] = level_count - np.cumsum(marks.reshape(-1, w + 1), axis=1)[:, :w]
+    return levels
+
+
+def sweep_fringe_candidates(
+    arr: "np.ndarray",
+    levels: "np.ndarray",
+    bg_color: tuple,
+    fringe_tolerance: int = 80,
+    band_rows: int = DEFAULT_BAND_ROWS,
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    First-pass fringe pixels of every swept tolerance, from the untouched
+    array and its sweep_removal_levels() map.
+
+    At level k a pixel is transparent from level on (-1 if it already was),
+    so the first fringe pass cleans pixel p exactly when it is within
+    fringe_tolerance of the background and first <= k < last, with first
+    the smallest level of its 4-neighbours and last its own. Returns
+    (ys, xs, first, last) of the pixels where that interval is not empty;
+    later passes follow from _clean_fringe_frontier.
+    """
+    h, w = arr.shape[:2]
+    never = np.int16(levels.max(initial=0) + 1)
+    found = []
+    for top in range(0, h, band_rows):
+        bottom = min(h, top + band_rows)
+        halo_top = max(0, top - 1)
+        halo = slice(halo_top, min(h, bottom + 1))
+        became = levels[halo].astype(np.int16)
+        became[arr[halo, :, 3] == 0] = -1
+        core = became[top - halo_top:top - halo_top + bottom - top]
+        first = np.full(core.shape, never, dtype=np.int16)
+        np.minimum(first[1:, :], core[:-1, :], out=first[1:, :])
+        np.minimum(first[:-1, :], core[1:, :], out=first[:-1, :])
+        np.minimum(first[:, 1:], core[:, :-1], out=first[:, 1:])
+        np.minimum(first[:, :-1], core[:, 1:], out=first[:, :-1])
+        if top > 0:
+            np.minimum(first[0], became[0], out=first[0])
+        if bottom < h:
+            np.minimum(first[-1], became[-1], out=first[-1])
+        ys, xs = np.nonzero(first < core)
+        close = _background_close(arr[ys + top, xs], bg_color, fringe_tolerance)
+        ys, xs = ys[close], xs[close]
+        found.append((ys + top, xs, first[ys, xs], core[ys, xs]))
+    return tuple(np.concatenate(parts) for parts in zip(*found))
+
+
+# Horizontal runs of 255 in the bytes of an "L" mask
+_MASK_RUN = re.compile(rb"\xff+")
+
+
+def _sum_at_most(channels: list[Image.Image], limit: int) -> Image.Image:
+    """'I' image: 1 where the three 'I' channels sum to at most limit, else 0."""
+    r, g, b = channels
+    if hasattr(ImageMath, "lambda_eval"):  # Pillow >= 10.3
+        return ImageMath.lambda_eval(lambda a: a["r"] + a["g"] + a["b"] <= limit, r=r, g=g, b=b)
+    return ImageMath.eval(f"r + g + b <= {limit}", r=r, g=g, b=b)
+
+
+def _close_mask_pillow(
+    img: Image.Image, bg_color: tuple, tolerance: int, band_rows: int = DEFAULT_BAND_ROWS
+) -> Image.Image:
+    """'L' mask of an RGBA image: 255 where the pixel is within tolerance of bg_color.
+
+    The Pillow counterpart of _background_close: per-channel squared
+    distances come from band point() lookups into 'I' images, summed and
+    compared by ImageMath, so every pixel is handled in Pillow's C code.
+    Built in bands of band_rows rows to bound the 'I' temporaries.
+    """
+    w, h = img.size
+    limit = tolerance * tolerance
+    luts = [[(v - int(c)) ** 2 for v in range(256)] for c in bg_color[:3]]
+    mask = Image.new("L", (w, h), 0)
+    for top in range(0, h, band_rows):
+        band = img.crop((0, top, w, min(h, top + band_rows)))
+        channels = [channel.point(lut, "I") for channel, lut in zip(band.split()[:3], luts)]
+        within = _sum_at_most(channels, limit).convert("L").point([0] + [255] * 255)
+        mask.paste(within, (0, top))
+    return mask
+
+
+def _seed_connected_runs_pillow(
+    run_start: list[int], run_end: list[int], row_first: list[int], seeds: list[tuple[int, int]]
+) -> list[int]:
+    """Indices of the runs 4-connected to a seed pixel, without numpy.
+
+    Runs are row-major and row y owns indices row_first[y]:row_first[y + 1].
+    Overlapping runs in adjacent rows are merged with a two-pointer sweep
+    into a plain union-find; like _seed_connected_runs, cost follows the
+    number of runs, and seeds outside every run start nothing.
+    """
+    parent = list(range(len(run_start)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for y in range(1, len(row_first) - 1):
+        j, above_end = row_first[y - 1], row_first[y]
+        for i in range(row_first[y], row_first[y + 1]):
+            start, end = run_start[i], run_end[i]
+            while j < above_end and run_end[j] <= start:
+                j += 1
+            k = j
+            while k < above_end and run_start[k] < end:
+                root_a, root_b = find(i), find(k)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+                k += 1
+
+    seed_roots = set()
+    for sx, sy in seeds:
+        for i in range(row_first[sy], row_first[sy + 1]):
+            if run_start[i] <= sx < run_end[i]:
+                seed_roots.add(find(i))
+                break
+    if not seed_roots:
+        return []
+    return [i for i in range(len(parent)) if find(i) in seed_roots]
+
+
+def _flood_fill_remove_pillow(
+    img: Image.Image, bg_color: tuple, tolerance: int, band_rows: int = DEFAULT_BAND_ROWS
+) -> int:
+    """
+    Pillow-only flood-fill from all 4 corners + edge midpoints (used when
+    numpy is not available).
+    The tolerance mask comes from _close_mask_pillow; its horizontal runs
+    are found with a bytes regex per row, joined by
+    _seed_connected_runs_pillow, and the runs connected to the edge seeds
+    are painted back band by band through a paste() mask. Python only ever
+    touches runs, never pixels.
+    Removes exactly the same pixels as the BFS implementations.
+    Returns count of pixels made transparent.
+    """
+    w, h = img.size
+    data = _close_mask_pillow(img, bg_color, tolerance, band_rows).tobytes()
+    run_row: list[int] = []
+    run_start: list[int] = []
+    run_end: list[int] = []
+    row_first = [0]
+    for y in range(h):
+        base = y * w
+        for match in _MASK_RUN.finditer(data, base, base + w):
+            run_row.append(y)
+            run_start.append(match.start() - base)
+            run_end.append(match.end() - base)
+        row_first.append(len(run_row))
+    del data
+    keep = _seed_connected_runs_pillow(run_start, run_end, row_first, _edge_seeds(w, h))
+
+    transparent_count = 0
+    position = 0
+    for top in range(0, h, band_rows):
+        bottom = min(h, top + band_rows)
+        marks = bytearray(w * (bottom - top))
+        while position < len(keep) and run_row[keep[position]] < bottom:
+            i = keep[position]
+            offset = (run_row[i] - top) * w
+            marks[offset + run_start[i]:offset + run_end[i]] = b"\xff" * (run_end[i] - run_start[i])
+            transparent_count += run_end[i] - run_start[i]
+            position += 1
+        if any(marks):
+            mask = Image.frombytes("L", (w, bottom - top), bytes(marks))
+            img.paste((0, 0, 0, 0), (0, top, w, bottom), mask)
+    return transparent_count
+
+
+# Flood-fill engines selectable with --flood-engine ("bfs" is the legacy
+# per-pixel queue, kept for timing comparisons)
+FLOOD_ENGINES = ("vector", "bfs")
+
+
+def flood_fill_remove(
+    img: "Image.Image | np.ndarray",
+    bg_color: tuple,
+    tolerance: int,
+    engine: str = "vector",
+    band_rows: int = DEFAULT_BAND_ROWS,
+    threads: int = 1,
+) -> int:
     """
     Flood-fill from all 4 corners to remove background.
     Only removes connected regions (won't punch holes in the sprite).
+    Modifies img in place — a PIL image or an (h, w, 4) uint8 RGBA array.
     Returns count of pixels made transparent.
 
-    Uses numpy-optimized implementation when available, falls back to
-    pure-Pillow implementation otherwise.
+    With numpy, engine "vector" (default) uses whole-array connected
+    components (built in bands of band_rows rows) and "bfs" the legacy
+    per-pixel queue; both give identical results. Without numpy the same
+    engines are built from Pillow operations instead. threads spreads the
+    vector engine's bands over the tile threads (see _map_bands).
     """
-    if HAS_NUMPY:
-        return _flood_fill_remove_numpy(img, bg_color, tolerance)
-    return _flood_fill_remove_pillow(img, bg_color, tolerance)
+    if not HAS_NUMPY:
+        if engine == "bfs":
+            return _flood_fill_remove_pillow_bfs(img, bg_color, tolerance)
+        return _flood_fill_remove_pillow(img, bg_color, tolerance, band_rows)
+
+    if engine == "bfs":
+        if not isinstance(img, np.ndarray):
+            return _flood_fill_remove_numpy(img, bg_color, tolerance)
+        # Legacy path is PIL-based — round-trip the array through an image
+        work = Image.fromarray(img, "RGBA")
+        count = _flood_fill_remove_numpy(work, bg_color, tolerance)
+        img[:] = np.asarray(work)
+        return count
+
+    if isinstance(img, np.ndarray):
+        return _flood_fill_remove_vector(img, bg_color, tolerance, band_rows, threads)
+    arr = np.array(img)
+    count = _flood_fill_remove_vector(arr, bg_color, tolerance, band_rows, threads)
+    if count:
+        img.paste(Image.fromarray(arr, "RGBA"))
+    return count
 
 
 def _clean_fringe_pillow(
-    img: Image.Image, bg_color: tuple, fringe_tolerance: int = 80, passes: int = 2
+    img: Image.Image,
+    bg_color: tuple,
+    fringe_tolerance: int = 80,
+    passes: int = 2,
+    band_rows: int = DEFAULT_BAND_ROWS,
 ) -> int:
     """
-    Pure-Pillow fringe cleaning fallback (used when numpy is not available).
-    Runs multiple passes — each pass expands the transparent boundary found
-    in the previous pass, catching deeper anti-aliasing artifacts.
+    Pillow-only fringe cleaning with multi-pass support (used when numpy is
+    not available).
+    Each pass grows the transparent mask by one pixel in the 4 directions
+    (the mask pasted onto itself at +-1 offsets — MaxFilter would also take
+    diagonals), keeps the grown pixels that are not yet transparent and are
+    within fringe_tolerance of the background (_close_mask_pillow, built
+    once), and clears them with a single paste(). Like the numpy version,
+    each pass is judged on the image as it stood before that pass.
     Returns total count of pixels cleaned across all passes.
     """
-    pixels = img.load()
+    if passes <= 0:
+        return 0
     w, h = img.size
+    close = _close_mask_pillow(img, bg_color, fringe_tolerance, band_rows)
+    transparent = img.getchannel("A").point([255] + [0] * 255)
+    # (source box, destination box) of each one-pixel shift
+    shifts = []
+    if h > 1:
+        shifts += [((0, 0, w, h - 1), (0, 1, w, h)), ((0, 1, w, h), (0, 0, w, h - 1))]
+    if w > 1:
+        shifts += [((0, 0, w - 1, h), (1, 0, w, h)), ((1, 0, w, h), (0, 0, w - 1, h))]
     total_cleaned = 0
 
     for _pass in range(passes):
-        cleaned = 0
-        for y in range(h):
-            for x in range(w):
-                r, g, b, a = pixels[x, y]
-                if a == 0:
-                    continue  # Already transparent
-
-                # Check if this pixel is adjacent to a transparent pixel
-                has_transparent_neighbor = False
-                for nx, ny in [(x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)]:
-                    if 0 <= nx < w and 0 <= ny < h:
-                        if pixels[nx, ny][3] == 0:
-                            has_transparent_neighbor = True
-                            break
-
-                if has_transparent_neighbor:
-                    dist = color_distance((r, g, b), bg_color)
-                    if dist <= fringe_tolerance:
-                        pixels[x, y] = (0, 0, 0, 0)
-                        cleaned += 1
-
-        total_cleaned += cleaned
-        if cleaned == 0:
+        grown = transparent.copy()
+        for source, destination in shifts:
+            grown.paste(255, destination, transparent.crop(source))
+        cleaned = ImageChops.multiply(ImageChops.subtract(grown, transparent), close)
+        count = cleaned.histogram()[255]
+        if count == 0:
             break  # No more fringe pixels to clean
+        img.paste((0, 0, 0, 0), None, cleaned)
+        transparent.paste(255, None, cleaned)
+        total_cleaned += count
 
     return total_cleaned
 
 
 def _clean_fringe_numpy(
-    img: Image.Image, bg_color: tuple, fringe_tolerance: int = 80, passes: int = 2
+    arr: "np.ndarray",
+    bg_color: tuple,
+    fringe_tolerance: int = 80,
+    passes: int = 2,
+    band_rows: int = DEFAULT_BAND_ROWS,
+    threads: int = 1,
 ) -> int:
     """
-    Numpy-optimized fringe cleaning with multi-pass support.
-    Uses numpy array shifts to find all pixels adjacent to transparent regions,
-    then batch-computes color distances to decide which to remove.
-    Each pass expands the transparent boundary found in the previous pass.
+    Frontier-driven fringe cleaning with multi-pass support, in place on an
+    (h, w, 4) uint8 RGBA array.
+    The first pass finds every pixel adjacent to a transparent region with
+    array shifts, one row band at a time (plus a halo row on each side, so
+    the bands can run on `threads` tile threads);
+    later passes only look at the 4-neighbours of the pixels removed in the
+    previous pass — the only pixels whose situation changed — so total cost
+    follows the number of pixels removed rather than passes x image size.
+    The background distance is only evaluated at those candidate pixels.
+    Removes exactly what re-scanning the whole image every pass would.
     Returns total count of pixels cleaned across all passes.
     """
-    # Use int32 to avoid overflow when squaring color differences (255^2 = 65025 > int16 max)
-    arr = np.array(img, dtype=np.int32)
-    bg_arr = np.array(bg_color[:3], dtype=np.int32)
-    tolerance_sq = fringe_tolerance * fringe_tolerance
-    total_cleaned = 0
+    if passes <= 0:
+        return 0
     h, w = arr.shape[:2]
 
+    # Pass 1: non-transparent pixels with a transparent 4-neighbour. Every
+    # band is judged before any pixel is cleared, like a whole-image pass.
+    def band_fringe(top: int) -> tuple["np.ndarray", "np.ndarray"]:
+        bottom = min(h, top + band_rows)
+        halo_top = max(0, top - 1)
+        transparent = arr[halo_top:min(h, bottom + 1), :, 3] == 0
+        core = transparent[top - halo_top:top - halo_top + bottom - top]
+        has_transparent_neighbor = np.zeros(core.shape, dtype=bool)
+        has_transparent_neighbor[1:, :] |= core[:-1, :]
+        has_transparent_neighbor[:-1, :] |= core[1:, :]
+        has_transparent_neighbor[:, 1:] |= core[:, :-1]
+        has_transparent_neighbor[:, :-1] |= core[:, 1:]
+        if top > 0:
+            has_transparent_neighbor[0] |= transparent[0]
+        if bottom < h:
+            has_transparent_neighbor[-1] |= transparent[-1]
+        ys, xs = np.nonzero(has_transparent_neighbor & ~core)
+        ys += top
+        close = _background_close(arr[ys, xs], bg_color, fringe_tolerance)
+        return ys[close], xs[close]
+
+    found_y, found_x = zip(*_map_bands(band_fringe, h, band_rows, threads))
+    ys, xs = np.concatenate(found_y), np.concatenate(found_x)
+    arr[ys, xs] = 0
+    return len(ys) + _clean_fringe_frontier(arr, ys, xs, bg_color, fringe_tolerance, passes - 1)
+
+
+def _clean_fringe_frontier(
+    arr: "np.ndarray",
+    ys: "np.ndarray",
+    xs: "np.ndarray",
+    bg_color: tuple,
+    fringe_tolerance: int,
+    passes: int,
+) -> int:
+    """
+    Fringe passes after the first, in place on an (h, w, 4) uint8 RGBA array:
+    (ys, xs) are the pixels the previous pass cleared, and only their
+    4-neighbours can have changed. Returns the count cleaned by these passes.
+    """
+    h, w = arr.shape[:2]
+    total_cleaned = 0
     for _pass in range(passes):
-        # Find transparent pixels (alpha == 0)
-        transparent = arr[:, :, 3] == 0
-
-        # Find pixels adjacent to transparent regions using array shifts
-        # Each shift checks one direction: up, down, left, right
-        has_transparent_neighbor = np.zeros((h, w), dtype=bool)
-
-        # Neighbor above is transparent (shift transparent down by 1)
-        has_transparent_neighbor[1:, :] |= transparent[:-1, :]
-        # Neighbor below is transparent (shift transparent up by 1)
-        has_transparent_neighbor[:-1, :] |= transparent[1:, :]
-        # Neighbor to the left is transparent (shift transparent right by 1)
-        has_transparent_neighbor[:, 1:] |= transparent[:, :-1]
-        # Neighbor to the right is transparent (shift transparent left by 1)
-        has_transparent_neighbor[:, :-1] |= transparent[:, 1:]
-
-        # Only consider non-transparent pixels that have a transparent neighbor
-        candidates = has_transparent_neighbor & ~transparent
-
-        if not np.any(candidates):
-            break
-
-        # Batch-compute squared color distance for all candidate pixels
-        diff = arr[:, :, :3] - bg_arr
-        dist_sq = np.sum(diff * diff, axis=2)
-
-        # Pixels to clean: candidates close to background color
-        to_clean = candidates & (dist_sq <= tolerance_sq)
-
-        cleaned_count = int(np.sum(to_clean))
-        if cleaned_count == 0:
+        if len(ys) == 0:
             break
-
-        # Make cleaned pixels fully transparent
-        arr[to_clean] = [0, 0, 0, 0]
-        total_cleaned += cleaned_count
-
-    # Write numpy array back to the image in-place
-    result = Image.fromarray(arr.astype(np.uint8), "RGBA")
-    img.paste(result)
+        ny = np.concatenate((ys - 1, ys + 1, ys, ys))
+        nx = np.concatenate((xs, xs, xs - 1, xs + 1))
+        inside = (ny >= 0) & (ny < h) & (nx >= 0) & (nx < w)
+        flat = np.unique(ny[inside] * w + nx[inside])
+        ny, nx = np.divmod(flat, w)
+
+        pixels = arr[ny, nx]
+        keep = (pixels[:, 3] != 0) & _background_close(pixels, bg_color, fringe_tolerance)
+        ys, xs = ny[keep], nx[keep]
+        arr[ys, xs] = 0
+        total_cleaned += len(ys)
 
     return total_cleaned
 
 
 def clean_semitransparent_fringe(
-    img: Image.Image, bg_color: tuple, fringe_tolerance: int = 80, passes: int = 2
+    img: "Image.Image | np.ndarray",
+    bg_color: tuple,
+    fringe_tolerance: int = 80,
+    passes: int = 2,
+    band_rows: int = DEFAULT_BAND_ROWS,
+    threads: int = 1,
 ) -> int:
     """
     Clean up semi-transparent fringe pixels at sprite edges.
     These are anti-aliasing artifacts where the sprite blends into the background.
+    Modifies img in place — a PIL image or an (h, w, 4) uint8 RGBA array.
 
     Runs multiple passes (default 2) — each pass expands the transparent boundary
     found in the previous pass, catching deeper anti-aliasing artifacts.
 
-    Uses numpy-optimized implementation when available, falls back to
-    pure-Pillow implementation otherwise.
+    Uses numpy-optimized implementation when available (working in bands of
+    band_rows rows, on `threads` tile threads), falls back to pure-Pillow
+    implementation otherwise.
     """
-    if HAS_NUMPY:
-        return _clean_fringe_numpy(img, bg_color, fringe_tolerance, passes)
-    return _clean_fringe_pillow(img, bg_color, fringe_tolerance, passes)
+    if not HAS_NUMPY:
+        return _clean_fringe_pillow(img, bg_color, fringe_tolerance, passes, band_rows)
+    if isinstance(img, np.ndarray):
+        return _clean_fringe_numpy(img, bg_color, fringe_tolerance, passes, band_rows, threads)
+    arr = np.array(img)
+    count = _clean_fringe_numpy(arr, bg_color, fringe_tolerance, passes, band_rows, threads)
+    if count:
+        img.paste(Image.fromarray(arr, "RGBA"))
+    return count
+
+
+def _alpha_bbox(arr: "np.ndarray", threads: int = 1) -> Optional[tuple[int, int, int, int]]:
+    """Bounding box (left, upper, right, lower) of alpha > 0 pixels, like getbbox()."""
+    h, w = arr.shape[:2]
+    col_any = np.zeros(w, dtype=bool)
+    row_any = np.zeros(h, dtype=bool)
+
+    def scan_band(top: int) -> "np.ndarray":
+        opaque = arr[top:top + DEFAULT_BAND_ROWS, :, 3] != 0
+        row_any[top:top + DEFAULT_BAND_ROWS] = opaque.any(axis=1)
+        return opaque.any(axis=0)
+
+    for band_cols in _map_bands(scan_band, h, DEFAULT_BAND_ROWS, threads):
+        col_any |= band_cols
+    cols = np.flatnonzero(col_any)
+    if len(cols) == 0:
+        return None
+    rows = np.flatnonzero(row_any)
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
 
 
-def crop_to_content(img: Image.Image, padding: int = 2) -> Image.Image:
+def crop_to_content(
+    img: "Image.Image | np.ndarray",
+    padding: int = 2,
+    bbox: Optional[tuple[int, int, int, int]] = None,
+    threads: int = 1,
+) -> "Image.Image | np.ndarray":
     """
     Crop image to the bounding box of non-transparent pixels plus padding.
 
-    Uses PIL's Image.getbbox() for efficient bounding-box detection.
+    Uses PIL's Image.getbbox() for efficient bounding-box detection; for an
+    (h, w, 4) RGBA array the bbox comes from the alpha plane and the result
+    is a view of the input (no copy).
     Returns the original image unchanged if it's already smaller than 16x16
-    or if no non-transparent content is found.
+    or if no non-transparent content is found. bbox skips the detection when
+    it is already known (see _stack_alpha_bboxes()); threads is for the
+    array scan (see _map_bands).
     """
-    w, h = img.size
+    is_array = HAS_NUMPY and isinstance(img, np.ndarray)
+    w, h = _buffer_size(img)
 
     # Don't crop if image is already smaller than 16x16
     if w < 16 or h < 16:
         return img
 
     # Get bounding box of non-transparent pixels (alpha > 0)
-    bbox = img.getbbox()
+    if bbox is None:
+        bbox = _alpha_bbox(img, threads) if is_array else img.getbbox()
     if bbox is None:
         # Fully transparent image — return as-is
         return img
@@ -413,9 +1200,221 @@ def crop_to_content(img: Image.Image, padding: int = 2) -> Image.Image:
     if left == 0 and upper == 0 and right == w and lower == h:
         return img
 
+    if is_array:
+        return img[upper:lower, left:right]
     return img.crop((left, upper, right, lower))
 
 
+# --stack: consecutive same-sized images (generator batches all come back at
+# one size) are ripped as one (N, H, W, 4) array, so steps 1-3 of the rip and
+# the crop bounding boxes cost one set of array operations per stack
+# instead of one per image
+DEFAULT_STACK_SIZE = 8
+
+
+def _stack_luts(bg_colors: list[tuple]) -> tuple["np.ndarray", "np.ndarray"]:
+    """_distance_luts() of the distinct colors in bg_colors as a (K, 3, 256)
+    array, and the index into it of each image's color."""
+    colors, lut_of = np.unique(np.array(bg_colors, dtype=np.int32)[:, :3], axis=0, return_inverse=True)
+    return np.stack([_distance_luts(tuple(c)) for c in colors]), lut_of.reshape(-1)
+
+
+def _stack_close(
+    pixels: "np.ndarray", owner: "np.ndarray", luts: "np.ndarray", tolerance: int
+) -> "np.ndarray":
+    """_background_close() for pixels of several images at once.
+
+    luts and owner come from _stack_luts(): owner[i] is the table index of
+    the image pixels[i] is from. Pixels come grouped by image, so each run
+    of one table (the whole stack, for a batch on one background color) is
+    a plain _background_close() lookup.
+    """
+    close = np.empty(pixels.shape[:-1], dtype=bool)
+    if len(owner) == 0:
+        return close
+    bounds = [0, *(np.flatnonzero(owner[1:] != owner[:-1]) + 1).tolist(), len(owner)]
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        lut = luts[owner[first]]
+        dist_sq = lut[0][pixels[first:last, ..., 0]]
+        dist_sq += lut[1][pixels[first:last, ..., 1]]
+        dist_sq += lut[2][pixels[first:last, ..., 2]]
+        np.less_equal(dist_sq, tolerance * tolerance, out=close[first:last])
+    return close
+
+
+def _stack_already_transparent(stack: "np.ndarray", threshold: float = 0.3) -> "np.ndarray":
+    """is_already_transparent() for each image of an (N, H, W, 4) stack."""
+    n, h, w = stack.shape[:3]
+    total_pixels = h * w
+    if total_pixels == 0:
+        return np.zeros(n, dtype=bool)
+    opaque = np.count_nonzero(stack[..., 3].reshape(n, -1), axis=1)
+    return (total_pixels - opaque) / total_pixels > threshold
+
+
+def _stack_background_colors(stack: "np.ndarray") -> list[tuple[tuple, float]]:
+    """detect_background_color() for each image of an (N, H, W, 4) stack."""
+    n, h, w = stack.shape[:3]
+    xs, ys = zip(*_background_sample_points(w, h))
+    samples = stack[:, list(ys), list(xs), :3].astype(np.int32)
+    keys = (samples[..., 0] << 16) | (samples[..., 1] << 8) | samples[..., 2]
+    # Per sample, how often its color occurs; the first sample with the top
+    # count is the color Counter.most_common() picks
+    counts = (keys[:, :, None] == keys[:, None, :]).sum(axis=2)
+    bg = samples[np.arange(n), counts.argmax(axis=1)]
+    # color_distance < 30 is a squared distance < 900
+    near = (((samples - bg[:, None, :]) ** 2).sum(axis=2) < 900).sum(axis=1)
+    return [(tuple(color), count / samples.shape[1]) for color, count in zip(bg.tolist(), near.tolist())]
+
+
+def _flood_fill_remove_stack(
+    stack: "np.ndarray", bg_colors: list[tuple], tolerance: int, band_rows: int = DEFAULT_BAND_ROWS
+) -> "np.ndarray":
+    """
+    _flood_fill_remove_vector() for each image of an (N, H, W, 4) stack, in
+    place, as one flood fill over the stack seen as a single N*H-row image.
+    Runs are given a blank row between images so no run links across an
+    image boundary. Returns the count of pixels made transparent per image.
+    """
+    n, h, w = stack.shape[:3]
+    tall = stack.reshape(n * h, w, 4)
+    luts, lut_of = _stack_luts(bg_colors)
+    rows, starts, ends = [], [], []
+    for top in range(0, n * h, band_rows):
+        band = tall[top:top + band_rows]
+        owner = lut_of[np.arange(top, top + band.shape[0]) // h]
+        band_row, band_start, band_end = _row_runs(_stack_close(band, owner, luts, tolerance))
+        rows.append(band_row + top)
+        starts.append(band_start)
+        ends.append(band_end)
+    run_row, run_start, run_end = (np.concatenate(parts) for parts in (rows, starts, ends))
+    seeds = [(x, i * (h + 1) + y) for i in range(n) for x, y in _edge_seeds(w, h)]
+    keep = _seed_connected_runs(run_row + run_row // h, run_start, run_end, w, seeds)
+    run_row, run_start, run_end = run_row[keep], run_start[keep], run_end[keep]
+    _paint_runs(tall, run_row, run_start, run_end, band_rows)
+    return np.bincount(run_row // h, weights=run_end - run_start, minlength=n).astype(np.int64)
+
+
+def _clean_fringe_stack(
+    stack: "np.ndarray",
+    bg_colors: list[tuple],
+    fringe_tolerance: int = 80,
+    passes: int = 2,
+    band_rows: int = DEFAULT_BAND_ROWS,
+) -> "np.ndarray":
+    """
+    _clean_fringe_numpy() for each image of an (N, H, W, 4) stack, in place:
+    the first pass shifts all N images at once (in slabs of about band_rows
+    image rows), later passes follow one frontier of (image, y, x) pixels.
+    Returns the count cleaned per image.
+    """
+    n, h, w = stack.shape[:3]
+    counts = np.zeros(n, dtype=np.int64)
+    if passes <= 0:
+        return counts
+    luts, lut_of = _stack_luts(bg_colors)
+
+    found_n, found_y, found_x = [], [], []
+    slab = max(1, band_rows // n)
+    for top in range(0, h, slab):
+        bottom = min(h, top + slab)
+        halo_top = max(0, top - 1)
+        transparent = stack[:, halo_top:min(h, bottom + 1), :, 3] == 0
+        core = transparent[:, top - halo_top:top - halo_top + bottom - top]
+        has_transparent_neighbor = np.zeros(core.shape, dtype=bool)
+        has_transparent_neighbor[:, 1:, :] |= core[:, :-1, :]
+        has_transparent_neighbor[:, :-1, :] |= core[:, 1:, :]
+        has_transparent_neighbor[:, :, 1:] |= core[:, :, :-1]
+        has_transparent_neighbor[:, :, :-1] |= core[:, :, 1:]
+        if top > 0:
+            has_transparent_neighbor[:, 0] |= transparent[:, 0]
+        if bottom < h:
+            has_transparent_neighbor[:, -1] |= transparent[:, -1]
+        ns, ys, xs = np.nonzero(has_transparent_neighbor & ~core)
+        ys += top
+        close = _stack_close(stack[ns, ys, xs], lut_of[ns], luts, fringe_tolerance)
+        found_n.append(ns[close])
+        found_y.append(ys[close])
+        found_x.append(xs[close])
+    ns, ys, xs = (np.concatenate(parts) for parts in (found_n, found_y, found_x))
+    stack[ns, ys, xs] = 0
+    counts += np.bincount(ns, minlength=n)
+
+    for _pass in range(passes - 1):
+        if len(ys) == 0:
+            break
+        nn = np.concatenate((ns, ns, ns, ns))
+        ny = np.concatenate((ys - 1, ys + 1, ys, ys))
+        nx = np.concatenate((xs, xs, xs - 1, xs + 1))
+        inside = (ny >= 0) & (ny < h) & (nx >= 0) & (nx < w)
+        flat = np.unique((nn[inside] * h + ny[inside]) * w + nx[inside])
+        nn, rest = np.divmod(flat, h * w)
+        ny, nx = np.divmod(rest, w)
+
+        pixels = stack[nn, ny, nx]
+        keep = (pixels[:, 3] != 0) & _stack_close(pixels, lut_of[nn], luts, fringe_tolerance)
+        ns, ys, xs = nn[keep], ny[keep], nx[keep]
+        stack[ns, ys, xs] = 0
+        counts += np.bincount(ns, minlength=n)
+
+    return counts
+
+
+def _stack_alpha_bboxes(stack: "np.ndarray") -> list[Optional[tuple[int, int, int, int]]]:
+    """_alpha_bbox() for each image of an (N, H, W, 4) stack."""
+    n, h, w = stack.shape[:3]
+    col_any = np.zeros((n, w), dtype=bool)
+    row_any = np.zeros((n, h), dtype=bool)
+    slab = max(1, DEFAULT_BAND_ROWS // n)
+    for top in range(0, h, slab):
+        opaque = stack[:, top:top + slab, :, 3] != 0
+        col_any |= opaque.any(axis=1)
+        row_any[:, top:top + slab] = opaque.any(axis=2)
+    left = col_any.argmax(axis=1)
+    right = w - col_any[:, ::-1].argmax(axis=1)
+    upper = row_any.argmax(axis=1)
+    lower = h - row_any[:, ::-1].argmax(axis=1)
+    return [
+        (int(box[0]), int(box[1]), int(box[2]), int(box[3])) if has_content else None
+        for box, has_content in zip(zip(left, upper, right, lower), col_any.any(axis=1))
+    ]
+
+
+def _remove_background_stack(stack: "np.ndarray", config: "RipConfig") -> list[dict]:
+    """_remove_background() for every image of an (N, H, W, 4) stack, in place.
+
+    Images that turn out to be already transparent are flood filled along
+    with the rest; their result says so and the rip skips them unchanged.
+    """
+    transparent = _stack_already_transparent(stack)
+    if config.bg_detect == "histogram":
+        detected = [_detect_background(img, config) for img in stack]
+    else:
+        detected = [(bg_color, confidence, None) for bg_color, confidence in _stack_background_colors(stack)]
+    bg_colors = [bg_color for bg_color, _confidence, _clusters in detected]
+    if config.flood_engine == "vector":
+        flood = _flood_fill_remove_stack(stack, bg_colors, config.tolerance, config.band_rows)
+    else:
+        flood = [
+            flood_fill_remove(img, bg_color, config.tolerance, engine=config.flood_engine, band_rows=config.band_rows)
+            for img, bg_color in zip(stack, bg_colors)
+        ]
+    fringe = _clean_fringe_stack(stack, bg_colors, passes=config.fringe_passes, band_rows=config.band_rows)
+    bboxes = _stack_alpha_bboxes(stack)
+    return [
+        {"transparent": True} if transparent[i] else {
+            "transparent": False,
+            "bg_color": bg_color,
+            "confidence": confidence,
+            "clusters": clusters,
+            "flood": int(flood[i]),
+            "fringe": int(fringe[i]),
+            "bbox": bboxes[i],
+        }
+        for i, (bg_color, confidence, clusters) in enumerate(detected)
+    ]
+
+
 def split_frames(img: Image.Image, num_frames: int) -> Optional[list[Image.Image]]:
     """
     Split a horizontal sprite strip into N equal-width individual frames.
@@ -429,14 +1428,9 @@ def split_frames(img: Image.Image, num_frames: int) -> Optional[list[Image.Image
     w, h = img.size
     frame_width = w // num_frames
 
-    # Validate: image width must be evenly divisible by N
-    if w % num_frames != 0:
-        print(f"  WARN: Image width {w} not evenly divisible by {num_frames} — skipping split")
-        return None
-
-    # Validate: result frames must be >= 4px wide
-    if frame_width < 4:
-        print(f"  WARN: Frame width {frame_width}px too small (min 4px) — skipping split")
+    problem = _split_frames_problem(w, num_frames)
+    if problem is not None:
+        print(f"  WARN: {problem}")
         return None
 
     frames: list[Image.Image] = []
@@ -449,6 +1443,136 @@ def split_frames(img: Image.Image, num_frames: int) -> Optional[list[Image.Image
     return frames
 
 
+def _split_frames_problem(width: int, num_frames: int) -> Optional[str]:
+    """Why a strip width px wide can't be split into num_frames frames, or None if it can."""
+    # Validate: image width must be evenly divisible by N
+    if width % num_frames != 0:
+        return f"Image width {width} not evenly divisible by {num_frames} — skipping split"
+
+    # Validate: result frames must be >= 4px wide
+    if width // num_frames < 4:
+        return f"Frame width {width // num_frames}px too small (min 4px) — skipping split"
+    return None
+
+
+# --split-frames auto: a column with any opaque pixel belongs to a frame;
+# frames are separated by gutters of at least this many empty columns/rows
+SPLIT_AUTO = "auto"
+AUTO_SPLIT_MIN_GAP = 2
+AUTO_SPLIT_MIN_WIDTH = 4
+# Blobs smaller than this share of the median frame area (stray specks,
+# a detached tail or spark) are merged into the nearest frame
+AUTO_SPLIT_MIN_AREA = 0.125
+
+
+def _occupied_runs(indices: list[int], min_gap: int, min_width: int = 1) -> list[tuple[int, int]]:
+    """[start, end) runs over sorted occupied indices.
+
+    Gaps narrower than min_gap are bridged, and runs narrower than
+    min_width are merged into the closer neighbouring run.
+    """
+    runs: list[list[int]] = []
+    for i in indices:
+        if runs and i - runs[-1][1] < min_gap:
+            runs[-1][1] = i + 1
+        else:
+            runs.append([i, i + 1])
+    k = 0
+    while len(runs) > 1 and k < len(runs):
+        start, end = runs[k]
+        if end - start >= min_width:
+            k += 1
+            continue
+        gap_left = start - runs[k - 1][1] if k > 0 else None
+        gap_right = runs[k + 1][0] - end if k + 1 < len(runs) else None
+        if gap_right is None or (gap_left is not None and gap_left <= gap_right):
+            runs[k - 1][1] = end
+        else:
+            runs[k + 1][0] = start
+        del runs[k]
+        k = max(0, k - 1)
+    return [(start, end) for start, end in runs]
+
+
+def _merge_fragments(
+    boxes: list[tuple[int, int, int, int]], min_share: float = AUTO_SPLIT_MIN_AREA
+) -> list[tuple[int, int, int, int]]:
+    """Fold boxes much smaller than the median frame into their nearest box."""
+    if len(boxes) < 2:
+        return boxes
+    areas = sorted((r - l) * (b - u) for l, u, r, b in boxes)
+    threshold = areas[len(areas) // 2] * min_share
+    boxes = list(boxes)
+    while len(boxes) > 1:
+        small = min(range(len(boxes)), key=lambda i: (boxes[i][2] - boxes[i][0]) * (boxes[i][3] - boxes[i][1]))
+        l, u, r, b = boxes[small]
+        if (r - l) * (b - u) >= threshold:
+            break
+
+        def gap(box: tuple[int, int, int, int]) -> int:
+            return max(0, box[0] - r, l - box[2]) + max(0, box[1] - b, u - box[3])
+
+        near = min((i for i in range(len(boxes)) if i != small), key=lambda i: gap(boxes[i]))
+        nl, nu, nr, nb = boxes[near]
+        boxes[near] = (min(l, nl), min(u, nu), max(r, nr), max(b, nb))
+        del boxes[small]
+    return boxes
+
+
+def detect_frames(
+    img: "Image.Image | np.ndarray", min_gap: int = AUTO_SPLIT_MIN_GAP
+) -> list[tuple[int, int, int, int]]:
+    """
+    Find animation frames in a ripped sheet by alpha projection.
+
+    The alpha mask is projected onto rows to find bands separated by empty
+    gutters, then each band onto columns to find the frames in it. Returns
+    tight (left, upper, right, lower) boxes in row-major order; specks and
+    detached bits are folded into the nearest frame. Poses may drift and
+    differ in width, so nothing needs to divide evenly.
+    """
+    boxes: list[tuple[int, int, int, int]] = []
+    if HAS_NUMPY:
+        alpha = img[:, :, 3] if isinstance(img, np.ndarray) else np.asarray(img.getchannel("A"))
+        opaque = alpha != 0
+        for top, bottom in _occupied_runs(np.flatnonzero(opaque.any(axis=1)).tolist(), min_gap):
+            band = opaque[top:bottom]
+            cols = np.flatnonzero(band.any(axis=0)).tolist()
+            for left, right in _occupied_runs(cols, min_gap, AUTO_SPLIT_MIN_WIDTH):
+                rows = np.flatnonzero(band[:, left:right].any(axis=1))
+                boxes.append((left, top + int(rows[0]), right, top + int(rows[-1]) + 1))
+        return _merge_fragments(boxes)
+
+    # Pillow fallback: per-row/column getbbox() on the alpha channel
+    alpha = img.getchannel("A")
+    w, h = img.size
+    rows = [y for y in range(h) if alpha.crop((0, y, w, y + 1)).getbbox()]
+    for top, bottom in _occupied_runs(rows, min_gap):
+        band = alpha.crop((0, top, w, bottom))
+        cols = [x for x in range(w) if band.crop((x, 0, x + 1, bottom - top)).getbbox()]
+        for left, right in _occupied_runs(cols, min_gap, AUTO_SPLIT_MIN_WIDTH):
+            bbox = band.crop((left, 0, right, bottom - top)).getbbox()
+            boxes.append((left, top + bbox[1], right, top + bbox[3]))
+    return _merge_fragments(boxes)
+
+
+def frame_layout(
+    boxes: list[tuple[int, int, int, int]]
+) -> tuple[tuple[int, int], list[tuple[int, int]]]:
+    """Shared canvas (w, h) for tight frame boxes plus each frame's (x, y) in it.
+
+    Frames are centered horizontally and bottom-aligned, so every pose
+    stands on the same baseline when played back at a fixed origin.
+    """
+    canvas_w = max(right - left for left, _, right, _ in boxes)
+    canvas_h = max(lower - upper for _, upper, _, lower in boxes)
+    offsets = [
+        ((canvas_w - (right - left)) // 2, canvas_h - (lower - upper))
+        for left, upper, right, lower in boxes
+    ]
+    return (canvas_w, canvas_h), offsets
+
+
 def downscale_nearest(img: Image.Image, target_size: int) -> Image.Image:
     """Downscale using nearest-neighbor to preserve pixel art crispness."""
     w, h = img.size
@@ -462,106 +1586,810 @@ def downscale_nearest(img: Image.Image, target_size: int) -> Image.Image:
     return img.resize((new_w, new_h), Image.NEAREST)
 
 
-def _resolve_output_path(image_path: Path, args: argparse.Namespace) -> Path:
-    """Resolve the output path for a processed sprite.
-
-    If --output-dir is set, maps the image path into the output directory,
-    preserving the directory structure relative to the processing root.
-    Otherwise returns the original image_path (overwrite in place).
-    """
-    output_dir = getattr(args, "output_dir", None)
-    if output_dir is None:
-        return image_path
+# --pixel-grid: recover the implied art grid of AI "pixel art" and sample one
+# pixel per logical cell instead of resizing by a fractional factor
+GRID_EDGE_THRESHOLD = 48   # summed RGBA step that counts as a cell edge
+GRID_MIN_CELL = 1.5
+GRID_MAX_CELL = 64
+GRID_MIN_CONFIDENCE = 0.35
+GRID_AGREE_CONFIDENCE = 0.1   # noise scores ~0.03
+GRID_AGREE_TOLERANCE = 0.05
+GRID_SAMPLE_LINES = 128
 
-    output_dir_path = Path(output_dir)
-    processing_root = getattr(args, "_processing_root", None)
 
-    if processing_root is not None:
-        try:
-            relative = image_path.relative_to(processing_root)
-        except ValueError:
-            # Image is outside the processing root — use just the filename
-            relative = Path(image_path.name)
-    else:
-        # Single file mode — use just the filename
-        relative = Path(image_path.name)
+def _edge_profile(arr: "np.ndarray", axis: int) -> "np.ndarray":
+    """Number of color steps between neighbouring columns (axis=1) or rows (axis=0).
 
-    return output_dir_path / relative
+    Transparent pixels count as black, whatever RGB they kept.
+    """
+    # ~128 sampled lines give a clean profile and keep 4K sheets cheap
+    step = max(1, arr.shape[1 - axis] // GRID_SAMPLE_LINES)
+    lines = (arr[::step] if axis == 1 else arr[:, ::step]).astype(np.int16)
+    lines[lines[:, :, 3] == 0] = 0
+    steps = np.abs(np.diff(lines, axis=axis)).sum(axis=2) > GRID_EDGE_THRESHOLD
+    return steps.sum(axis=1 - axis).astype(np.float64)
+
+
+def _grid_phase(profile: "np.ndarray", period: float) -> tuple[float, float]:
+    """(phase, confidence) of a known-period edge comb in a 1-D edge profile."""
+    # Edges sit on the boundary between index x and x + 1
+    positions = np.arange(len(profile)) + 1.0
+    response = np.exp(2j * np.pi * positions / period) @ profile
+    phase = float((np.angle(response) / (2 * np.pi) * period) % period)
+    return phase, float(np.abs(response) / max(profile.sum(), 1.0))
+
+
+def _grid_period(profile: "np.ndarray") -> Optional[tuple[float, float, float]]:
+    """(period, phase, confidence) of the edge comb in a 1-D edge profile.
+
+    Strong autocorrelation peaks (and their halves, for fractional cells
+    like 2.5 px) give candidate periods. Each is scored by the profile's
+    spectrum near frequency 1/p: an edge comb of period p sums coherently
+    at p and at its divisors p/2, p/3... but cancels at 2p, so the largest
+    near-best candidate is the cell size. It's refined with a direct DFT.
+    """
+    n = len(profile)
+    total = profile.sum()
+    max_lag = min(GRID_MAX_CELL, n // 4)
+    if total == 0 or max_lag < 3:
+        return None
+    centered = profile - profile.mean()
+    spectrum = np.fft.rfft(centered, 2 * n)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum))[:max_lag + 2]
+    lags = np.arange(2, max_lag + 1)
+    peaks = lags[(autocorr[lags] >= autocorr[lags - 1]) & (autocorr[lags] >= autocorr[lags + 1])]
+    peaks = peaks[autocorr[peaks] > 0]
+    if len(peaks) == 0:
+        return None
+    strong = peaks[autocorr[peaks] >= 0.4 * autocorr[peaks].max()][:8]
+    candidates = np.concatenate([strong, strong / 2.0])
+
+    # Zero-padded spectrum: bins at least 16x finer than 1 / n, enough to
+    # resolve a comb's peak (about 1 / n wide) at any period
+    size = 1 << (16 * n - 1).bit_length()
+    magnitude = np.abs(np.fft.rfft(profile, size))
+    low = np.ceil(size / (candidates + 1.0)).astype(np.intp)
+    high = np.floor(size / np.maximum(candidates - 1.0, GRID_MIN_CELL)).astype(np.intp)
+    window = np.zeros(len(magnitude), dtype=bool)
+    for lo, hi in zip(low, high):
+        window[lo:hi + 1] = True
+    scores = np.where(window, magnitude, 0.0)
+    peak = int(np.flatnonzero(scores >= 0.8 * scores.max())[0])
+    peak += int(np.argmax(magnitude[peak:peak + size // n]))
+
+    positions = np.arange(n) + 1.0
+    freqs = (peak + np.linspace(-1.0, 1.0, 41)) / size
+    response = np.exp(2j * np.pi * freqs[:, None] * positions[None, :]) @ profile
+    best = int(np.argmax(np.abs(response)))
+    period = float(1.0 / freqs[best])
+    return (period, *_grid_phase(profile, period))
+
+
+def estimate_pixel_grid(arr: "np.ndarray") -> Optional[dict]:
+    """
+    Estimate the logical pixel grid of an (h, w, 4) RGBA sprite.
+
+    Builds per-column and per-row profiles of color-change edges and finds
+    each axis's cell size and phase with _grid_period. Axes that agree on
+    the cell size are trusted down to GRID_AGREE_CONFIDENCE (upscalers that
+    smooth edges leave a weak but consistent comb); otherwise the cells are
+    taken as square and the stronger axis sets the size. Returns {"cell":
+    (x, y), "phase": (x, y), "confidence": c} in source pixels, or None
+    when there's no clear grid (already native-resolution art, painterly
+    sprites).
+    """
+    profiles = [_edge_profile(arr, axis) for axis in (1, 0)]
+    found = [_grid_period(profile) for profile in profiles]
+    if all(g is not None and g[0] >= GRID_MIN_CELL and g[2] >= GRID_AGREE_CONFIDENCE for g in found):
+        (cell_x, phase_x, conf_x), (cell_y, phase_y, conf_y) = found
+        if abs(cell_x - cell_y) <= GRID_AGREE_TOLERANCE * max(cell_x, cell_y):
+            return {
+                "cell": (cell_x, cell_y),
+                "phase": (phase_x, phase_y),
+                "confidence": (conf_x + conf_y) / 2,
+            }
+    strong = [g for g in found if g is not None and g[0] >= GRID_MIN_CELL and g[2] >= GRID_MIN_CONFIDENCE]
+    if not strong:
+        return None
+    cell, _, confidence = max(strong, key=lambda g: g[2])
+    phase_x, phase_y = (_grid_phase(profile, cell)[0] for profile in profiles)
+    return {"cell": (cell, cell), "phase": (phase_x, phase_y), "confidence": confidence}
 
 
-def _backup_original(image_path: Path) -> bool:
-    """Copy the original file to _originals/ subdirectory before overwriting.
+def sample_pixel_grid(arr: "np.ndarray", grid: dict) -> "np.ndarray":
+    """One pixel per grid cell: the middle of each cell's visible part.
 
-    Uses shutil.copy2 to preserve file metadata. Creates _originals/
-    directory if it doesn't exist. Returns True on success, False on error.
+    Border cells cut by the crop are kept if at least half a pixel of them
+    is visible, so no row or column of art is lost.
     """
-    backup_dir = image_path.parent / "_originals"
-    try:
-        backup_dir.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(image_path, backup_dir / image_path.name)
-        return True
-    except (PermissionError, OSError) as e:
-        print(f"  ERROR: Failed to backup {image_path.name}: {e}")
-        return False
+    h, w = arr.shape[:2]
+    picks = []
+    for size, cell, phase in ((w, grid["cell"][0], grid["phase"][0]), (h, grid["cell"][1], grid["phase"][1])):
+        first = math.floor(-phase / cell)
+        starts = phase + np.arange(first, first + int(size / cell) + 3) * cell
+        lo = np.maximum(starts, 0.0)
+        hi = np.minimum(starts + cell, float(size))
+        keep = hi - lo >= 0.5
+        picks.append(np.minimum(((lo + hi) / 2)[keep].astype(np.intp), size - 1))
+    cols, rows = picks
+    return arr[rows[:, None], cols[None, :]]
+
+
+# --palette: snap ripped sprites to an indexed palette and save P-mode PNGs
+# (the last palette index is transparent)
+PALETTE_MODES = ("auto", "character")
+DEFAULT_PALETTE_COLORS = 32
+
+# Key colors per character, from CHARACTER_APPEARANCE in
+# lib/gemini_api_generate.py (keep in sync). --palette character pins each
+# with a shadow and highlight step (the style guide's 2-3 value cel shading)
+# and fills the remaining slots from the sprite itself.
+CHARACTER_KEY_COLORS: dict[str, list[str]] = {
+    "momi": ["#1a1a1a", "#3d2b1a", "#ffffff", "#8B4513"],
+    "cinnamon": ["#1a1a1a", "#C49A5C", "#ffffff", "#8B4513"],
+    "philo": ["#4D4D59", "#ffffff", "#808080", "#8B4513"],
+}
+OUTLINE_COLOR = (0, 0, 0)
 
+_palette_files: dict[Path, list[tuple[int, int, int]]] = {}
 
-def dry_run_file(
-    image_path: Path,
-    args: argparse.Namespace,
-    report_entries: Optional[list] = None,
-) -> str:
-    """Inspect a single file without modifying it (--dry-run mode).
 
-    Opens the image, detects background color and confidence, checks if
-    already transparent. Returns a status string describing what would
-    happen to this file during a real run.
-    When report_entries is provided, appends a dict with per-file metadata.
+def _hex_rgb(value: str) -> tuple[int, int, int]:
+    """'#RRGGBB' or 'RRGGBB' to an (r, g, b) tuple."""
+    value = value.strip().lstrip("#")
+    return int(value[0:2], 16), int(value[2:4], 16), int(value[4:6], 16)
+
+
+def load_palette_file(path: Path) -> list[tuple[int, int, int]]:
     """
-    entry: Optional[dict] = None
-    if report_entries is not None:
-        entry = {
-            "input_path": str(image_path),
-            "output_path": None,
-            "status": None,
-            "background_color": None,
-            "confidence": None,
-            "pixels_removed": None,
-            "removal_percentage": None,
-            "crop_dimensions": None,
-            "split_frame_count": None,
-            "warnings": [],
-            "errors": [],
-        }
+    Read a palette from a .hex (one RRGGBB per line, as exported by Lospec),
+    a GIMP .gpl file, or an image (its distinct opaque colors).
 
-    try:
-        img = Image.open(image_path).convert("RGBA")
-    except PermissionError:
-        if entry is not None:
-            entry["status"] = "error"
-            entry["errors"].append("Permission denied")
-            report_entries.append(entry)
-        return "ERROR: Permission denied"
-    except Exception as e:
-        if entry is not None:
-            entry["status"] = "error"
-            entry["errors"].append(str(e))
-            report_entries.append(entry)
-        return f"ERROR: Cannot open — {e}"
+    Results are memoized per path for the lifetime of the process.
+    """
+    path = Path(path)
+    if path in _palette_files:
+        return _palette_files[path]
+    colors: list[tuple[int, int, int]] = []
+    suffix = path.suffix.lower()
+    if suffix == ".hex":
+        colors = [_hex_rgb(line) for line in path.read_text(encoding="utf-8").split() if line.strip()]
+    elif suffix == ".gpl":
+        for line in path.read_text(encoding="utf-8").splitlines():
+            parts = line.split()
+            if len(parts) >= 3 and all(p.isdigit() for p in parts[:3]):
+                colors.append((int(parts[0]), int(parts[1]), int(parts[2])))
+    else:
+        with Image.open(path) as src:
+            found = src.convert("RGBA").getcolors(maxcolors=1 << 24) or []
+        colors = [rgba[:3] for _, rgba in sorted(found, key=lambda c: -c[0]) if rgba[3] >= 128]
+    colors = list(dict.fromkeys(colors))
+    if not colors or len(colors) > 255:
+        raise ValueError(f"palette {path} has {len(colors)} colors (need 1-255)")
+    _palette_files[path] = colors
+    return colors
+
+
+def _character_palette(name: str) -> list[tuple[int, int, int]]:
+    """Outline color plus shadow/base/highlight steps of a character's key colors."""
+    ramp = [OUTLINE_COLOR]
+    for key in CHARACTER_KEY_COLORS[name]:
+        base = _hex_rgb(key)
+        ramp.append(tuple(int(c * 0.7) for c in base))
+        ramp.append(base)
+        ramp.append(tuple(c + int((255 - c) * 0.35) for c in base))
+    return list(dict.fromkeys(ramp))
+
+
+def _palette_file_for(image_path: Path, palette_dir: Path) -> Optional[Path]:
+    """<character>.hex/.gpl/.png (by filename prefix) or <category>.* in palette_dir."""
+    character = image_path.stem.split("_", 1)[0]
+    for name in (character, image_path.parent.name):
+        for suffix in (".hex", ".gpl", ".png"):
+            candidate = palette_dir / f"{name}{suffix}"
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def _resolve_palette(
+    image_path: Optional[Path], args: argparse.Namespace
+) -> tuple[list[tuple[int, int, int]], bool, str]:
+    """Palette for image_path under --palette as (colors, fixed, label).
+
+    Fixed palettes (from a file) are snapped to as-is; otherwise colors are
+    pinned and the rest of --palette-colors is derived from the sprite.
+    A directory holds <character>.hex / <category>.hex files (.gpl and .png
+    work too), looked up by filename prefix, then by parent folder name;
+    sprites with neither (or no image_path, for rip_image) get an auto
+    palette.
+    """
+    mode: str = args.palette
+    if mode == "auto":
+        return [], False, "auto"
+    if mode == "character":
+        character = image_path.stem.split("_", 1)[0] if image_path is not None else None
+        if character in CHARACTER_KEY_COLORS:
+            return _character_palette(character), False, f"character:{character}"
+        return [], False, "auto"
+
+    source = Path(mode)
+    if source.is_dir():
+        source = _palette_file_for(image_path, source) if image_path is not None else None
+        if source is None:
+            return [], False, "auto"
+    return load_palette_file(source), True, source.name
+
+
+def derive_palette(
+    img: Image.Image, colors: int, pinned: list[tuple[int, int, int]] = ()
+) -> list[tuple[int, int, int]]:
+    """
+    Median-cut palette of a sprite's opaque pixels, after the pinned colors.
 
+    Only pixels with alpha >= 128 are counted, so the removed background
+    never takes a palette slot. Returns at most `colors` distinct colors.
+    """
+    pinned = list(dict.fromkeys(pinned))[:colors]
+    slots = colors - len(pinned)
+    if slots <= 0:
+        return pinned
+    if HAS_NUMPY:
+        arr = np.asarray(img)
+        opaque = np.ascontiguousarray(arr[arr[:, :, 3] >= 128][:, :3])
+        if len(opaque) == 0:
+            return pinned or [OUTLINE_COLOR]
+        strip = Image.frombytes("RGB", (len(opaque), 1), opaque.tobytes())
+    else:
+        found = img.getcolors(maxcolors=img.size[0] * img.size[1]) or []
+        data = b"".join(bytes(rgba[:3]) * count for count, rgba in found if rgba[3] >= 128)
+        if not data:
+            return pinned or [OUTLINE_COLOR]
+        strip = Image.frombytes("RGB", (len(data) // 3, 1), data)
+    quantized = strip.quantize(colors=slots, method=Image.Quantize.MEDIANCUT)
+    flat = quantized.getpalette()
+    derived = [tuple(flat[i * 3:i * 3 + 3]) for _, i in sorted(quantized.getcolors(), key=lambda c: -c[0])]
+    return list(dict.fromkeys(pinned + derived))
+
+
+# Distinct colors quantize_to_palette's Pillow path matches in Python
+# before giving up on narrowing the palette
+QUANTIZE_MAX_COLORS = 4096
+
+
+def _nearest_index_pillow(
+    channels: list[Image.Image], palette: list[tuple[int, int, int]], candidates: list[int]
+) -> Image.Image:
+    """'I' image of the nearest candidate palette index per pixel (first on ties)."""
+    index = Image.new("I", channels[0].size, candidates[0])
+    best = None
+    for k in candidates:
+        r, g, b = (channel.point([(v - c) ** 2 for v in range(256)], "I") for channel, c in zip(channels, palette[k]))
+        if hasattr(ImageMath, "lambda_eval"):  # Pillow >= 10.3
+            dist = ImageMath.lambda_eval(lambda a: a["r"] + a["g"] + a["b"], r=r, g=g, b=b)
+            if best is not None:
+                index = ImageMath.lambda_eval(lambda a: a["i"] + (a["e"] < a["d"]) * (k - a["i"]), i=index, e=dist, d=best)
+                dist = ImageMath.lambda_eval(lambda a: a["min"](a["d"], a["e"]), d=best, e=dist)
+        else:
+            dist = ImageMath.eval("r + g + b", r=r, g=g, b=b)
+            if best is not None:
+                index = ImageMath.eval(f"i + (e < d) * ({k} - i)", i=index, e=dist, d=best)
+                dist = ImageMath.eval("min(d, e)", d=best, e=dist)
+        best = dist
+    return index
+
+
+def _quantize_to_palette_pillow(img: Image.Image, palette: list[tuple[int, int, int]]) -> Image.Image:
+    """quantize_to_palette without numpy, in Pillow's C code.
+
+    Pillow has no C operation that maps an arbitrary RGB color to an index
+    (point() tables are per channel, and convert("P")'s palette cache bins
+    colors, so it isn't exact nearest-color). So the distinct colors from
+    getcolors() are matched in Python only to narrow the palette to the
+    entries some pixel can snap to, and every pixel then takes the exact
+    nearest of those through point() distance tables and ImageMath, a band
+    of DEFAULT_BAND_ROWS rows at a time.
+    """
     w, h = img.size
+    transparent = len(palette)
+    found = img.getcolors(maxcolors=QUANTIZE_MAX_COLORS)
+    if found is None:
+        candidates = list(range(len(palette)))
+    else:
+        candidates = sorted({
+            min(range(len(palette)), key=lambda k: sum((c - p) ** 2 for c, p in zip(color[:3], palette[k])))
+            for _count, color in found if color[3] >= 128
+        }) or [0]
+    out = Image.new("L", (w, h), transparent)
+    for top in range(0, h, DEFAULT_BAND_ROWS):
+        band = img.crop((0, top, w, min(h, top + DEFAULT_BAND_ROWS)))
+        *channels, alpha = band.split()
+        indices = _nearest_index_pillow(channels, palette, candidates).convert("L")
+        out.paste(indices, (0, top), mask=alpha.point([0] * 128 + [255] * 128))
+    return Image.frombytes("P", (w, h), out.tobytes())
+
+
+def quantize_to_palette(img: Image.Image, palette: list[tuple[int, int, int]]) -> Image.Image:
+    """
+    Snap an RGBA sprite to palette, returning a P-mode image.
+
+    Each distinct color is matched once (nearest in RGB, first index on
+    ties) and mapped back through np.unique's inverse index. Alpha is
+    binarized at 128; index len(palette) is transparent (saved as the PNG
+    tRNS entry).
+    """
+    transparent = len(palette)
+    if HAS_NUMPY:
+        arr = np.asarray(img)
+        h, w = arr.shape[:2]
+        packed = (arr[:, :, 0].astype(np.uint32) << 16) | (arr[:, :, 1].astype(np.uint32) << 8) | arr[:, :, 2]
+        uniq, inverse = np.unique(packed.ravel(), return_inverse=True)
+        uniq_rgb = np.stack(((uniq >> 16) & 255, (uniq >> 8) & 255, uniq & 255), axis=1).astype(np.int32)
+        pal = np.asarray(palette, dtype=np.int32)
+        nearest = np.empty(len(uniq), dtype=np.uint8)
+        # Chunked so a 4K sprite's distinct colors don't build a huge distance matrix
+        for start in range(0, len(uniq), 16384):
+            diff = uniq_rgb[start:start + 16384, None, :] - pal[None, :, :]
+            nearest[start:start + 16384] = np.argmin((diff * diff).sum(axis=2), axis=1)
+        indices = nearest[inverse.ravel()].reshape(h, w)
+        indices[arr[:, :, 3] < 128] = transparent
+        out = Image.fromarray(indices, "P")
+    else:
+        out = _quantize_to_palette_pillow(img, palette)
+    out.putpalette([c for rgb in palette for c in rgb] + [0, 0, 0])
+    out.info["transparency"] = transparent
+    return out
+
+
+# Per-image memory budget (--memory-budget). Peak RSS is measured per image
+# by resetting the kernel's high-water mark (Linux); elsewhere the process
+# lifetime peak is reported, which is still an upper bound.
+MIN_BAND_ROWS = 16
+# Temporaries per pixel of a band: int32 distances, LUT gather, masks, run edges
+BAND_BYTES_PER_PIXEL = 32
+
+
+def _proc_status_mb(field: str) -> Optional[float]:
+    """A memory field of /proc/self/status (e.g. "VmRSS") in MB, or None."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the process peak-RSS high-water mark; False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak RSS since the last _reset_peak_rss() (or process start) in MB."""
+    peak = _proc_status_mb("VmHWM")
+    if peak is None and resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        peak = maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+    return peak
+
+
+def _budget_band_rows(w: int, h: int, budget_mb: float) -> int:
+    """Band height that fits --memory-budget once the image is decoded.
+
+    Whatever the budget leaves above the current RSS (which already holds
+    the decoded RGBA buffer) is spent on band temporaries. Never below
+    MIN_BAND_ROWS.
+    """
+    rss = _proc_status_mb("VmRSS") or 0.0
+    spare = (budget_mb - rss) * 1024 * 1024
+    rows = int(spare // max(1, w * BAND_BYTES_PER_PIXEL))
+    return max(MIN_BAND_ROWS, min(h, rows))
+
+
+# Source modes whose Pillow pixel layout already matches RGBA bytes
+DIRECT_DECODE_LAYOUTS = {"RGBA": "RGBA", "RGB": "RGBX"}
+
+
+def _decode_direct(src: Image.Image, arr: "np.ndarray") -> bool:
+    """Decode an opened, not yet loaded PNG straight into arr's memory.
+
+    Pillow has no public API for decoding into a caller's buffer, so this
+    hands the file an image core that wraps arr before loading it:
+    ImageFile.load() only allocates its own (in load_prepare) when none is
+    set. That is a Pillow implementation detail, verified on Pillow 12.3; if
+    a release changes it the decode lands elsewhere, this returns False and
+    the caller falls back to copying (bench_rip_sprites.py warns when that
+    happens). Returns True when arr holds the decoded pixels.
+    """
+    layout = DIRECT_DECODE_LAYOUTS.get(src.mode)
+    if not layout or src.format != "PNG" or "transparency" in src.info:
+        return False
+    h, w = arr.shape[:2]
+    target = Image.frombuffer(layout, (w, h), arr, "raw", layout, 0, 1)
+    src.im = target.im
+    src.load()
+    return src.im is target.im
+
+
+def _decode_rgba(
+    image_path: "Path | io.BytesIO", out: "Optional[np.ndarray]" = None
+) -> "Image.Image | np.ndarray":
+    """Decode an image file once into an RGBA buffer.
+
+    Returns an (h, w, 4) uint8 array when numpy is available (the decoded
+    PIL image is released once copied), otherwise a PIL RGBA image. With
+    out (an (h, w, 4) uint8 array, e.g. one image of a --stack) the pixels
+    are decoded into it and out is returned; a file of another size raises
+    ValueError.
+    """
+    with Image.open(image_path) as src:
+        if not HAS_NUMPY:
+            return src.convert("RGBA")
+        w, h = src.size
+        if out is None:
+            arr = np.empty((h, w, 4), dtype=np.uint8)
+        elif out.shape[:2] != (h, w):
+            raise ValueError(f"{w}x{h} image does not fit a {out.shape[1]}x{out.shape[0]} buffer")
+        else:
+            arr = out
+        # PNGs stored as RGBA (or RGB, which Pillow holds as RGBX with an
+        # opaque X) decode straight into the array's memory
+        if _decode_direct(src, arr):
+            return arr
+        # Copy (and convert) in row bands so the array is the only extra
+        # full-size buffer, even for RGB / palette sources
+        for top in range(0, h, DEFAULT_BAND_ROWS):
+            band = src.crop((0, top, w, min(h, top + DEFAULT_BAND_ROWS)))
+            arr[top:top + DEFAULT_BAND_ROWS] = np.asarray(band if band.mode == "RGBA" else band.convert("RGBA"))
+    return arr
+
+
+def _to_image(sprite: "Image.Image | np.ndarray") -> Image.Image:
+    """PIL image for a sprite buffer, consuming it.
+
+    A cropped view is compacted to the start of the memory it views, row by
+    row (each row moves to or before where it was, so no unread row is
+    overwritten and the rows never leave the cropped image's own buffer,
+    even when that is one image of a --stack), and the image wraps that
+    memory instead of a copy.
+    """
+    if not (HAS_NUMPY and isinstance(sprite, np.ndarray)):
+        return sprite
+    base = sprite.base
+    if (
+        not sprite.flags.c_contiguous
+        and isinstance(base, np.ndarray)
+        and base.flags.c_contiguous
+        and base.flags.writeable
+        and base.dtype == sprite.dtype
+    ):
+        h, w = sprite.shape[:2]
+        start = sprite.__array_interface__["data"][0] - base.__array_interface__["data"][0]
+        compact = base.reshape(-1)[start:start + h * w * 4].reshape(h, w, 4)
+        for y in range(h):
+            compact[y] = sprite[y]
+        sprite = compact
+    return Image.fromarray(np.ascontiguousarray(sprite), "RGBA")
+
+
+def _has_alpha_in_top_rows(sprite: "Image.Image | np.ndarray", rows: int) -> bool:
+    """True if any pixel in the top `rows` rows is not fully opaque."""
+    w, h = _buffer_size(sprite)
+    if HAS_NUMPY and isinstance(sprite, np.ndarray):
+        return bool(np.any(sprite[:min(rows, h), :, 3] < 255))
+    return any(sprite.getpixel((x, y))[3] < 255 for x in range(w) for y in range(min(rows, h)))
+
+
+# --encode-profile: how every output image (sprite, frames, preview, atlas
+# pages) is written. None keeps Pillow's PNG defaults.
+ENCODE_PROFILES: dict[str, dict] = {
+    "fast": {"format": "PNG", "suffix": ".png", "params": {"compress_level": 1}},
+    "release": {"format": "PNG", "suffix": ".png", "params": {"optimize": True}},
+    "webp-lossless": {"format": "WEBP", "suffix": ".webp", "params": {"lossless": True}},
+}
+DEFAULT_ENCODE = {"format": "PNG", "suffix": ".png", "params": {}}
+
+
+def _encode_profile(args: argparse.Namespace) -> dict:
+    """Format, file suffix and Pillow save params for --encode-profile."""
+    return ENCODE_PROFILES.get(getattr(args, "encode_profile", None) or "", DEFAULT_ENCODE)
+
+
+def _save_image(
+    img: Image.Image,
+    path: "Path | io.BytesIO",
+    args: argparse.Namespace,
+    encoded: Optional[list] = None,
+) -> None:
+    """Save img with the --encode-profile settings.
+
+    When encoded is provided, appends the path, output bytes and encode
+    time of the written file.
+    """
+    profile = _encode_profile(args)
+    start = time.perf_counter()
+    img.save(path, profile["format"], **profile["params"])
+    seconds = time.perf_counter() - start
+    if encoded is not None:
+        size = path.tell() if isinstance(path, io.BytesIO) else path.stat().st_size
+        encoded.append({"path": str(path), "bytes": size, "seconds": round(seconds, 4)})
+
+
+def _resolve_output_path(image_path: Path, args: argparse.Namespace) -> Path:
+    """Resolve the output path for a processed sprite.
+
+    If --output-dir is set, maps the image path into the output directory,
+    preserving the directory structure relative to the processing root.
+    Otherwise returns the original image_path (overwrite in place). An
+    --encode-profile with another format swaps the suffix (.webp), so
+    in-place runs then write next to the original instead of over it.
+    """
+    suffix = _encode_profile(args)["suffix"]
+    output_dir = getattr(args, "output_dir", None)
+    if output_dir is None:
+        return image_path.with_suffix(suffix) if suffix != image_path.suffix else image_path
+
+    output_dir_path = Path(output_dir)
+    processing_root = getattr(args, "_processing_root", None)
+
+    if processing_root is not None:
+        try:
+            relative = image_path.relative_to(processing_root)
+        except ValueError:
+            # Image is outside the processing root — use just the filename
+            relative = Path(image_path.name)
+    else:
+        # Single file mode — use just the filename
+        relative = Path(image_path.name)
+
+    output_path = output_dir_path / relative
+    return output_path.with_suffix(suffix) if suffix != output_path.suffix else output_path
+
+
+def _backup_original(image_path: Path) -> bool:
+    """Copy the original file to _originals/ subdirectory before overwriting.
+
+    Uses shutil.copy2 to preserve file metadata. Creates _originals/
+    directory if it doesn't exist. Returns True on success, False on error.
+    """
+    backup_dir = image_path.parent / "_originals"
+    try:
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(image_path, backup_dir / image_path.name)
+        return True
+    except (PermissionError, OSError) as e:
+        print(f"  ERROR: Failed to backup {image_path.name}: {e}")
+        return False
+
+
+def _new_report_entry(image_path: Path) -> dict:
+    """Create an empty _rip_report.json entry for image_path."""
+    return {"input_path": str(image_path), "output_path": None, **_new_rip_stats()}
+
+
+# --profile: wall time (and with "memory", tracemalloc allocation peaks) per
+# pipeline stage in each report entry, summarized in the report summary
+PROFILE_MODES = ("time", "memory")
+PROFILE_STAGES = (
+    "decode", "detect_background", "flood_fill", "fringe", "crop",
+    "pixel_grid", "downscale", "palette", "write",
+)
+SLOWEST_FILES = 5
+
+
+def _start_profile(args: argparse.Namespace, entry: Optional[dict]) -> Optional[dict]:
+    """Profiling state for one rip_sprite() call, or None when not profiling."""
+    mode = getattr(args, "profile", None)
+    if mode is None or entry is None:
+        return None
+    profile = {"entry": entry, "memory": mode == "memory"}
+    entry["timings"] = {}
+    if profile["memory"]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profile["base"] = tracemalloc.get_traced_memory()[0]
+        entry["peak_alloc_mb"] = {}
+    profile["last"] = time.perf_counter()
+    return profile
+
+
+def _end_stage(profile: Optional[dict], stage: str) -> None:
+    """Charge the time (and allocation peak) since the previous stage to stage.
+
+    Allocation peaks are MB above what was traced when the file started.
+    """
+    if profile is None:
+        return
+    entry = profile["entry"]
+    entry["timings"][stage] = round(time.perf_counter() - profile["last"], 4)
+    if profile["memory"]:
+        peak = tracemalloc.get_traced_memory()[1] - profile["base"]
+        entry["peak_alloc_mb"][stage] = round(max(0, peak) / (1024 * 1024), 2)
+        tracemalloc.reset_peak()
+    profile["last"] = time.perf_counter()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending, non-empty list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _stage_summary(file_results: Iterable[dict]) -> Optional[dict]:
+    """p50/p95/max per stage and the slowest files, from profiled entries."""
+    profiled = [
+        {"input_path": e["input_path"], "timings": e["timings"], "peak_alloc_mb": e.get("peak_alloc_mb", {})}
+        for e in file_results if e.get("timings")
+    ]
+    if not profiled:
+        return None
+    seconds: dict[str, list[float]] = {}
+    peaks: dict[str, list[float]] = {}
+    for e in profiled:
+        for stage, value in e["timings"].items():
+            seconds.setdefault(stage, []).append(value)
+        for stage, value in e.get("peak_alloc_mb", {}).items():
+            peaks.setdefault(stage, []).append(value)
+
+    stages = {}
+    for stage in sorted(seconds, key=PROFILE_STAGES.index):
+        values = sorted(seconds[stage])
+        stats = {
+            "files": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "max": values[-1],
+            "total": round(sum(values), 4),
+        }
+        if stage in peaks:
+            stats["peak_alloc_mb_max"] = max(peaks[stage])
+        stages[stage] = stats
+
+    slowest = sorted(profiled, key=lambda e: sum(e["timings"].values()), reverse=True)[:SLOWEST_FILES]
+    return {
+        "stage_seconds": stages,
+        "slowest_files": [
+            {
+                "input_path": e["input_path"],
+                "seconds": round(sum(e["timings"].values()), 4),
+                "slowest_stage": max(e["timings"], key=e["timings"].get),
+            }
+            for e in slowest
+        ],
+    }
+
+
+def _print_stage_summary(stage_summary: dict) -> None:
+    """Console version of the --profile summary."""
+    print(f"  {'Stage':<18}{'p50':>9}{'p95':>9}{'max':>9}{'total':>9}")
+    for stage, stats in stage_summary["stage_seconds"].items():
+        print(f"  {stage:<18}" + "".join(f"{stats[k]:>8.3f}s" for k in ("p50", "p95", "max", "total")))
+    print("  Slowest files:")
+    for slow in stage_summary["slowest_files"]:
+        print(f"    {Path(slow['input_path']).name}: {slow['seconds']:.3f}s (mostly {slow['slowest_stage']})")
+
+
+def _clusters_for_report(clusters: list[tuple[tuple, float]]) -> list[dict]:
+    """Background clusters as JSON-friendly report dicts."""
+    return [{"color": list(color), "share": round(share, 4)} for color, share in clusters]
+
+
+def _probe_image(image_path: Path, args: argparse.Namespace) -> dict:
+    """Gather everything --dry-run reports for a file, decoding as little as possible.
+
+    Dimensions come from the PNG header. Images without an alpha channel or
+    tRNS chunk are known to have no transparency without decoding pixels;
+    RGBA images count alpha == 0 with a C-level channel histogram. Background
+    detection reads only the border pixels of the (RGB or RGBA) image, so no
+    full RGBA conversion or numpy copy is made. PNG row filters chain from
+    row to row, so the bottom border still requires inflating the stream.
+    Returns a dict with width, height, transparent_fraction and — unless the
+    image is already transparent — background_color, confidence, clusters.
+    """
+    with Image.open(image_path) as img:
+        w, h = img.size
+        total_pixels = w * h
+        probe: dict = {"width": w, "height": h, "transparent_fraction": 0.0}
+
+        if img.mode not in ("RGB", "RGBA") or "transparency" in img.info:
+            img = img.convert("RGBA")
+        if img.mode == "RGBA" and total_pixels:
+            transparent = img.getchannel("A").histogram()[0]
+            probe["transparent_fraction"] = transparent / total_pixels
+        if total_pixels == 0 or probe["transparent_fraction"] > 0.3:
+            return probe
+
+        bg_color, confidence, clusters = _detect_background(img, args)
+        probe["background_color"] = list(bg_color)
+        probe["confidence"] = confidence
+        probe["clusters"] = _clusters_for_report(clusters) if clusters else None
+    return probe
+
+
+def _probe_is_fresh(probe: dict, image_path: Path, args: argparse.Namespace) -> bool:
+    """True if a cached probe was taken from this exact file with the same detector."""
+    try:
+        st = image_path.stat()
+    except OSError:
+        return False
+    return (
+        probe.get("size") == st.st_size
+        and probe.get("mtime_ns") == st.st_mtime_ns
+        and probe.get("bg_detect") == getattr(args, "bg_detect", "sample")
+        and probe.get("bg_clusters") == getattr(args, "bg_clusters", 1)
+    )
+
+
+def dry_run_file(
+    image_path: Path,
+    args: argparse.Namespace,
+    report_entries: Optional[list] = None,
+    probes: Optional[dict] = None,
+) -> str:
+    """Inspect a single file without modifying it (--dry-run mode).
+
+    Reads the header, checks if already transparent and detects background
+    color and confidence (see _probe_image). Returns a status string
+    describing what would happen to this file during a real run.
+    When report_entries is provided, appends a dict with per-file metadata.
+    When probes is provided (keyed like the rip cache), a probe taken from the
+    same file contents is reused instead of opening the image, and new
+    probes are stored there.
+    """
+    entry: Optional[dict] = None
+    if report_entries is not None:
+        entry = _new_report_entry(image_path)
+
+    key = _cache_input_key(image_path, args) if probes is not None else None
+    probe = probes.get(key) if probes is not None else None
+    if probe is None or not _probe_is_fresh(probe, image_path, args):
+        try:
+            probe = _probe_image(image_path, args)
+        except PermissionError:
+            if entry is not None:
+                entry["status"] = "error"
+                entry["errors"].append("Permission denied")
+                report_entries.append(entry)
+            return "ERROR: Permission denied"
+        except Exception as e:
+            if entry is not None:
+                entry["status"] = "error"
+                entry["errors"].append(str(e))
+                report_entries.append(entry)
+            return f"ERROR: Cannot open — {e}"
+        if probes is not None:
+            st = image_path.stat()
+            probe.update({
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "bg_detect": getattr(args, "bg_detect", "sample"),
+                "bg_clusters": getattr(args, "bg_clusters", 1),
+            })
+            probes[key] = probe
+
+    w, h = probe["width"], probe["height"]
 
     # Check already transparent
-    if is_already_transparent(img):
+    if probe["transparent_fraction"] > 0.3:
         if entry is not None:
             entry["status"] = "skip"
             entry["warnings"].append("already transparent")
             report_entries.append(entry)
         return f"SKIP: already transparent ({w}x{h})"
 
-    # Detect background
-    bg_color, confidence = detect_background_color(img)
-
-    r, g, b = bg_color
+    # Detected background
+    r, g, b = probe["background_color"]
+    confidence = probe["confidence"]
+    clusters = probe["clusters"]
     confidence_str = f"{confidence:.0%}"
     if confidence < 0.3:
         confidence_str += " LOW"
@@ -570,333 +2398,2449 @@ def dry_run_file(
         entry["status"] = "would_process"
         entry["background_color"] = [r, g, b]
         entry["confidence"] = round(confidence, 4)
+        if clusters is not None and len(clusters) > 1:
+            entry["background_clusters"] = clusters
         report_entries.append(entry)
 
-    return f"WOULD PROCESS: {w}x{h} — BG rgb({r},{g},{b}) ({confidence_str})"
+    result = f"WOULD PROCESS: {w}x{h} — BG rgb({r},{g},{b}) ({confidence_str})"
+    if clusters is not None and len(clusters) > 1:
+        extra = ", ".join(
+            f"rgb({c['color'][0]},{c['color'][1]},{c['color'][2]}) {c['share']:.0%}"
+            for c in clusters[1:]
+        )
+        result += f" + {extra}"
+    return result
 
 
-def rip_sprite(
-    image_path: Path,
-    args: argparse.Namespace,
-    progress_prefix: str = "",
-    report_entries: Optional[list] = None,
-) -> str:
+def _dry_run_worker(
+    image_path: Path, args: argparse.Namespace, want_report: bool, probe: Optional[dict]
+) -> tuple[str, Optional[list], Optional[dict]]:
+    """Process-pool entry point for --dry-run --jobs N.
+
+    Returns (status string, report entries, probe) for the parent to merge.
+    """
+    entries: Optional[list] = [] if want_report else None
+    key = _cache_input_key(image_path, args)
+    probes = {key: probe} if probe is not None else {}
+    result = dry_run_file(image_path, args, report_entries=entries, probes=probes)
+    return result, entries, probes.get(key)
+
+
+@dataclasses.dataclass(frozen=True)
+class RipConfig:
+    """Everything that decides how a sprite is ripped (not where it's written).
+
+    Field names match the CLI's argparse dests, so a RipConfig goes
+    wherever the ripping functions read those settings from args.
+    band_rows is the flood-fill band height (--memory-budget shrinks it)
+    and tile_threads the threads those bands are spread over (0 = one per
+    CPU); neither changes the result.
+    """
+    tolerance: int = DEFAULT_TOLERANCE
+    scale: Optional[int] = None
+    crop: bool = True
+    padding: int = 2
+    fringe_passes: int = 2
+    flood_engine: str = "vector"
+    bg_detect: str = "sample"
+    bg_clusters: int = 1
+    pixel_grid: bool = False
+    palette: Optional[str] = None
+    palette_colors: int = DEFAULT_PALETTE_COLORS
+    split_frames: "int | str | None" = None
+    band_rows: int = DEFAULT_BAND_ROWS
+    tile_threads: int = 1
+
+
+def _rip_config(args: argparse.Namespace, **overrides) -> RipConfig:
+    """RipConfig of the CLI args, with overrides (e.g. a folder's auto scale)."""
+    values = {f.name: getattr(args, f.name) for f in dataclasses.fields(RipConfig) if hasattr(args, f.name)}
+    values.update(overrides)
+    return RipConfig(**values)
+
+
+def _new_rip_stats() -> dict:
+    """Empty stats record of one rip (the _rip_report.json fields)."""
+    return {
+        "status": None,
+        "background_color": None,
+        "confidence": None,
+        "pixels_removed": None,
+        "removal_percentage": None,
+        "crop_dimensions": None,
+        "split_frame_count": None,
+        "warnings": [],
+        "errors": [],
+    }
+
+
+def _rgba_buffer(source: "Image.Image | np.ndarray") -> "Image.Image | np.ndarray":
+    """A private RGBA buffer (as _decode_rgba returns) holding a copy of source."""
+    if HAS_NUMPY and isinstance(source, np.ndarray):
+        if (source.ndim != 3 or source.shape[2] not in (3, 4) or source.dtype != np.uint8
+                or 0 in source.shape[:2]):
+            raise ValueError(f"Expected a non-empty (h, w, 3) or (h, w, 4) uint8 array, got {source.shape} {source.dtype}")
+        arr = np.empty(source.shape[:2] + (4,), dtype=np.uint8)
+        arr[:, :, :source.shape[2]] = source
+        if source.shape[2] == 3:
+            arr[:, :, 3] = 255
+        return arr
+    if isinstance(source, Image.Image):
+        if 0 in source.size:
+            raise ValueError(f"Expected a non-empty image, got {source.size[0]}x{source.size[1]}")
+        rgba = source.convert("RGBA")  # a copy even when source is RGBA
+        return np.array(rgba) if HAS_NUMPY else rgba
+    raise TypeError(f"Can't rip a {type(source).__name__} (expected a PIL image, ndarray or encoded bytes)")
+
+
+def rip_image(
+    source: "Image.Image | np.ndarray | bytes",
+    config: Optional[RipConfig] = None,
+    path: "str | Path | None" = None,
+) -> dict:
+    """
+    Rip one sprite in memory, with the same steps and results as the CLI.
+
+    source is a PIL image, an (h, w, 3|4) uint8 array or the bytes of an
+    encoded image; it isn't modified. Nothing is read from or written to
+    disk (except a --palette file or directory in config) and nothing is
+    printed. path, e.g. "characters/momi_idle.png", is only used to look up
+    character and directory palettes. An array of another shape or dtype,
+    or an empty array or image, raises ValueError.
+
+    Returns a dict with:
+        status      "processed", "skipped" or "failed"
+        image       the ripped PIL image (None unless processed)
+        frames      its split frames with config.split_frames, else None
+        rgba_image  the image before palette quantization (None without one)
+        stats       the _rip_report.json fields: background, removal, crop,
+                    grid, palette, frames, warnings and errors
+        log         the progress lines the CLI prints under the file's line
+    """
+    config = config or RipConfig()
+    stats = _new_rip_stats()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        try:
+            sprite = _decode_rgba(io.BytesIO(source))
+        except Exception as e:
+            stats["status"] = "failed"
+            stats["errors"].append(str(e))
+            return {"status": "failed", "image": None, "frames": None, "rgba_image": None,
+                    "stats": stats, "log": []}
+    else:
+        sprite = _rgba_buffer(source)
+    return _rip_buffer(sprite, config, Path(path) if path is not None else None, stats)
+
+
+def _remove_background(
+    sprite: "Image.Image | np.ndarray", config: RipConfig, profile: Optional[dict] = None
+) -> dict:
+    """
+    Steps 1-3 of the rip on one RGBA buffer, in place: detect the background,
+    flood-fill it away from the edges and clean the fringe.
+
+    Returns {"transparent": True} for an image that is already transparent
+    (left untouched), else its bg_color, confidence, clusters and the flood
+    and fringe pixel counts. _remove_background_stack() gives the same
+    results (plus each crop bbox) for a --stack of images.
+    """
+    if is_already_transparent(sprite, threads=config.tile_threads):
+        return {"transparent": True}
+
+    # Step 1: Detect background
+    bg_color, confidence, clusters = _detect_background(sprite, config)
+    _end_stage(profile, "detect_background")
+
+    # Step 2: Flood-fill remove from edges
+    flood = flood_fill_remove(
+        sprite, bg_color, config.tolerance, engine=config.flood_engine,
+        band_rows=config.band_rows, threads=config.tile_threads,
+    )
+    _end_stage(profile, "flood_fill")
+
+    # Step 3: Clean fringe (multi-pass)
+    fringe = clean_semitransparent_fringe(
+        sprite, bg_color, passes=config.fringe_passes,
+        band_rows=config.band_rows, threads=config.tile_threads,
+    )
+    _end_stage(profile, "fringe")
+
+    return {
+        "transparent": False,
+        "bg_color": bg_color,
+        "confidence": confidence,
+        "clusters": clusters,
+        "flood": flood,
+        "fringe": fringe,
+    }
+
+
+def _rip_buffer(
+    sprite: "Image.Image | np.ndarray",
+    config: RipConfig,
+    path: Optional[Path],
+    stats: dict,
+    profile: Optional[dict] = None,
+    removal: Optional[dict] = None,
+) -> dict:
     """
-    Remove background and optionally downscale a sprite.
+    rip_image() on a decoded RGBA buffer, which is modified in place.
 
     Strategy:
     1. Detect background color from corners/edges
     2. Flood-fill from corners to remove connected background
     3. Clean semi-transparent fringe pixels
-    4. Crop to content bounding box (if --crop enabled)
+    4. Crop to content bounding box (if config.crop)
+    4b. Sample one pixel per cell of the detected art grid (if config.pixel_grid)
     5. Optionally downscale with nearest-neighbor
-    6. Split into individual frames (if --split-frames N specified)
-    7. Save with transparency
+    5b. Quantize to an indexed palette (if config.palette)
+    6. Split into individual frames (if config.split_frames N|auto)
+
+    Fills stats (the CLI passes its report entry). Its confidence and
+    removal_percentage are exact; the report rounds them. removal is the
+    _remove_background_stack() result for a sprite whose steps 1-3 were
+    done as part of a --stack.
+    """
+    log: list[str] = []
+    result = {"status": None, "image": None, "frames": None, "rgba_image": None, "stats": stats, "log": log}
+
+    def finish(status: str) -> dict:
+        result["status"] = stats["status"] = status
+        return result
+
+    w, h = _buffer_size(sprite)
+
+    if removal is None:
+        removal = _remove_background(sprite, config, profile)
+
+    # Already mostly transparent — nothing to rip
+    if removal["transparent"]:
+        stats["warnings"].append("already transparent")
+        return finish("skipped")
+
+    stats["background_color"] = list(removal["bg_color"])
+    stats["confidence"] = removal["confidence"]
+    clusters = removal["clusters"]
+    if clusters is not None and len(clusters) > 1:
+        stats["background_clusters"] = _clusters_for_report(clusters)
+    fringe_cleaned: int = removal["fringe"]
+    transparent_count: int = removal["flood"] + fringe_cleaned
+
+    pct = (transparent_count / (w * h)) * 100
+    stats["pixels_removed"] = transparent_count
+    stats["removal_percentage"] = pct
+    if transparent_count == 0:
+        if _has_alpha_in_top_rows(sprite, 3):
+            stats["warnings"].append("already has transparency")
+        else:
+            stats["warnings"].append("no background removed — manual check needed")
+        return finish("skipped")
+    if pct <= 20:
+        stats["warnings"].append("low removal percentage — check manually")
+    if fringe_cleaned > 0:
+        log.append(f"+ {fringe_cleaned} fringe pixels cleaned")
+
+    # Step 4: Crop to content bounding box
+    if config.crop:
+        sprite = crop_to_content(sprite, config.padding, bbox=removal.get("bbox"), threads=config.tile_threads)
+        crop_w, crop_h = _buffer_size(sprite)
+        if (crop_w, crop_h) != (w, h):
+            log.append(f"CROP: {w}x{h} → {crop_w}x{crop_h} (padding={config.padding})")
+            stats["crop_dimensions"] = {"before": [w, h], "after": [crop_w, crop_h]}
+    _end_stage(profile, "crop")
+
+    # Step 4b: Resample to the art's native pixel grid
+    if config.pixel_grid and HAS_NUMPY and isinstance(sprite, np.ndarray):
+        grid = estimate_pixel_grid(sprite)
+        if grid is None:
+            log.append("GRID: none detected — keeping fractional --scale")
+            stats["pixel_grid"] = None
+            stats["warnings"].append("no pixel grid detected")
+        else:
+            pre_grid_size = _buffer_size(sprite)
+            sprite = sample_pixel_grid(sprite, grid)
+            cell_x, cell_y = grid["cell"]
+            log.append(f"GRID: {cell_x:.2f}x{cell_y:.2f}px cells → "
+                       f"{pre_grid_size[0]}x{pre_grid_size[1]} → {sprite.shape[1]}x{sprite.shape[0]}")
+            stats["pixel_grid"] = {
+                "cell": [round(cell_x, 3), round(cell_y, 3)],
+                "phase": [round(v, 3) for v in grid["phase"]],
+                "confidence": round(grid["confidence"], 4),
+                "native_size": [sprite.shape[1], sprite.shape[0]],
+            }
+        _end_stage(profile, "pixel_grid")
+
+    # Back to a PIL image (from the cropped view, in its own buffer) for
+    # resize, split and encode
+    img = _to_image(sprite)
+    del sprite
+
+    # Step 5: Downscale if target specified
+    if config.scale:
+        pre_scale_size = img.size
+        img = downscale_nearest(img, config.scale)
+        log.append(f"SCALE: {pre_scale_size[0]}x{pre_scale_size[1]} → {img.size[0]}x{img.size[1]}")
+    _end_stage(profile, "downscale")
+
+    # Step 5b: Quantize to an indexed palette
+    if config.palette:
+        try:
+            palette, fixed, palette_label = _resolve_palette(path, config)
+        except (OSError, ValueError) as e:
+            log.append(f"ERROR: Cannot load palette: {e}")
+            stats["errors"].append(f"Cannot load palette: {e}")
+            return finish("failed")
+        if not fixed:
+            palette = derive_palette(img, config.palette_colors, palette)
+        result["rgba_image"] = img
+        img = quantize_to_palette(img, palette)
+        log.append(f"PALETTE: {palette_label} → {len(palette)} colors")
+        stats["palette"] = {"source": palette_label, "colors": len(palette)}
+        _end_stage(profile, "palette")
+    result["image"] = img
+
+    # Step 6: Split into individual frames
+    num_frames = config.split_frames
+    if num_frames is not None:
+        frames: Optional[list[Image.Image]] = None
+        frame_boxes: Optional[list[tuple[int, int, int, int]]] = None
+        if num_frames == SPLIT_AUTO:
+            # Gutters are found on the alpha channel, from before quantizing
+            frame_boxes = detect_frames(img if result["rgba_image"] is None else result["rgba_image"])
+            if len(frame_boxes) > 1:
+                frames = [img.crop(box) for box in frame_boxes]
+            else:
+                log.append(f"WARN: Auto split found {len(frame_boxes)} frame(s) — skipping split")
+        else:
+            problem = _split_frames_problem(img.size[0], num_frames)
+            if problem is None:
+                frames = split_frames(img, num_frames)
+            else:
+                log.append(f"WARN: {problem}")
+        if frames is not None:
+            result["frames"] = frames
+            stats["split_frame_count"] = len(frames)
+            if frame_boxes is not None:
+                (canvas_w, canvas_h), offsets = frame_layout(frame_boxes)
+                stats["frame_canvas"] = [canvas_w, canvas_h]
+                stats["frames"] = [
+                    {"box": list(box), "offset": list(offset)}
+                    for box, offset in zip(frame_boxes, offsets)
+                ]
+        else:
+            stats["warnings"].append(f"split-frames {num_frames} skipped — validation failed")
+
+    return finish("processed")
+
+
+def _print_rip_progress(result: dict, image_path: Path, progress_prefix: str, indent: str) -> None:
+    """Print the CLI's line for a rip_image() result, then its progress lines."""
+    stats = result["stats"]
+    name = image_path.name
+    if "already transparent" in stats["warnings"]:
+        if progress_prefix:
+            print(f"{progress_prefix} SKIP — already transparent")
+        else:
+            print(f"  SKIP: already transparent — {name}")
+    elif stats["background_color"] is not None:
+        r, g, b = stats["background_color"]
+        conf_str = f"{stats['confidence']:.0%}"
+        if stats["confidence"] < 0.3:
+            conf_str += " LOW"
+        removed: int = stats["pixels_removed"]
+        pct: float = stats["removal_percentage"]
+        has_alpha = "already has transparency" in stats["warnings"]
+        if progress_prefix:
+            if removed == 0 and has_alpha:
+                print(f"{progress_prefix} SKIP — already has transparency")
+            else:
+                print(f"{progress_prefix} BG rgb({r},{g},{b}) ({conf_str}) → {removed} removed ({pct:.1f}%)")
+        elif removed == 0:
+            if has_alpha:
+                print(f"  OK {name}: Already has transparency")
+            else:
+                print(f"  WARN {name}: No background removed — manual check needed")
+        else:
+            status = "OK" if pct > 20 else "WARN (low removal — check manually)"
+            print(f"  {status} {name}: {removed} pixels removed ({pct:.1f}%)")
+    for line in result["log"]:
+        print(f"{indent}{line}")
+
+
+def rip_sprite(
+    image_path: Path,
+    args: argparse.Namespace,
+    progress_prefix: str = "",
+    report_entries: Optional[list] = None,
+    outputs: Optional[list] = None,
+    thumbnails: Optional[dict] = None,
+    decoded: "Optional[Future]" = None,
+    write_behind: Optional[ThreadPoolExecutor] = None,
+    config: Optional[RipConfig] = None,
+    removal: Optional[dict] = None,
+    before_write: Optional[Callable[[list[Path]], None]] = None,
+) -> "str | Future":
+    """
+    Rip a sprite file: decode it, rip_image() it, print its progress and
+    save the results (7. Save with transparency).
 
     Returns status string: "processed", "skipped", or "failed".
+    config defaults to the RipConfig of args.
     When report_entries is provided, appends a dict with per-file metadata.
+    When outputs is provided, appends the Path of every file written.
+    When thumbnails is provided, stores a contact-sheet thumbnail of the
+    saved sprite under its output path.
+
+    For the threaded I/O pipeline: decoded is a Future of this file's
+    _decode_rgba() buffer (prefetched by a reader thread), and with
+    write_behind the saving is submitted to that executor — a Future of
+    the status is returned instead, see _write_sprite_outputs. With
+    --stack, removal is the _remove_background_stack() result for the
+    decoded buffer (a view into its stack). before_write is called with
+    every path the write stage will save (split frames, sprite, preview)
+    just before it starts or is handed to write_behind.
     """
-    tolerance: int = args.tolerance
-    target_size: Optional[int] = args.scale
-    save_preview: bool = not args.no_preview
+    config = config or _rip_config(args)
     indent = "       " if progress_prefix else "  "
 
     # Report entry — populated incrementally during processing
-    entry: Optional[dict] = None
-    if report_entries is not None:
-        entry = {
-            "input_path": str(image_path),
-            "output_path": None,
-            "status": None,
-            "background_color": None,
-            "confidence": None,
-            "pixels_removed": None,
-            "removal_percentage": None,
-            "crop_dimensions": None,
-            "split_frame_count": None,
-            "warnings": [],
-            "errors": [],
-        }
+    entry = _new_report_entry(image_path)
+    profile = _start_profile(args, entry)
+
+    # Peak RSS is measured from here when a --memory-budget is set
+    memory_budget: Optional[float] = getattr(args, "memory_budget", None)
+    if memory_budget is not None:
+        _reset_peak_rss()
 
+    # Decode once. With numpy, every stage up to crop works in place on this
+    # single uint8 RGBA buffer (or views of it); a PIL image is only rebuilt
+    # for resize/split/encode.
     try:
-        img = Image.open(image_path).convert("RGBA")
+        sprite = decoded.result() if decoded is not None else _decode_rgba(image_path)
     except Exception as e:
         if progress_prefix:
             print(f"{progress_prefix} ERROR — {e}")
         else:
             print(f"  ERROR {image_path}: {e}")
-        if entry is not None:
-            entry["status"] = "failed"
-            entry["errors"].append(str(e))
+        entry["status"] = "failed"
+        entry["errors"].append(str(e))
+        if report_entries is not None:
             report_entries.append(entry)
         return "failed"
 
-    w, h = img.size
-    total_pixels = w * h
+    _end_stage(profile, "decode")
+    if memory_budget is not None:
+        w, h = _buffer_size(sprite)
+        # One band in flight at a time, so no tile threads
+        config = dataclasses.replace(config, band_rows=_budget_band_rows(w, h, memory_budget), tile_threads=1)
+
+    result = _rip_buffer(sprite, config, image_path, entry, profile, removal)
+    del sprite
+    _print_rip_progress(result, image_path, progress_prefix, indent)
+    for key, digits in (("confidence", 4), ("removal_percentage", 2)):
+        if entry[key] is not None:
+            entry[key] = round(entry[key], digits)
+    if result["status"] != "processed":
+        if report_entries is not None:
+            report_entries.append(entry)
+        return result["status"]
 
-    # Check if image is already mostly transparent — skip processing
-    if is_already_transparent(img):
-        if progress_prefix:
-            print(f"{progress_prefix} SKIP — already transparent")
+    # Determine output path (--output-dir or overwrite in place)
+    output_path = _resolve_output_path(image_path, args)
+    entry["output_path"] = str(output_path)
+
+    # Create output directory if needed (--output-dir)
+    if output_path != image_path:
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        except (PermissionError, OSError) as e:
+            print(f"{indent}ERROR: Cannot create output directory {output_path.parent}: {e}")
+            entry["status"] = "failed"
+            entry["errors"].append(f"Cannot create output directory: {e}")
+            if report_entries is not None:
+                report_entries.append(entry)
+            return "failed"
+
+    # Backup original before overwriting (only when not using --output-dir)
+    if getattr(args, "backup", False) and output_path == image_path:
+        _backup_original(image_path)
+
+    if before_write is not None:
+        frame_count = len(result["frames"]) if result["frames"] is not None else 0
+        planned = [_frame_path(image_path, output_path, idx) for idx in range(1, frame_count + 1)]
+        planned.append(output_path)
+        if _per_file_previews(args):
+            planned.append(_preview_path(output_path))
+        before_write(planned)
+
+    finish = functools.partial(
+        _write_sprite_outputs, image_path, output_path, args, result,
+        report_entries, outputs, thumbnails, profile, config.band_rows,
+    )
+    if write_behind is not None:
+        # Lines printed by the write stage go to what stdout is now — the
+        # caller's per-file buffer
+        return write_behind.submit(finish, indent, sys.stdout)
+    return finish(indent, sys.stdout)
+
+
+def _frame_path(image_path: Path, output_path: Path, idx: int) -> Path:
+    """Output path of split frame idx (1-based) of image_path."""
+    return output_path.parent / f"{image_path.stem}_frame_{idx:02d}{output_path.suffix}"
+
+
+def _preview_path(output_path: Path) -> Path:
+    """Per-sprite checkerboard preview path (--preview file) of an output."""
+    return output_path.with_name(output_path.stem + "_preview" + output_path.suffix)
+
+
+def _write_sprite_outputs(
+    image_path: Path,
+    output_path: Path,
+    args: argparse.Namespace,
+    result: dict,
+    report_entries: Optional[list],
+    outputs: Optional[list],
+    thumbnails: Optional[dict],
+    profile: Optional[dict],
+    band_rows: int,
+    indent: str,
+    out: TextIO,
+) -> str:
+    """
+    The write stage of rip_sprite: encode and save a rip_image() result —
+    the sprite, its split frames and preview — and complete its report
+    entry (result["stats"]).
+
+    Prints to out instead of stdout, so it can run on a write-behind
+    thread while the next file is being ripped. Returns the status string.
+    """
+    img: Image.Image = result["image"]
+    frames: Optional[list[Image.Image]] = result["frames"]
+    entry: dict = result["stats"]
+    memory_budget: Optional[float] = getattr(args, "memory_budget", None)
+
+    # Path, bytes and encode time of every image written below
+    encoded: list[dict] = []
+
+    # Step 6 (cont.): Save the split frames
+    if frames is not None:
+        for idx, frame in enumerate(frames, start=1):
+            frame_path = _frame_path(image_path, output_path, idx)
+            frame_name = frame_path.name
+            try:
+                _save_image(frame, frame_path, args, encoded)
+                if outputs is not None:
+                    outputs.append(frame_path)
+            except (PermissionError, OSError) as e:
+                print(f"{indent}ERROR: Failed to save frame {frame_path}: {e}", file=out)
+                entry["errors"].append(f"Failed to save frame {frame_name}: {e}")
+        if "frame_canvas" in entry:
+            canvas_w, canvas_h = entry["frame_canvas"]
+            print(f"{indent}SPLIT: auto → {len(frames)} frames (canvas {canvas_w}x{canvas_h}, bottom-aligned)", file=out)
         else:
-            print(f"  SKIP: already transparent — {image_path.name}")
-        if entry is not None:
-            entry["status"] = "skipped"
-            entry["warnings"].append("already transparent")
-            report_entries.append(entry)
-        return "skipped"
+            print(f"{indent}SPLIT: {len(frames)} frames ({frames[0].size[0]}x{frames[0].size[1]} each)", file=out)
+
+    # Step 7: Save
+    try:
+        _save_image(img, output_path, args, encoded)
+    except (PermissionError, OSError) as e:
+        print(f"{indent}ERROR: Failed to save {output_path}: {e}", file=out)
+        entry["status"] = "failed"
+        entry["errors"].append(f"Failed to save: {e}")
+        if report_entries is not None:
+            report_entries.append(entry)
+        return "failed"
+    if outputs is not None:
+        outputs.append(output_path)
+    if thumbnails is not None:
+        thumbnails[output_path] = _sheet_thumbnail(img)
+
+    if report_entries is not None and result["rgba_image"] is not None:
+        # Compare against what the RGBA save would have written
+        buffer = io.BytesIO()
+        _save_image(result["rgba_image"], buffer, args)
+        entry["palette"]["bytes_saved"] = buffer.tell() - output_path.stat().st_size
+
+    # Save preview with checkerboard
+    if _per_file_previews(args):
+        preview = _make_checkerboard(img.size[0], img.size[1]).copy()
+        overlay = img.convert("RGBA") if img.mode == "P" else img
+        preview.paste(overlay, (0, 0), overlay)
+        preview_path = _preview_path(output_path)
+        try:
+            _save_image(preview, preview_path, args, encoded)
+            if outputs is not None:
+                outputs.append(preview_path)
+        except (PermissionError, OSError) as e:
+            print(f"{indent}ERROR: Failed to save preview {preview_path}: {e}", file=out)
+
+    # Splitting, encoding and writing every output (sprite, frames, preview)
+    _end_stage(profile, "write")
+
+    if memory_budget is not None:
+        peak_mb = _peak_rss_mb()
+        over = peak_mb is not None and peak_mb > memory_budget
+        peak_str = "unknown" if peak_mb is None else f"{peak_mb:.0f} MB"
+        print(f"{indent}MEMORY: peak {peak_str} of {memory_budget:g} MB budget "
+              f"({band_rows}-row bands){' — OVER BUDGET' if over else ''}", file=out)
+        entry["memory"] = {
+            "peak_rss_mb": None if peak_mb is None else round(peak_mb, 1),
+            "budget_mb": memory_budget,
+            "band_rows": band_rows,
+        }
+        if over:
+            entry["warnings"].append(f"peak RSS {peak_mb:.0f} MB exceeded --memory-budget {memory_budget:g} MB")
+
+    entry["status"] = "processed"
+    entry["encode"] = {
+        "profile": getattr(args, "encode_profile", None) or "default",
+        "bytes": sum(e["bytes"] for e in encoded),
+        "seconds": round(sum(e["seconds"] for e in encoded), 4),
+        "files": encoded,
+    }
+    if report_entries is not None:
+        report_entries.append(entry)
+
+    return "processed"
+
+
+@functools.lru_cache(maxsize=16)
+def _make_checkerboard(w: int, h: int, tile_size: int = 8) -> Image.Image:
+    """Create a checkerboard pattern image for transparency preview.
+
+    Results are kept in a small LRU keyed by size and shared between
+    callers, so paste onto a copy() rather than into the returned image.
+
+    Uses numpy array broadcasting when available for fastest generation.
+    Falls back to PIL tile+paste which is still much faster than per-pixel.
+    """
+    c1 = (200, 200, 200, 255)
+    c2 = (255, 255, 255, 255)
+
+    if HAS_NUMPY:
+        # Numpy broadcasting: build entire checkerboard in one vectorized operation
+        y_idx = np.arange(h) // tile_size
+        x_idx = np.arange(w) // tile_size
+        # (h,1) + (1,w) broadcasts to (h,w) checkerboard mask
+        checker = (y_idx[:, np.newaxis] + x_idx[np.newaxis, :]) % 2
+        # Build RGBA array: where checker==0 -> c1, checker==1 -> c2
+        arr = np.empty((h, w, 4), dtype=np.uint8)
+        arr[checker == 0] = c1
+        arr[checker == 1] = c2
+        return Image.fromarray(arr, "RGBA")
+
+    # PIL fallback: create a single 2x2 tile and paste it across the image
+    tile_w = tile_size * 2
+    tile_h = tile_size * 2
+    tile = Image.new("RGBA", (tile_w, tile_h))
+    tile.paste(Image.new("RGBA", (tile_size, tile_size), c1), (0, 0))
+    tile.paste(Image.new("RGBA", (tile_size, tile_size), c2), (tile_size, 0))
+    tile.paste(Image.new("RGBA", (tile_size, tile_size), c2), (0, tile_size))
+    tile.paste(Image.new("RGBA", (tile_size, tile_size), c1), (tile_size, tile_size))
+
+    img = Image.new("RGBA", (w, h))
+    for y in range(0, h, tile_h):
+        for x in range(0, w, tile_w):
+            img.paste(tile, (x, y))
+    return img
+
+
+def _print_banner(args: argparse.Namespace, file_count: int, dry_run: bool = False) -> None:
+    """Print config banner matching gemini_api_generate.py style."""
+    print("\n" + "=" * 70)
+    print("MOMI'S ADVENTURE — SPRITE RIPPER")
+    print("=" * 70)
+    print(f"\nTolerance: {args.tolerance}")
+    crop_on = getattr(args, "crop", True)
+    padding = getattr(args, "padding", 2)
+    print(f"Crop: {'on' if crop_on else 'off'} (padding={padding})")
+    fringe_passes = getattr(args, "fringe_passes", 2)
+    print(f"Fringe passes: {fringe_passes}")
+    flood_engine = getattr(args, "flood_engine", "vector")
+    if flood_engine != "vector":
+        print(f"Flood engine: {flood_engine}")
+    bg_detect = getattr(args, "bg_detect", "sample")
+    if bg_detect != "sample":
+        bg_clusters = getattr(args, "bg_clusters", 1)
+        suffix = f" (top {bg_clusters} clusters)" if bg_clusters > 1 else ""
+        print(f"BG detect: {bg_detect}{suffix}")
+    print(f"Files: {file_count}")
+    output_dir = getattr(args, "output_dir", None)
+    if output_dir:
+        print(f"Output: {output_dir}")
+    else:
+        print(f"Output: overwrite in-place")
+    if args.scale:
+        print(f"Scale: {args.scale}px (longest edge)")
+    if getattr(args, "pixel_grid", False):
+        print("Pixel grid: on (one pixel per detected art cell)")
+    if getattr(args, "backup", False):
+        print("Backup: on")
+    split_frames_n = getattr(args, "split_frames", None)
+    if split_frames_n:
+        print(f"Split frames: {split_frames_n}")
+    palette_mode = getattr(args, "palette", None)
+    if palette_mode:
+        palette_colors = getattr(args, "palette_colors", DEFAULT_PALETTE_COLORS)
+        suffix = f" ({palette_colors} colors)" if palette_mode in PALETTE_MODES else ""
+        print(f"Palette: {palette_mode}{suffix}")
+    if args.no_preview:
+        print("Preview: off")
+    elif not dry_run:
+        preview_mode = getattr(args, "preview", "file")
+        print(f"Preview: {'contact sheet per folder' if preview_mode == 'sheet' else 'per file'}")
+    encode_profile = getattr(args, "encode_profile", None)
+    if encode_profile:
+        print(f"Encode: {encode_profile}")
+    if getattr(args, "atlas", False) and not dry_run:
+        print(f"Atlas: on (pages up to {getattr(args, 'atlas_size', 2048)}px)")
+    if getattr(args, "report", False):
+        print("Report: _rip_report.json")
+    profile_mode = getattr(args, "profile", None)
+    if profile_mode and not dry_run:
+        allocations = " + allocation peaks" if profile_mode == "memory" else ""
+        print(f"Profile: per-stage timings{allocations} in report")
+    if getattr(args, "no_cache", False):
+        print("Cache: off")
+    skip_duplicates = getattr(args, "skip_duplicates", None)
+    if skip_duplicates is not None and not dry_run:
+        print(f"Skip duplicates: within {skip_duplicates} bits ({PHASH_INDEX_FILENAME})")
+    if getattr(args, "resume", False):
+        print(f"Resume: on (skipping files done in {JOURNAL_FILENAME})")
+    memory_budget = getattr(args, "memory_budget", None)
+    if memory_budget is not None and not dry_run:
+        print(f"Memory budget: {memory_budget:g} MB peak RSS per image")
+    if getattr(args, "watch", False):
+        print("Watch: on (keeps running after this pass)")
+    jobs = getattr(args, "jobs", 1)
+    if jobs != 1:
+        print(f"Jobs: {_resolve_jobs(args, file_count)}")
+    io_threads = getattr(args, "io_threads", DEFAULT_IO_THREADS)
+    if io_threads != DEFAULT_IO_THREADS and not dry_run:
+        print(f"I/O threads: {io_threads or 'off (sequential reads and writes)'}")
+    stack = getattr(args, "stack", None)
+    if stack and not dry_run:
+        active = _stack_size(args) and _resolve_jobs(args, file_count) == 1
+        print(f"Stack: up to {stack} same-sized images at a time" + ("" if active else " (off with these options)"))
+    tile_threads = getattr(args, "tile_threads", 1)
+    if tile_threads != 1 and not dry_run:
+        off = " (off with --memory-budget)" if memory_budget is not None else ""
+        print(f"Tile threads: {tile_threads or os.cpu_count() or 1} per image "
+              f"({DEFAULT_BAND_ROWS}-row tiles){off}")
+    if dry_run:
+        print("\nMode: DRY RUN — no files will be modified")
+    print("=" * 70)
+
+
+def _write_report(
+    report_path: Path,
+    file_results: "list[dict] | Callable[[], Iterable[dict]]",
+    summary: dict,
+) -> None:
+    """Write _rip_report.json with per-file results and summary stats.
+
+    file_results is a list, or a function returning a fresh iterator over
+    the entries (streamed from the run journal, so a huge run is never held
+    in memory). Written entry by entry in json.dump's indent=2 layout.
+    """
+    entries = file_results if callable(file_results) else lambda: file_results
+    stage_summary = _stage_summary(entries())
+    if stage_summary is not None:
+        summary = {**summary, **stage_summary}
+        _print_stage_summary(stage_summary)
+    try:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write('{\n  "summary": ')
+            f.write(json.dumps(summary, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+            f.write(',\n  "files": [')
+            separator = "\n    "
+            for entry in entries():
+                f.write(separator + json.dumps(entry, indent=2, ensure_ascii=False).replace("\n", "\n    "))
+                separator = ",\n    "
+            f.write("]\n}" if separator == "\n    " else "\n  ]\n}")
+        print(f"  Report: {report_path}")
+    except (PermissionError, OSError) as e:
+        print(f"  ERROR: Failed to write report {report_path}: {e}")
+
+
+# Texture atlases — pack the ripped sprites of each output folder into a few
+# power-of-two pages plus a Godot SpriteFrames resource (--atlas).
+ATLAS_DIRNAME = "_atlas"
+ATLAS_SPACING = 1  # transparent gutter between packed frames (no filter bleed)
+
+
+def _next_pow2(n: int) -> int:
+    """Smallest power of two >= n (and >= 1)."""
+    return 1 << max(0, n - 1).bit_length()
+
+
+def _skyline_pack(
+    sizes: list[tuple[int, int]], width: int, height: int
+) -> list[Optional[tuple[int, int]]]:
+    """Skyline bottom-left packing of (w, h) rects into a width x height page.
+
+    The skyline is a list of [x, y, w] segments covering the page width;
+    each rect goes where its top edge ends up lowest (leftmost on ties).
+    Returns the (x, y) of every rect in input order, or None where it
+    didn't fit.
+    """
+    skyline = [[0, 0, width]]
+    placements: list[Optional[tuple[int, int]]] = []
+    for rw, rh in sizes:
+        best: Optional[tuple[int, int, int, int]] = None  # (top, x, index, y)
+        for i, (x, _, _) in enumerate(skyline):
+            if x + rw > width:
+                break
+            # Resting height = highest segment under [x, x + rw)
+            y = 0
+            j = i
+            span = 0
+            while span < rw:
+                y = max(y, skyline[j][1])
+                span += skyline[j][2]
+                j += 1
+            if y + rh <= height and (best is None or (y + rh, x) < best[:2]):
+                best = (y + rh, x, i, y)
+        if best is None:
+            placements.append(None)
+            continue
+        top, x, i, y = best
+        placements.append((x, y))
+
+        # Raise the skyline over [x, x + rw) and trim the segments it covers
+        skyline.insert(i, [x, top, rw])
+        right = x + rw
+        j = i + 1
+        while j < len(skyline) and skyline[j][0] < right:
+            seg = skyline[j]
+            overlap = right - seg[0]
+            if overlap >= seg[2]:
+                del skyline[j]
+                continue
+            seg[0] += overlap
+            seg[2] -= overlap
+            break
+        # Merge neighbours at the same height
+        j = 0
+        while j < len(skyline) - 1:
+            if skyline[j][1] == skyline[j + 1][1]:
+                skyline[j][2] += skyline[j + 1][2]
+                del skyline[j + 1]
+            else:
+                j += 1
+    return placements
+
+
+def _pack_atlas_pages(
+    sizes: list[tuple[int, int]], max_size: int, spacing: int = 0
+) -> list[tuple[int, int, dict[int, tuple[int, int]]]]:
+    """Distribute rects over as few power-of-two pages as possible.
+
+    Rects are packed tallest first into max_size pages; each page is then
+    re-packed into the smallest power-of-two page (by area, squarest first)
+    that still holds all of its rects. Every rect is packed with a spacing
+    gutter on its right and bottom, which may hang off the page edge.
+    Returns (width, height, {rect index: (x, y)}) per page. Rects larger
+    than max_size are left out.
+    """
+    padded = [(w + spacing, h + spacing) for w, h in sizes]
+    order = sorted(
+        (i for i, (w, h) in enumerate(sizes) if w <= max_size and h <= max_size),
+        key=lambda i: (sizes[i][1], sizes[i][0]),
+        reverse=True,
+    )
+    pages: list[tuple[int, int, dict[int, tuple[int, int]]]] = []
+    while order:
+        placed = _skyline_pack([padded[i] for i in order], max_size + spacing, max_size + spacing)
+        page = {i: pos for i, pos in zip(order, placed) if pos is not None}
+        order = [i for i, pos in zip(order, placed) if pos is None]
+
+        # Shrink the page: try smaller power-of-two sizes that fit the area
+        members = sorted(page, key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+        area = sum(sizes[i][0] * sizes[i][1] for i in members)
+        min_w = _next_pow2(max(sizes[i][0] for i in members))
+        min_h = _next_pow2(max(sizes[i][1] for i in members))
+        candidates = sorted(
+            ((pw, ph)
+             for pw in (1 << e for e in range(min_w.bit_length() - 1, max_size.bit_length()))
+             for ph in (1 << e for e in range(min_h.bit_length() - 1, max_size.bit_length()))
+             if pw * ph >= area and pw * ph < max_size * max_size),
+            key=lambda s: (s[0] * s[1], abs(s[0].bit_length() - s[1].bit_length()), -s[0]),
+        )
+        page_w, page_h = max_size, max_size
+        for pw, ph in candidates:
+            fitted = _skyline_pack([padded[i] for i in members], pw + spacing, ph + spacing)
+            if all(pos is not None for pos in fitted):
+                page = dict(zip(members, fitted))
+                page_w, page_h = pw, ph
+                break
+        pages.append((page_w, page_h, page))
+    return pages
+
+
+def _sheet_frames(
+    img: Image.Image, args: argparse.Namespace
+) -> list[tuple[tuple[int, int, int, int], tuple[int, int], tuple[int, int]]]:
+    """Frames of a ripped sheet as (box, offset in canvas, canvas size).
+
+    Mirrors the frames rip_sprite wrote for --split-frames N or auto (auto
+    frames keep their shared-baseline canvas); a sheet that wasn't split
+    is a single frame.
+    """
+    w, h = img.size
+    num_frames: "int | str | None" = getattr(args, "split_frames", None)
+    if num_frames == SPLIT_AUTO:
+        boxes = detect_frames(img)
+        if len(boxes) > 1:
+            canvas, offsets = frame_layout(boxes)
+            return [(box, offset, canvas) for box, offset in zip(boxes, offsets)]
+    elif num_frames and w % num_frames == 0 and w // num_frames >= 4:
+        frame_width = w // num_frames
+        return [
+            ((i * frame_width, 0, (i + 1) * frame_width, h), (0, 0), (frame_width, h))
+            for i in range(num_frames)
+        ]
+    return [((0, 0, w, h), (0, 0), (w, h))]
+
+
+def _res_path(path: Path, relative_to: Path) -> str:
+    """Godot resource path: res:// inside the project, else relative to the .tres."""
+    try:
+        return "res://" + path.resolve().relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return os.path.relpath(path, relative_to).replace(os.sep, "/")
+
+
+def _write_sprite_frames(
+    tres_path: Path,
+    page_paths: list[Path],
+    textures: list[tuple[int, tuple[int, int, int, int], tuple[int, int, int, int]]],
+    animations: list[tuple[str, list[int]]],
+) -> None:
+    """Write a Godot 4 SpriteFrames .tres with one AtlasTexture per packed frame.
+
+    textures holds (page index, region (x, y, w, h), margin (x, y, w, h)) and
+    animations maps each sheet name to its frames' texture indices.
+    """
+    lines = [f'[gd_resource type="SpriteFrames" load_steps={len(page_paths) + len(textures) + 1} format=3]', ""]
+    for p, page_path in enumerate(page_paths, start=1):
+        lines.append(f'[ext_resource type="Texture2D" path="{_res_path(page_path, tres_path.parent)}" id="{p}_atlas"]')
+    lines.append("")
+    for t, (page, region, margin) in enumerate(textures, start=1):
+        lines.append(f'[sub_resource type="AtlasTexture" id="AtlasTexture_{t}"]')
+        lines.append(f'atlas = ExtResource("{page + 1}_atlas")')
+        lines.append("region = Rect2({}, {}, {}, {})".format(*region))
+        if any(margin):
+            lines.append("margin = Rect2({}, {}, {}, {})".format(*margin))
+        lines.append("")
+    blocks = []
+    for name, frame_textures in animations:
+        frames = ", ".join(
+            f'{{\n"duration": 1.0,\n"texture": SubResource("AtlasTexture_{t + 1}")\n}}'
+            for t in frame_textures
+        )
+        blocks.append(f'{{\n"frames": [{frames}],\n"loop": true,\n"name": &"{name}"\n}}')
+    lines.append("[resource]")
+    lines.append(f"animations = [{', '.join(blocks)}]")
+    tres_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def pack_atlas(
+    sheets: list[Path],
+    atlas_dir: Path,
+    name: str,
+    max_size: int,
+    args: argparse.Namespace,
+) -> dict:
+    """
+    Pack ripped sprite sheets into power-of-two atlas pages.
+
+    Every frame is trimmed to its alpha bounding box (the AtlasTexture
+    margin restores the original frame size, or the shared canvas for
+    --split-frames auto) and identical frames are
+    stored once. Writes <name>_N.png pages and <name>.tres (one animation
+    per sheet, named after the file) into atlas_dir.
+
+    Returns a report dict with the pages, frame counts and occupancy.
+    """
+    frames: list[Image.Image] = []
+    frame_index: dict[tuple[tuple[int, int], bytes], int] = {}
+    textures: list[tuple[int, tuple[int, int, int, int]]] = []  # (frame, margin) per AtlasTexture
+    animations: list[tuple[str, list[int]]] = []
+
+    for sheet in sheets:
+        with Image.open(sheet) as src:
+            img = src.convert("RGBA")
+        animation: list[int] = []
+        for box, (off_x, off_y), (canvas_w, canvas_h) in _sheet_frames(img, args):
+            frame = img.crop(box)
+            # Trim to the alpha bbox; fully transparent frames keep one pixel
+            bbox = frame.getchannel("A").getbbox() or (0, 0, 1, 1)
+            trimmed = frame.crop(bbox)
+            key = (trimmed.size, trimmed.tobytes())
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append(trimmed)
+            margin = (off_x + bbox[0], off_y + bbox[1],
+                      canvas_w - trimmed.size[0], canvas_h - trimmed.size[1])
+            animation.append(len(textures))
+            textures.append((frame_index[key], margin))
+        animations.append((sheet.stem, animation))
+
+    pages = _pack_atlas_pages([f.size for f in frames], max_size, spacing=ATLAS_SPACING)
+
+    atlas_dir.mkdir(parents=True, exist_ok=True)
+    # Drop pages left over from an earlier, larger pack (or another format)
+    for stale in atlas_dir.glob(f"{name}_*"):
+        if stale.suffix in (".png", ".webp"):
+            stale.unlink()
+    suffix = _encode_profile(args)["suffix"]
+
+    location: dict[int, tuple[int, int, int]] = {}  # frame -> (page, x, y)
+    page_paths: list[Path] = []
+    page_reports: list[dict] = []
+    for p, (page_w, page_h, placed) in enumerate(pages):
+        page_img = Image.new("RGBA", (page_w, page_h), (0, 0, 0, 0))
+        used = 0
+        for i, (x, y) in placed.items():
+            page_img.paste(frames[i], (x, y))
+            location[i] = (p, x, y)
+            used += frames[i].size[0] * frames[i].size[1]
+        page_path = atlas_dir / f"{name}_{p}{suffix}"
+        _save_image(page_img, page_path, args)
+        page_paths.append(page_path)
+        page_reports.append({
+            "path": str(page_path),
+            "size": [page_w, page_h],
+            "frames": len(placed),
+            "occupancy": round(used / (page_w * page_h), 4),
+        })
+
+    # Frames larger than a page are left out of the .tres (and reported)
+    resolved = []
+    remap: dict[int, int] = {}
+    for t, (frame, margin) in enumerate(textures):
+        if frame not in location:
+            continue
+        p, x, y = location[frame]
+        fw, fh = frames[frame].size
+        remap[t] = len(resolved)
+        resolved.append((p, (x, y, fw, fh), margin))
+    animations = [(anim, [remap[t] for t in ts if t in remap]) for anim, ts in animations]
+
+    tres_path = atlas_dir / f"{name}.tres"
+    _write_sprite_frames(tres_path, page_paths, resolved, animations)
+
+    total_area = sum(r["size"][0] * r["size"][1] for r in page_reports)
+    used_area = sum(frames[i].size[0] * frames[i].size[1] for i in location)
+    return {
+        "name": name,
+        "sprite_frames": str(tres_path),
+        "sheets": len(sheets),
+        "frames": len(textures),
+        "unique_frames": len(frames),
+        "pages": page_reports,
+        "occupancy": round(used_area / total_area, 4) if total_area else 0.0,
+        "oversized_frames": len(textures) - len(resolved),
+    }
+
+
+def _outputs_by_folder(
+    pngs: list[Path], results: list[str], args: argparse.Namespace
+) -> dict[Path, list[Path]]:
+    """Ripped output files of a directory run (failed and duplicate files excluded) per folder."""
+    folders: dict[Path, list[Path]] = {}
+    for png, result in zip(pngs, results):
+        output_path = _resolve_output_path(png, args)
+        if result not in ("failed", "duplicate") and output_path.is_file():
+            folders.setdefault(output_path.parent, []).append(output_path)
+    return folders
+
+
+def _pack_directory_atlases(
+    pngs: list[Path], results: list[str], args: argparse.Namespace
+) -> list[dict]:
+    """--atlas: pack each output folder's ripped sheets with pack_atlas.
+
+    Sheets come from disk, so files skipped via the rip cache are packed
+    too. Pages and the .tres go to <folder>/_atlas/, named after the folder.
+    """
+    max_size: int = getattr(args, "atlas_size", 2048)
+    atlases: list[dict] = []
+    for folder, sheets in _outputs_by_folder(pngs, results, args).items():
+        try:
+            atlas = pack_atlas(sheets, folder / ATLAS_DIRNAME, folder.name, max_size, args)
+        except (PermissionError, OSError) as e:
+            print(f"  ERROR: Failed to pack atlas for {folder}: {e}")
+            continue
+        pages = ", ".join(f"{p['size'][0]}x{p['size'][1]}" for p in atlas["pages"])
+        print(f"  ATLAS {folder.name}: {atlas['frames']} frames ({atlas['unique_frames']} unique) → "
+              f"{len(atlas['pages'])} page(s) [{pages}], {atlas['occupancy']:.1%} occupancy")
+        if atlas["oversized_frames"]:
+            print(f"       WARN: {atlas['oversized_frames']} frame(s) larger than {max_size}px left out")
+        atlases.append(atlas)
+    return atlases
+
+
+# Previews — by default one labelled contact sheet per output folder;
+# --preview file restores a full-size _preview.png next to every sprite
+PREVIEW_MODES = ("sheet", "file")
+PREVIEW_SHEET_NAME = "_preview_sheet"
+SHEET_CELL = 128           # sprites are shrunk (nearest) to fit a cell
+SHEET_LABEL_HEIGHT = 14
+SHEET_COLUMNS = 8
+SHEET_CELLS_PER_PAGE = 64
+
+
+def _per_file_previews(args: argparse.Namespace) -> bool:
+    """True when rip_sprite should write a _preview.png per sprite."""
+    return not args.no_preview and getattr(args, "preview", "file") == "file"
+
+
+def _sheet_thumbnail(img: Image.Image) -> Image.Image:
+    """RGBA thumbnail of a sprite that fits a contact-sheet cell."""
+    return downscale_nearest(img, SHEET_CELL).convert("RGBA")
+
+
+def write_contact_sheet(
+    sprites: list[Path],
+    folder: Path,
+    args: argparse.Namespace,
+    thumbnails: Optional[dict] = None,
+) -> list[Path]:
+    """
+    Write labelled contact sheets of sprites into folder.
+
+    Each sprite is shrunk to fit a SHEET_CELL square over a shared
+    checkerboard and labelled with its file name; every SHEET_CELLS_PER_PAGE
+    sprites start a new _preview_sheet_NN page. Thumbnails already made
+    during the rip are used as-is; other sprites are read from disk.
+    Returns the pages written.
+    """
+    suffix = _encode_profile(args)["suffix"]
+    for stale in folder.glob(f"{PREVIEW_SHEET_NAME}_*"):
+        if stale.suffix in (".png", ".webp"):
+            stale.unlink()
+
+    pages: list[Path] = []
+    for page, start in enumerate(range(0, len(sprites), SHEET_CELLS_PER_PAGE), start=1):
+        cells: list[tuple[Image.Image, str]] = []
+        for sprite_path in sprites[start:start + SHEET_CELLS_PER_PAGE]:
+            thumb = thumbnails.get(sprite_path) if thumbnails else None
+            if thumb is None:
+                with Image.open(sprite_path) as src:
+                    thumb = _sheet_thumbnail(src.convert("RGBA"))
+            cells.append((thumb, sprite_path.stem))
+        page_path = folder / f"{PREVIEW_SHEET_NAME}_{page:02d}{suffix}"
+        _save_sheet(_draw_sheet(cells), page_path, args)
+        pages.append(page_path)
+    return pages
+
+
+def _draw_sheet(cells: list[tuple[Image.Image, str]]) -> Image.Image:
+    """One contact-sheet page: (thumbnail, label) cells over a shared checkerboard, SHEET_COLUMNS wide."""
+    board = _make_checkerboard(SHEET_CELL, SHEET_CELL)
+    # The bitmap font renders ~50x faster than the default FreeType one
+    font = ImageFont.load_default_imagefont() if hasattr(ImageFont, "load_default_imagefont") else ImageFont.load_default()
+    cell_h = SHEET_CELL + SHEET_LABEL_HEIGHT
+    columns = min(SHEET_COLUMNS, len(cells))
+    rows = math.ceil(len(cells) / columns)
+    sheet = Image.new("RGB", (columns * SHEET_CELL, rows * cell_h), (48, 48, 48))
+    draw = ImageDraw.Draw(sheet)
+    for k, (thumb, label) in enumerate(cells):
+        x = (k % columns) * SHEET_CELL
+        y = (k // columns) * cell_h
+        sheet.paste(board, (x, y))
+        sheet.paste(thumb, (x + (SHEET_CELL - thumb.size[0]) // 2,
+                            y + (SHEET_CELL - thumb.size[1]) // 2), thumb)
+        while len(label) > 1 and draw.textlength(label, font=font) > SHEET_CELL - 4:
+            label = label[:-3] + ".."
+        draw.text((x + 2, y + SHEET_CELL + 2), label, fill=(230, 230, 230), font=font)
+    return sheet
+
+
+def _save_sheet(sheet: Image.Image, page_path: Path, args: argparse.Namespace) -> None:
+    """Save a contact-sheet page (PNG pages are written small and fast, see below)."""
+    if page_path.suffix == ".png":
+        # Sheets are only for eyeballing: a 256-color octree PNG at zlib
+        # level 1 encodes ~4x faster than full RGB at a third of the size
+        sheet = sheet.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        sheet.save(page_path, "PNG", compress_level=1)
+    else:
+        _save_image(sheet, page_path, args)
+
+
+def _write_directory_sheets(
+    pngs: list[Path],
+    results: list[str],
+    args: argparse.Namespace,
+    thumbnails: Optional[dict] = None,
+) -> list[str]:
+    """Contact sheets for each output folder of a directory run.
+
+    Folders where every file came from the rip cache (or failed) and a
+    sheet already exists are left alone. Returns the paths of the pages written.
+    """
+    changed = {
+        _resolve_output_path(png, args).parent
+        for png, result in zip(pngs, results) if result not in ("cached", "failed", "duplicate")
+    }
+    written: list[str] = []
+    for folder, sprites in _outputs_by_folder(pngs, results, args).items():
+        if folder not in changed and any(folder.glob(f"{PREVIEW_SHEET_NAME}_*")):
+            continue
+        try:
+            pages = write_contact_sheet(sprites, folder, args, thumbnails)
+        except (PermissionError, OSError) as e:
+            print(f"  ERROR: Failed to write contact sheet for {folder}: {e}")
+            continue
+        print(f"  PREVIEW {folder.name}: {len(sprites)} sprites → {len(pages)} sheet(s)")
+        written.extend(str(page) for page in pages)
+    return written
+
+
+# Incremental rip cache — manifest of input/output content hashes per file,
+# written to the output root. Bump RIP_CACHE_VERSION when processing changes
+# in a way that should invalidate every cached result.
+RIP_CACHE_FILENAME = ".rip_cache.json"
+RIP_CACHE_VERSION = 1
+
+
+def _sha256_file(path: Path) -> str:
+    """Hex SHA-256 of a file's bytes (read in 1 MB chunks, never decoded)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path: Path) -> dict:
+    """Content hash plus size/mtime of a file, as stored in the rip cache."""
+    st = path.stat()
+    return {"sha256": _sha256_file(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _fingerprint_matches(path: Path, fp: dict) -> bool:
+    """Check whether path still has the content recorded in fp.
+
+    Size + mtime matching is trusted without reading the file (like git's
+    index); otherwise the file is re-hashed, and on a match the stored mtime
+    is refreshed so the next run takes the fast path again.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return False
+    if st.st_size != fp.get("size"):
+        return False
+    if st.st_mtime_ns == fp.get("mtime_ns"):
+        return True
+    if _sha256_file(path) != fp.get("sha256"):
+        return False
+    fp["mtime_ns"] = st.st_mtime_ns
+    return True
+
+
+def _cache_root(args: argparse.Namespace) -> Path:
+    """Directory holding the rip cache manifest (--output-dir or processing root)."""
+    output_dir = getattr(args, "output_dir", None)
+    return Path(output_dir) if output_dir else Path(args._processing_root)
+
+
+def _cache_key(path: Path, root: Path) -> str:
+    """Manifest key for path: POSIX path relative to root, absolute if outside it."""
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def _cache_input_key(png: Path, args: argparse.Namespace) -> str:
+    """Manifest key for an input file (relative to the processing root)."""
+    return _cache_key(png, Path(args._processing_root))
+
+
+def _cache_settings(png: Path, args: argparse.Namespace) -> dict:
+    """Effective settings that affect the ripped output of png."""
+    settings = {
+        "tolerance": args.tolerance,
+        "fringe_passes": getattr(args, "fringe_passes", 2),
+        "crop": getattr(args, "crop", True),
+        "padding": getattr(args, "padding", 2),
+        "scale": _auto_scale(png, args),
+        "split_frames": getattr(args, "split_frames", None),
+        "preview": _per_file_previews(args),
+    }
+    # Later options are keyed only when non-default, so existing caches stay valid
+    optional = {
+        "bg_detect": (getattr(args, "bg_detect", "sample"), "sample"),
+        "palette": (_palette_setting(png, args), None),
+        "palette_colors": (getattr(args, "palette_colors", DEFAULT_PALETTE_COLORS), DEFAULT_PALETTE_COLORS),
+        "encode_profile": (getattr(args, "encode_profile", None), None),
+        "pixel_grid": (getattr(args, "pixel_grid", False), False),
+    }
+    for key, (value, default) in optional.items():
+        if value != default:
+            settings[key] = value
+    return settings
+
+
+def _palette_setting(png: Path, args: argparse.Namespace) -> Optional[str]:
+    """--palette as a cache setting; palette files are keyed by content hash."""
+    mode: Optional[str] = getattr(args, "palette", None)
+    if not mode or mode in PALETTE_MODES:
+        return mode
+    source = Path(mode)
+    if source.is_dir():
+        source = _palette_file_for(png, source)
+        if source is None:
+            return "auto"
+    return f"{source.name}:{_sha256_file(source)}" if source.is_file() else mode
+
+
+def _load_rip_cache(root: Path) -> dict:
+    """Load the rip cache manifest from root, or an empty one if missing/stale."""
+    empty = {"version": RIP_CACHE_VERSION, "files": {}}
+    try:
+        with open(root / RIP_CACHE_FILENAME, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as e:
+        print(f"  WARN: Ignoring unreadable rip cache: {e}")
+        return empty
+    if not isinstance(cache, dict) or cache.get("version") != RIP_CACHE_VERSION:
+        return empty
+    cache.setdefault("files", {})
+    return cache
+
+
+def _save_rip_cache(root: Path, cache: dict) -> None:
+    """Atomically write the rip cache manifest to root."""
+    cache_path = root / RIP_CACHE_FILENAME
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, cache_path)
+    except (PermissionError, OSError) as e:
+        print(f"  ERROR: Failed to write rip cache {cache_path}: {e}")
+
+
+def _cache_is_fresh(cache: dict, png: Path, args: argparse.Namespace, root: Path) -> bool:
+    """True if png was already ripped with the same settings and nothing changed.
+
+    The input must match either its recorded original or, for in-place runs,
+    the output that replaced it; every recorded output must still be intact.
+    Uses stat() only unless a file's mtime moved.
+    """
+    record = cache["files"].get(_cache_input_key(png, args))
+    if record is None or record.get("settings") != _cache_settings(png, args):
+        return False
+    outputs: dict = record.get("outputs", {})
+    in_place = outputs.get(_cache_key(png, root))
+    if not _fingerprint_matches(png, record["input"]):
+        if in_place is None or not _fingerprint_matches(png, in_place):
+            return False
+    return all(_fingerprint_matches(root / key, fp) for key, fp in outputs.items())
+
+
+def _cached_skip(png: Path, prefix: str, report_entries: Optional[list]) -> str:
+    """Report a file skipped because the rip cache says it is unchanged.
+
+    Returns "cached", which run summaries count as skipped.
+    """
+    print(f"{prefix} SKIP — unchanged (cached)")
+    if report_entries is not None:
+        entry = _new_report_entry(png)
+        entry["status"] = "skipped"
+        entry["warnings"].append("unchanged since last rip (cached)")
+        report_entries.append(entry)
+    return "cached"
+
+
+# Perceptual-hash index (--skip-duplicates, --find-duplicates) — a 256-bit
+# difference hash of each input's content, kept in .rip_phash.json next to
+# the tree and refreshed by size/mtime. Near-neighbour queries use
+# multi-index hashing: the hash is cut into PHASH_CHUNKS chunks, and any hash
+# within distance r of a query matches it in at least one chunk to within
+# r // PHASH_CHUNKS bits (pigeonhole), so only those buckets are probed.
+PHASH_INDEX_FILENAME = ".rip_phash.json"
+PHASH_INDEX_VERSION = 1
+PHASH_GRID = 16            # 16 rows x 16 horizontal gradients = 256 bits
+PHASH_CHUNKS = 16
+PHASH_CHUNK_BITS = PHASH_GRID * PHASH_GRID // PHASH_CHUNKS
+PHASH_WORKING_SIZE = 256   # inputs are box-reduced to about this before hashing
+PHASH_CONTENT_LUMA = 231   # composited over white, darker than this is content
+# Regenerations of the same sprite land within ~33 bits, different sprites 37+
+DEFAULT_DUPLICATE_DISTANCE = 32
+ARCHIVE_DIRNAME = "archive"
+BATCH_DIR_PREFIX = "batch_"
+
+
+def perceptual_hash(img: Image.Image) -> int:
+    """256-bit difference hash of img's content, composited over white.
+
+    The hash covers the bounding box of the non-background content, so
+    the same sprite on a larger canvas, ripped (transparent) or not,
+    hashes alike.
+    """
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    factor = min(img.size) // PHASH_WORKING_SIZE
+    if factor > 1:
+        img = img.reduce(factor)
+    flat = Image.alpha_composite(Image.new("RGBA", img.size, (255, 255, 255, 255)), img.convert("RGBA"))
+    luma = flat.convert("L")
+    box = luma.point(lambda v: 255 if v < PHASH_CONTENT_LUMA else 0).getbbox()
+    if box is not None:
+        luma = luma.crop(box)
+    cells = luma.resize((PHASH_GRID + 1, PHASH_GRID), Image.BOX).tobytes()
+    bits = 0
+    for y in range(PHASH_GRID):
+        row = cells[y * (PHASH_GRID + 1):(y + 1) * (PHASH_GRID + 1)]
+        for x in range(PHASH_GRID):
+            bits = bits << 1 | (row[x] < row[x + 1])
+    return bits
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _hash_file(path: Path) -> Optional[int]:
+    """perceptual_hash of an image file, or None if it can't be decoded."""
+    try:
+        with Image.open(path) as src:
+            return perceptual_hash(src)
+    except Exception:
+        return None
+
+
+def _load_phash_index(root: Path) -> dict:
+    """Load the perceptual-hash index from root, or an empty one if missing/stale."""
+    empty = {"version": PHASH_INDEX_VERSION, "files": {}}
+    try:
+        with open(root / PHASH_INDEX_FILENAME, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return empty
+    except (OSError, ValueError) as e:
+        print(f"  WARN: Ignoring unreadable hash index: {e}")
+        return empty
+    if not isinstance(index, dict) or index.get("version") != PHASH_INDEX_VERSION:
+        return empty
+    index.setdefault("files", {})
+    return index
+
+
+def update_phash_index(root: Path, pngs: list[Path], jobs: int = 1) -> dict[Path, int]:
+    """Hashes of pngs (keyed by path) from root's index, rehashing new or changed files.
+
+    Files are matched by size and mtime; entries of files that no longer
+    exist are dropped. The index is written back only if it changed.
+    Returns hashes of every png that could be decoded.
+    """
+    index = _load_phash_index(root)
+    files: dict = index["files"]
+    changed = False
+    for key in [k for k in files if not (root / k).is_file()]:
+        del files[key]
+        changed = True
+
+    keys = {png: _cache_key(png, root) for png in pngs}
+    stale: list[Path] = []
+    for png, key in keys.items():
+        known = files.get(key)
+        st = png.stat()
+        if known is None or known["size"] != st.st_size or known["mtime_ns"] != st.st_mtime_ns:
+            stale.append(png)
+    if stale:
+        if jobs > 1 and len(stale) > jobs:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                hashes = list(pool.map(_hash_file, stale, chunksize=8))
+        else:
+            hashes = [_hash_file(png) for png in stale]
+        for png, value in zip(stale, hashes):
+            st = png.stat()
+            files[keys[png]] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "hash": None if value is None else f"{value:064x}",
+            }
+        changed = True
+
+    if changed:
+        index_path = root / PHASH_INDEX_FILENAME
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, index_path)
+        except (PermissionError, OSError) as e:
+            print(f"  ERROR: Failed to write hash index {index_path}: {e}")
+
+    return {png: int(files[key]["hash"], 16) for png, key in keys.items() if files[key]["hash"]}
+
+
+@functools.lru_cache(maxsize=4)
+def _chunk_probes(radius: int) -> tuple[int, ...]:
+    """XOR masks of every PHASH_CHUNK_BITS-bit value with at most radius bits set."""
+    masks = [0]
+    for _ in range(radius):
+        masks = sorted({m | (1 << b) for m in masks for b in range(PHASH_CHUNK_BITS)} | set(masks))
+    return tuple(masks)
+
+
+def _hash_chunks(value: int) -> list[int]:
+    chunk_mask = (1 << PHASH_CHUNK_BITS) - 1
+    return [(value >> (i * PHASH_CHUNK_BITS)) & chunk_mask for i in range(PHASH_CHUNKS)]
+
+
+def _new_hash_tables() -> list[dict[int, list]]:
+    """Empty multi-index hash tables (one bucket dict per chunk)."""
+    return [{} for _ in range(PHASH_CHUNKS)]
+
+
+def _add_to_hash_tables(tables: list[dict[int, list]], value: int, item: object) -> None:
+    for table, chunk in zip(tables, _hash_chunks(value)):
+        table.setdefault(chunk, []).append((value, item))
+
+
+def query_hash_tables(tables: list[dict[int, list]], value: int, max_distance: int) -> list[tuple[int, object]]:
+    """(distance, item) of every indexed hash within max_distance of value, nearest first."""
+    probes = _chunk_probes(max_distance // PHASH_CHUNKS)
+    found: dict[int, tuple[int, object]] = {}
+    for table, chunk in zip(tables, _hash_chunks(value)):
+        for probe in probes:
+            for other, item in table.get(chunk ^ probe, ()):
+                if id(item) not in found:
+                    distance = _hamming(value, other)
+                    if distance <= max_distance:
+                        found[id(item)] = (distance, item)
+    return sorted(found.values(), key=lambda hit: hit[0])
+
+
+def _duplicate_rank(png: Path, root: Path) -> tuple[bool, bool]:
+    """Sort key preferring live category folders over batch_N/ over archive/ copies."""
+    parts = png.relative_to(root).parts[:-1]
+    return ARCHIVE_DIRNAME in parts, any(part.startswith(BATCH_DIR_PREFIX) for part in parts)
+
+
+def find_duplicates(
+    pngs: list[Path], hashes: dict[Path, int], max_distance: int, root: Path
+) -> dict[Path, tuple[Path, int]]:
+    """Map each near-duplicate png to (the file it duplicates, Hamming distance).
+
+    Files are kept greedily in run order, except that copies in batch_N/
+    and then archive/ folders yield to the live category folders; each
+    file is a duplicate of the nearest file kept before it.
+    """
+    order = sorted(pngs, key=lambda png: _duplicate_rank(png, root))
+    tables = _new_hash_tables()
+    duplicates: dict[Path, tuple[Path, int]] = {}
+    for png in order:
+        value = hashes.get(png)
+        if value is None:
+            continue
+        hits = query_hash_tables(tables, value, max_distance)
+        if hits:
+            distance, original = hits[0]
+            duplicates[png] = (original, distance)
+        else:
+            _add_to_hash_tables(tables, value, png)
+    return duplicates
+
+
+def _duplicate_skip(
+    png: Path, original: Path, distance: int, root: Path, report_entries: Optional[list]
+) -> str:
+    """Report a file skipped by --skip-duplicates; returns "duplicate"."""
+    print(f"  DUPLICATE {_cache_key(png, root)} ≈ {_cache_key(original, root)} ({distance} bits)")
+    if report_entries is not None:
+        entry = _new_report_entry(png)
+        entry["status"] = "skipped"
+        entry["duplicate_of"] = str(original)
+        entry["warnings"].append(f"near-duplicate of {original.name} ({distance} bits)")
+        report_entries.append(entry)
+    return "duplicate"
+
+
+def find_duplicates_report(dir_path: Path, args: argparse.Namespace) -> None:
+    """--find-duplicates: index dir_path, print near-duplicate groups, write _rip_duplicates.json."""
+    pngs = _discover_pngs(dir_path)
+    max_distance: int = args.find_duplicates
+    start_time = time.time()
+    hashes = update_phash_index(dir_path, pngs, _resolve_jobs(args, len(pngs)))
+    index_seconds = time.time() - start_time
+    duplicates = find_duplicates(pngs, hashes, max_distance, dir_path)
+
+    groups: dict[Path, list[tuple[Path, int]]] = {}
+    for png, (original, distance) in duplicates.items():
+        groups.setdefault(original, []).append((png, distance))
+    print(f"\nIndexed {len(hashes)} of {len(pngs)} files in {index_seconds:.1f}s "
+          f"({PHASH_INDEX_FILENAME}); {len(duplicates)} near-duplicate(s) within {max_distance} bits\n")
+    for original in sorted(groups):
+        print(f"  {_cache_key(original, dir_path)}")
+        for png, distance in sorted(groups[original], key=lambda d: d[1]):
+            print(f"    ≈ {_cache_key(png, dir_path)} ({distance} bits)")
+
+    output_dir = getattr(args, "output_dir", None)
+    report_path = (Path(output_dir) if output_dir else dir_path) / "_rip_duplicates.json"
+    report = {
+        "summary": {
+            "files": len(pngs),
+            "hashed": len(hashes),
+            "duplicates": len(duplicates),
+            "groups": len(groups),
+            "max_distance": max_distance,
+            "index_seconds": round(index_seconds, 2),
+        },
+        "groups": [
+            {
+                "keep": str(original),
+                "duplicates": [
+                    {"path": str(png), "distance": distance}
+                    for png, distance in sorted(groups[original], key=lambda d: d[1])
+                ],
+            }
+            for original in sorted(groups)
+        ],
+    }
+    try:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n  Duplicates report: {report_path}")
+    except (PermissionError, OSError) as e:
+        print(f"  ERROR: Failed to write duplicates report {report_path}: {e}")
+
+
+# Tolerance sweep (--tolerance-sweep) — every tolerance of a range from one
+# decode, background detection and distance map per image. Nothing is ripped:
+# each image gets a labelled grid preview and per-tolerance stats go to
+# _rip_sweep.json.
+SWEEP_PREVIEW_SUFFIX = "_sweep_preview"
+SWEEP_REPORT_FILENAME = "_rip_sweep.json"
+DEFAULT_SWEEP_STEP = 5
+MAX_SWEEP_TOLERANCES = 64
+
+
+def _tolerance_sweep_arg(value: str) -> list[int]:
+    """argparse type for --tolerance-sweep: START:STOP[:STEP], STOP included."""
+    try:
+        parts = [int(part) for part in value.split(":")]
+    except ValueError:
+        parts = []
+    if len(parts) == 2:
+        parts.append(DEFAULT_SWEEP_STEP)
+    if len(parts) != 3:
+        raise argparse.ArgumentTypeError(f"expected START:STOP[:STEP], got {value!r}")
+    start, stop, step = parts
+    if start < 0 or stop < start or step <= 0:
+        raise argparse.ArgumentTypeError(f"expected 0 <= START <= STOP and STEP > 0, got {value!r}")
+    tolerances = list(range(start, stop + 1, step))
+    if len(tolerances) > MAX_SWEEP_TOLERANCES:
+        raise argparse.ArgumentTypeError(
+            f"{len(tolerances)} tolerances in {value!r}; at most {MAX_SWEEP_TOLERANCES} per sweep")
+    return tolerances
+
+
+def sweep_sprite(image_path: Path, args: argparse.Namespace, progress_prefix: str = "") -> dict:
+    """
+    Evaluate every --tolerance-sweep tolerance on one sprite without ripping it.
+
+    Decodes and detects the background once; with numpy the flood fill of
+    all tolerances comes from a single sweep_removal_levels() map (without
+    it, the Pillow flood fill runs per tolerance). Fringe cleaning and crop
+    then run per tolerance exactly as rip_sprite would, and each result is
+    shrunk into one cell of a <stem>_sweep_preview grid next to the output.
+    Returns the sprite's _rip_sweep.json entry.
+    """
+    tolerances: list[int] = args.tolerance_sweep
+    indent = "       " if progress_prefix else "  "
+    prefix = progress_prefix or f"  {image_path.name}:"
+    entry: dict = {"input_path": str(image_path), "status": "failed", "tolerances": [],
+                   "warnings": [], "errors": []}
+    try:
+        sprite = _decode_rgba(image_path)
+    except Exception as e:
+        print(f"{prefix} ERROR — {e}")
+        entry["errors"].append(str(e))
+        return entry
+
+    w, h = _buffer_size(sprite)
+    memory_budget: Optional[float] = getattr(args, "memory_budget", None)
+    band_rows = DEFAULT_BAND_ROWS if memory_budget is None else _budget_band_rows(w, h, memory_budget)
+    if is_already_transparent(sprite):
+        print(f"{prefix} SKIP — already transparent")
+        entry["status"] = "skipped"
+        entry["warnings"].append("already transparent")
+        return entry
+
+    bg_color, confidence, _clusters = _detect_background(sprite, args)
+    r, g, b = bg_color
+    entry["background_color"] = [r, g, b]
+    entry["confidence"] = round(confidence, 4)
+    print(f"{prefix} BG rgb({r},{g},{b}) ({confidence:.0%}) "
+          f"→ {len(tolerances)} tolerances")
+
+    levels: "Optional[np.ndarray]" = None
+    if HAS_NUMPY:
+        levels = sweep_removal_levels(sprite, bg_color, tolerances, band_rows)
+        flood_counts = np.cumsum(np.bincount(levels.reshape(-1), minlength=len(tolerances) + 1))
+        pixels = sprite.view(np.uint32)[..., 0]  # one word per RGBA pixel
+        fringe_y, fringe_x, fringe_first, fringe_last = sweep_fringe_candidates(
+            sprite, levels, bg_color, band_rows=band_rows)
+
+    fringe_passes: int = getattr(args, "fringe_passes", 2)
+    do_crop: bool = getattr(args, "crop", True)
+    padding: int = getattr(args, "padding", 2)
+    cells: list[tuple[Image.Image, str]] = []
+    if not args.no_preview:
+        cells.append((_sheet_thumbnail(_to_image(sprite.copy())), "original"))
+    previous: Optional[tuple[int, dict, Optional[Image.Image]]] = None
+    for k, tolerance in enumerate(tolerances):
+        work = None
+        if levels is not None:
+            flood_removed = int(flood_counts[k])
+        else:
+            work = sprite.copy()
+            flood_removed = flood_fill_remove(work, bg_color, tolerance, band_rows=band_rows)
+
+        if previous is not None and previous[0] == flood_removed:
+            # Flood masks grow with the tolerance, so the same count is the
+            # same mask — and the same fringe, crop and thumbnail
+            result, thumb = {**previous[1], "tolerance": tolerance}, previous[2]
+        else:
+            if work is not None:
+                fringe_cleaned = clean_semitransparent_fringe(work, bg_color, passes=fringe_passes, band_rows=band_rows)
+            else:
+                work = np.where(levels <= k, np.uint32(0), pixels).view(np.uint8).reshape(h, w, 4)
+                fringe_cleaned = 0
+                if fringe_passes > 0:
+                    first_pass = (fringe_first <= k) & (k < fringe_last)
+                    ys, xs = fringe_y[first_pass], fringe_x[first_pass]
+                    work[ys, xs] = 0
+                    fringe_cleaned = len(ys) + _clean_fringe_frontier(
+                        work, ys, xs, bg_color, 80, fringe_passes - 1)
+            removed = flood_removed + fringe_cleaned
+            result = {
+                "tolerance": tolerance,
+                "pixels_removed": removed,
+                "fringe_cleaned": fringe_cleaned,
+                "removal_percentage": round(removed / (w * h) * 100, 2),
+            }
+            if do_crop and removed:
+                work = crop_to_content(work, padding)
+                result["crop_dimensions"] = list(_buffer_size(work))
+            thumb = None if args.no_preview else _sheet_thumbnail(_to_image(work))
+        del work
+        previous = (flood_removed, result, thumb)
+
+        entry["tolerances"].append(result)
+        pct = result["pixels_removed"] / (w * h) * 100
+        size = f", {result['crop_dimensions'][0]}x{result['crop_dimensions'][1]}" if "crop_dimensions" in result else ""
+        print(f"{indent}t={tolerance:<3} {result['pixels_removed']} removed ({pct:.1f}%){size}")
+        if thumb is not None:
+            cells.append((thumb, f"t={tolerance} {pct:.1f}%"))
+
+    entry["status"] = "swept"
+    if not args.no_preview:
+        output_path = _resolve_output_path(image_path, args)
+        preview_path = output_path.with_name(output_path.stem + SWEEP_PREVIEW_SUFFIX + output_path.suffix)
+        try:
+            preview_path.parent.mkdir(parents=True, exist_ok=True)
+            _save_sheet(_draw_sheet(cells), preview_path, args)
+            entry["preview_path"] = str(preview_path)
+        except (PermissionError, OSError) as e:
+            print(f"{indent}ERROR: Failed to save sweep preview {preview_path}: {e}")
+            entry["errors"].append(f"Failed to save sweep preview: {e}")
+    return entry
+
+
+def tolerance_sweep_report(pngs: list[Path], args: argparse.Namespace) -> None:
+    """--tolerance-sweep: sweep every input, print per-tolerance stats, write _rip_sweep.json."""
+    tolerances: list[int] = args.tolerance_sweep
+    print(f"\nTolerance sweep: {tolerances[0]}..{tolerances[-1]} "
+          f"({len(tolerances)} tolerances) over {len(pngs)} file(s)\n")
+    start_time = time.time()
+    entries = []
+    for i, png in enumerate(pngs, start=1):
+        entries.append(sweep_sprite(png, args, f"  [{i}/{len(pngs)}] {png.name}:"))
+    elapsed = time.time() - start_time
+
+    statuses = [e["status"] for e in entries]
+    summary = {
+        "tolerances": tolerances,
+        "files": len(pngs),
+        "swept": statuses.count("swept"),
+        "skipped": statuses.count("skipped"),
+        "failed": statuses.count("failed"),
+        "elapsed_seconds": round(elapsed, 2),
+    }
+    print(f"\nSwept {summary['swept']} of {len(pngs)} file(s) in {elapsed:.1f}s")
+    report_path = _cache_root(args) / SWEEP_REPORT_FILENAME
+    try:
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "files": entries}, f, indent=2, ensure_ascii=False)
+        print(f"  Sweep report: {report_path}")
+    except (PermissionError, OSError) as e:
+        print(f"  ERROR: Failed to write sweep report {report_path}: {e}")
+
+
+# Run journal — one JSON line per finished file (status, rip-cache style
+# record, report entries), appended and flushed as the run goes. A crash or
+# Ctrl+C loses nothing: --resume skips what the journal says is done, and
+# _rip_report.json is streamed from it at the end of a directory run. A
+# "started" line (input fingerprint, settings, planned outputs) precedes each
+# write, so a file overwritten in place whose finished line never made it
+# is still recognized as done rather than as already transparent.
+JOURNAL_FILENAME = "_rip_journal.jsonl"
+
+
+def _open_journal(path: Path, append: bool) -> Optional[TextIO]:
+    """Open the run journal (truncated unless append), or None if unwritable."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return open(path, "a" if append else "w", encoding="utf-8")
+    except (PermissionError, OSError) as e:
+        print(f"  WARN: Cannot write run journal {path}: {e}")
+        return None
+
+
+def _journal_lines(path: Path) -> Iterable[dict]:
+    """Every complete, parseable line of a journal (a torn last line is skipped)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and "input" in record:
+                    yield record
+    except FileNotFoundError:
+        return
+
+
+def _load_journal(path: Path) -> dict[str, dict]:
+    """Latest status and record per input key, for --resume (entries are left on disk)."""
+    done: dict[str, dict] = {}
+    try:
+        for line in _journal_lines(path):
+            done[line["input"]] = {
+                "status": line.get("status"), "record": line.get("record"), "started": line.get("started"),
+            }
+    except OSError as e:
+        print(f"  WARN: Ignoring unreadable run journal: {e}")
+        return {}
+    return done
+
+
+def _journal_entries(path: Path, keys: set[str]) -> Iterable[dict]:
+    """Report entries of the latest journal line of each input in keys, in journal order."""
+    latest: dict[str, int] = {}
+    for n, line in enumerate(_journal_lines(path)):
+        if line["input"] in keys:
+            latest[line["input"]] = n
+    for n, line in enumerate(_journal_lines(path)):
+        if latest.get(line["input"]) == n:
+            yield from line.get("entries", [])
+
+
+def _started_hook(
+    journal: Optional[TextIO],
+    png: Path,
+    args: argparse.Namespace,
+    input_fp: Optional[dict],
+    root: Optional[Path],
+) -> Optional[Callable[[list[Path]], None]]:
+    """rip_sprite before_write callback journaling png's write as started (None without a journal)."""
+    if journal is None or input_fp is None or root is None:
+        return None
+
+    def started(planned: list[Path]) -> None:
+        line = {
+            "input": _cache_input_key(png, args), "status": "started", "record": None,
+            "started": {
+                "input": input_fp,
+                "settings": _cache_settings(png, args),
+                "outputs": [_cache_key(path, root) for path in planned],
+            },
+            "entries": [],
+        }
+        journal.write(json.dumps(line, ensure_ascii=False) + "\n")
+        journal.flush()
+
+    return started
+
+
+def _recover_started_writes(
+    resumed: dict[str, dict], journal: Optional[TextIO], cache: Optional[dict], args: argparse.Namespace, root: Path
+) -> int:
+    """Finish the journal of files an interrupted run overwrote in place.
+
+    A file whose latest journal line is "started" and that is one of its
+    own planned outputs was written in place if it no longer matches the
+    started input fingerprint and still opens as an image (a torn write
+    doesn't). Such a file is journaled (and cached) as processed with a
+    record of the outputs on disk, and its resumed status updated, so
+    --resume skips it as done. Returns the number of files recovered.
+    """
+    recovered = 0
+    for key, done in resumed.items():
+        started = done.get("started")
+        if done["status"] != "started" or not started:
+            continue
+        png = Path(args._processing_root) / key
+        if _cache_key(png, root) not in started["outputs"] or _fingerprint_matches(png, started["input"]):
+            continue
+        try:
+            with Image.open(png) as written:
+                written.verify()
+        except Exception:
+            continue
+        outputs = {out: _fingerprint(root / out) for out in started["outputs"] if (root / out).is_file()}
+        record = {"input": started["input"], "settings": started["settings"], "status": "processed", "outputs": outputs}
+        entry = _new_report_entry(png)
+        entry["status"] = "processed"
+        entry["output_path"] = str(png)
+        entry["warnings"].append("written in place before the interrupted run journaled it (recovered on --resume)")
+        _finish_file(png, args, "processed", [entry], record, None, cache, journal)
+        resumed[key] = {"status": "processed", "record": record, "started": None}
+        recovered += 1
+    return recovered
+
+
+def _journal_is_fresh(done: Optional[dict], png: Path, args: argparse.Namespace, root: Path) -> bool:
+    """True if a --resume journal record says png is done and nothing changed since."""
+    if done is None or done["status"] == "failed" or done["record"] is None:
+        return False
+    return _cache_is_fresh({"files": {_cache_input_key(png, args): done["record"]}}, png, args, root)
 
-    # Step 1: Detect background
-    bg_color, confidence = detect_background_color(img)
-    r, g, b = bg_color
-    conf_str = f"{confidence:.0%}"
-    if confidence < 0.3:
-        conf_str += " LOW"
 
-    if entry is not None:
-        entry["background_color"] = [r, g, b]
-        entry["confidence"] = round(confidence, 4)
+def _resumed_skip(png: Path, prefix: str, done: dict, cache: Optional[dict], args: argparse.Namespace) -> str:
+    """Skip a file the resumed journal already finished; returns its journaled status.
 
-    # Step 2: Flood-fill remove from edges
-    transparent_count = flood_fill_remove(img, bg_color, tolerance)
+    Its journal line (and report entries) are already on disk; the rip
+    cache picks its record back up in case the crashed run never saved it.
+    """
+    print(f"{prefix} SKIP — already done (resumed)")
+    if cache is not None and done["status"] != "cached":
+        cache["files"][_cache_input_key(png, args)] = done["record"]
+    return done["status"]
 
-    # Step 3: Clean fringe (multi-pass)
-    fringe_passes: int = getattr(args, "fringe_passes", 2)
-    fringe_cleaned = clean_semitransparent_fringe(img, bg_color, passes=fringe_passes)
-    transparent_count += fringe_cleaned
 
-    if transparent_count == 0:
-        # Check if image already has transparency
-        has_alpha = any(img.getpixel((x, y))[3] < 255 for x in range(w) for y in range(min(3, h)))
-        if progress_prefix:
-            if has_alpha:
-                print(f"{progress_prefix} SKIP — already has transparency")
-            else:
-                print(f"{progress_prefix} BG rgb({r},{g},{b}) ({conf_str}) → 0 removed (0.0%)")
-        else:
-            if has_alpha:
-                print(f"  OK {image_path.name}: Already has transparency")
-            else:
-                print(f"  WARN {image_path.name}: No background removed — manual check needed")
-        if entry is not None:
-            entry["status"] = "skipped"
-            entry["pixels_removed"] = 0
-            entry["removal_percentage"] = 0.0
-            if has_alpha:
-                entry["warnings"].append("already has transparency")
-            else:
-                entry["warnings"].append("no background removed — manual check needed")
-            report_entries.append(entry)
-        return "skipped"
+def _finish_file(
+    png: Path,
+    args: argparse.Namespace,
+    result: str,
+    entries: Optional[list],
+    record: Optional[dict],
+    report_entries: Optional[list],
+    cache: Optional[dict],
+    journal: Optional[TextIO],
+) -> None:
+    """Merge one finished file into the run: rip cache, then journal or report_entries."""
+    key = _cache_input_key(png, args)
+    if cache is not None:
+        if record is not None:
+            cache["files"][key] = record
+        elif result == "cached":
+            record = cache["files"].get(key)
+    if journal is not None:
+        line = {"input": key, "status": result, "record": record, "entries": entries or []}
+        journal.write(json.dumps(line, ensure_ascii=False) + "\n")
+        journal.flush()
+    elif report_entries is not None and entries:
+        report_entries.extend(entries)
+
+
+def _resolve_jobs(args: argparse.Namespace, file_count: int) -> int:
+    """Resolve --jobs to a worker count (0 = one per CPU, capped at file_count)."""
+    jobs: int = getattr(args, "jobs", 1) or 0
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    return max(1, min(jobs, file_count))
+
+
+def _auto_scale(png: Path, args: argparse.Namespace) -> Optional[int]:
+    """Effective --scale for png: explicit value, else from its parent folder name."""
+    return args.scale or TARGET_SIZES.get(png.parent.name)
+
+
+def _rip_file(
+    png: Path,
+    args: argparse.Namespace,
+    prefix: str,
+    report_entries: Optional[list],
+    outputs: Optional[list] = None,
+    thumbnails: Optional[dict] = None,
+    decoded: "Optional[Future]" = None,
+    write_behind: Optional[ThreadPoolExecutor] = None,
+    removal: Optional[dict] = None,
+    before_write: Optional[Callable[[list[Path]], None]] = None,
+) -> "str | Future":
+    """Rip one file of a directory run, using its folder's auto-detected scale.
+
+    Returns the rip_sprite status string (a Future of it with write_behind).
+    A PermissionError is reported as "failed" (with a report entry) instead
+    of aborting the whole run.
+    """
+    try:
+        return rip_sprite(
+            png, args, progress_prefix=prefix,
+            report_entries=report_entries, outputs=outputs, thumbnails=thumbnails,
+            decoded=decoded, write_behind=write_behind,
+            config=_rip_config(args, scale=_auto_scale(png, args)), removal=removal,
+            before_write=before_write,
+        )
+    except PermissionError as e:
+        return _permission_failed(png, prefix, e, report_entries)
+
+
+def _permission_failed(png: Path, prefix: str, error: PermissionError, report_entries: Optional[list]) -> str:
+    """Report a file whose rip hit a PermissionError as failed."""
+    print(f"{prefix} ERROR — Permission denied: {error}")
+    if report_entries is not None:
+        entry = _new_report_entry(png)
+        entry["status"] = "failed"
+        entry["errors"].append(f"Permission denied: {error}")
+        report_entries.append(entry)
+    return "failed"
 
-    # Print main progress line
-    pct = (transparent_count / total_pixels) * 100
-    if progress_prefix:
-        print(f"{progress_prefix} BG rgb({r},{g},{b}) ({conf_str}) → {transparent_count} removed ({pct:.1f}%)")
-    else:
-        status = "OK" if pct > 20 else "WARN (low removal — check manually)"
-        print(f"  {status} {image_path.name}: {transparent_count} pixels removed ({pct:.1f}%)")
-    if fringe_cleaned > 0:
-        print(f"{indent}+ {fringe_cleaned} fringe pixels cleaned")
 
-    if entry is not None:
-        entry["pixels_removed"] = transparent_count
-        entry["removal_percentage"] = round(pct, 2)
-        if pct <= 20:
-            entry["warnings"].append("low removal percentage — check manually")
+def _cache_record(
+    png: Path,
+    args: argparse.Namespace,
+    result: str,
+    input_fp: Optional[dict],
+    outputs: list[Path],
+    cache_root: Optional[Path],
+) -> Optional[dict]:
+    """Rip-cache record of a ripped file (None without a cache or when it failed)."""
+    if cache_root is None or result == "failed":
+        return None
+    return {
+        "input": input_fp,
+        "settings": _cache_settings(png, args),
+        "status": result,
+        "outputs": {_cache_key(path, cache_root): _fingerprint(path) for path in outputs},
+    }
 
-    # Step 4: Crop to content bounding box
-    do_crop: bool = getattr(args, "crop", True)
-    padding: int = getattr(args, "padding", 2)
-    if do_crop:
-        pre_crop_size = img.size
-        img = crop_to_content(img, padding)
-        if img.size != pre_crop_size:
-            print(f"{indent}CROP: {pre_crop_size[0]}x{pre_crop_size[1]} → {img.size[0]}x{img.size[1]} (padding={padding})")
-            if entry is not None:
-                entry["crop_dimensions"] = {
-                    "before": [pre_crop_size[0], pre_crop_size[1]],
-                    "after": [img.size[0], img.size[1]],
-                }
 
-    # Step 5: Downscale if target specified
-    if target_size:
-        pre_scale_size = img.size
-        img = downscale_nearest(img, target_size)
-        print(f"{indent}SCALE: {pre_scale_size[0]}x{pre_scale_size[1]} → {img.size[0]}x{img.size[1]}")
+def _rip_file_tracked(
+    png: Path,
+    args: argparse.Namespace,
+    prefix: str,
+    report_entries: Optional[list],
+    cache_root: Optional[Path],
+    thumbnails: Optional[dict] = None,
+    journal: Optional[TextIO] = None,
+) -> tuple[str, Optional[dict]]:
+    """Run _rip_file and, when cache_root is set, build its rip-cache record.
+
+    The input is fingerprinted before ripping because in-place runs
+    overwrite it. Failed files get no record, so they are retried next run.
+    With a journal, the write is journaled as started before it begins.
+    """
+    input_fp = _fingerprint(png) if cache_root is not None else None
+    outputs: list[Path] = []
+    result = _rip_file(
+        png, args, prefix, report_entries, outputs, thumbnails,
+        before_write=_started_hook(journal, png, args, input_fp, cache_root),
+    )
+    return result, _cache_record(png, args, result, input_fp, outputs, cache_root)
 
-    # Determine output path (--output-dir or overwrite in place)
-    output_path = _resolve_output_path(image_path, args)
 
-    if entry is not None:
-        entry["output_path"] = str(output_path)
+def _rip_file_worker(
+    png: Path,
+    args: argparse.Namespace,
+    prefix: str,
+    want_report: bool,
+    cache_root: Optional[Path],
+    want_thumbnails: bool = False,
+) -> tuple[str, str, Optional[list], Optional[dict], Optional[dict]]:
+    """Process-pool entry point: run _rip_file_tracked with its output captured.
+
+    Returns (status, captured stdout, report entries, cache record,
+    thumbnails) so the parent can print each file's lines as one block and
+    merge in order.
+    """
+    entries: Optional[list] = [] if want_report else None
+    thumbnails: Optional[dict] = {} if want_thumbnails else None
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        result, record = _rip_file_tracked(png, args, prefix, entries, cache_root, thumbnails)
+    return result, buffer.getvalue(), entries, record, thumbnails
 
-    # Create output directory if needed (--output-dir)
-    if output_path != image_path:
-        try:
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-        except (PermissionError, OSError) as e:
-            print(f"{indent}ERROR: Cannot create output directory {output_path.parent}: {e}")
-            if entry is not None:
-                entry["status"] = "failed"
-                entry["errors"].append(f"Cannot create output directory: {e}")
-                report_entries.append(entry)
-            return "failed"
 
-    # Backup original before overwriting (only when not using --output-dir)
-    if getattr(args, "backup", False) and output_path == image_path:
-        _backup_original(image_path)
+def _rip_files_parallel(
+    pngs: list[Path],
+    args: argparse.Namespace,
+    jobs: int,
+    report_entries: Optional[list],
+    cache: Optional[dict] = None,
+    cache_root: Optional[Path] = None,
+    thumbnails: Optional[dict] = None,
+    journal: Optional[TextIO] = None,
+    resumed: Optional[dict] = None,
+) -> list[str]:
+    """Rip pngs across a process pool (--jobs N).
+
+    Files are handed out largest first so a single 4K image doesn't end up
+    as the last straggler. Output blocks, report entries and journal lines
+    are released in the original file order, so the console log and
+    _rip_report.json read exactly like a serial run. Files that are fresh
+    in the rip cache (or done in the resumed journal) are skipped in the
+    parent without being dispatched. Returns statuses in file order.
+    """
+    total = len(pngs)
+    want_report = report_entries is not None
 
-    # Step 6: Split into individual frames (if --split-frames N specified)
-    num_frames: Optional[int] = getattr(args, "split_frames", None)
-    if num_frames is not None:
-        frames = split_frames(img, num_frames)
-        if frames is not None:
-            stem = image_path.stem
-            parent = output_path.parent
-            for idx, frame in enumerate(frames, start=1):
-                frame_name = f"{stem}_frame_{idx:02d}.png"
-                frame_path = parent / frame_name
-                try:
-                    frame.save(frame_path, "PNG")
-                except (PermissionError, OSError) as e:
-                    print(f"{indent}ERROR: Failed to save frame {frame_path}: {e}")
-                    if entry is not None:
-                        entry["errors"].append(f"Failed to save frame {frame_name}: {e}")
-            print(f"{indent}SPLIT: {len(frames)} frames ({frames[0].size[0]}x{frames[0].size[1]} each)")
-            if entry is not None:
-                entry["split_frame_count"] = len(frames)
-        else:
-            if entry is not None:
-                entry["warnings"].append(f"split-frames {num_frames} skipped — validation failed")
+    results: list[str] = [""] * total
+    finished: dict[int, tuple[str, str, Optional[list], Optional[dict], Optional[dict]]] = {}
+    resumed_indices: set[int] = set()
+    next_index = 0
 
-    # Step 7: Save
-    try:
-        img.save(output_path, "PNG")
-    except (PermissionError, OSError) as e:
-        print(f"{indent}ERROR: Failed to save {output_path}: {e}")
-        if entry is not None:
-            entry["status"] = "failed"
-            entry["errors"].append(f"Failed to save: {e}")
-            report_entries.append(entry)
-        return "failed"
+    pending: list[int] = []
+    for i, png in enumerate(pngs):
+        prefix = f"  [{i+1}/{total}] {png.name}:"
+        done = resumed.get(_cache_input_key(png, args)) if resumed else None
+        if _journal_is_fresh(done, png, args, cache_root):
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                result = _resumed_skip(png, prefix, done, cache, args)
+            finished[i] = (result, buffer.getvalue(), None, None, None)
+            resumed_indices.add(i)
+        elif cache is not None and _cache_is_fresh(cache, png, args, cache_root):
+            entries: Optional[list] = [] if want_report else None
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                result = _cached_skip(png, prefix, entries)
+            finished[i] = (result, buffer.getvalue(), entries, None, None)
+        else:
+            pending.append(i)
+    pending.sort(key=lambda i: pngs[i].stat().st_size, reverse=True)
+
+    def release() -> None:
+        # Print every block that is now contiguous with what was printed
+        nonlocal next_index
+        while next_index in finished:
+            result, output, entries, record, thumbs = finished.pop(next_index)
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            results[next_index] = result
+            if next_index not in resumed_indices:
+                _finish_file(pngs[next_index], args, result, entries, record, report_entries, cache, journal)
+            if thumbnails is not None and thumbs:
+                thumbnails.update(thumbs)
+            next_index += 1
+
+    release()
+    if pending:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(
+                    _rip_file_worker, pngs[i], args,
+                    f"  [{i+1}/{total}] {pngs[i].name}:", want_report, cache_root,
+                    thumbnails is not None,
+                ): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                finished[futures[future]] = future.result()
+                release()
 
-    # Save preview with checkerboard
-    if save_preview and transparent_count > 0:
-        preview = _make_checkerboard(img.size[0], img.size[1])
-        preview.paste(img, (0, 0), img)
-        preview_path = output_path.with_name(output_path.stem + "_preview.png")
-        try:
-            preview.save(preview_path, "PNG")
-        except (PermissionError, OSError) as e:
-            print(f"{indent}ERROR: Failed to save preview {preview_path}: {e}")
+    return results
 
-    if entry is not None:
-        entry["status"] = "processed"
-        report_entries.append(entry)
 
-    return "processed"
+DEFAULT_IO_THREADS = 2
 
 
-def _make_checkerboard(w: int, h: int, tile_size: int = 8) -> Image.Image:
-    """Create a checkerboard pattern image for transparency preview.
+def _io_threads(args: argparse.Namespace) -> int:
+    """Reader and writer threads of the serial I/O pipeline (0 = off).
 
-    Uses numpy array broadcasting when available for fastest generation.
-    Falls back to PIL tile+paste which is still much faster than per-pixel.
+    --profile and --memory-budget bypass the pipeline: their per-file stage
+    timings and peak RSS would pick up the neighbouring files' decodes and
+    encodes.
     """
-    c1 = (200, 200, 200, 255)
-    c2 = (255, 255, 255, 255)
+    if getattr(args, "profile", None) or getattr(args, "memory_budget", None) is not None:
+        return 0
+    return max(0, getattr(args, "io_threads", DEFAULT_IO_THREADS))
 
-    if HAS_NUMPY:
-        # Numpy broadcasting: build entire checkerboard in one vectorized operation
-        y_idx = np.arange(h) // tile_size
-        x_idx = np.arange(w) // tile_size
-        # (h,1) + (1,w) broadcasts to (h,w) checkerboard mask
-        checker = (y_idx[:, np.newaxis] + x_idx[np.newaxis, :]) % 2
-        # Build RGBA array: where checker==0 -> c1, checker==1 -> c2
-        arr = np.empty((h, w, 4), dtype=np.uint8)
-        arr[checker == 0] = c1
-        arr[checker == 1] = c2
-        return Image.fromarray(arr, "RGBA")
 
-    # PIL fallback: create a single 2x2 tile and paste it across the image
-    tile_w = tile_size * 2
-    tile_h = tile_size * 2
-    tile = Image.new("RGBA", (tile_w, tile_h))
-    tile.paste(Image.new("RGBA", (tile_size, tile_size), c1), (0, 0))
-    tile.paste(Image.new("RGBA", (tile_size, tile_size), c2), (tile_size, 0))
-    tile.paste(Image.new("RGBA", (tile_size, tile_size), c2), (0, tile_size))
-    tile.paste(Image.new("RGBA", (tile_size, tile_size), c1), (tile_size, tile_size))
+def _stack_size(args: argparse.Namespace) -> int:
+    """Images per --stack (0 = off).
 
-    img = Image.new("RGBA", (w, h))
-    for y in range(0, h, tile_h):
-        for x in range(0, w, tile_w):
-            img.paste(tile, (x, y))
-    return img
+    Stacking needs numpy, and like the I/O pipeline it is off under
+    --profile and --memory-budget, which measure one image at a time.
+    """
+    if not HAS_NUMPY or getattr(args, "profile", None) or getattr(args, "memory_budget", None) is not None:
+        return 0
+    return max(0, getattr(args, "stack", None) or 0)
 
 
-def _print_banner(args: argparse.Namespace, file_count: int, dry_run: bool = False) -> None:
-    """Print config banner matching gemini_api_generate.py style."""
-    print("\n" + "=" * 70)
-    print("MOMI'S ADVENTURE — SPRITE RIPPER")
-    print("=" * 70)
-    print(f"\nTolerance: {args.tolerance}")
-    crop_on = getattr(args, "crop", True)
-    padding = getattr(args, "padding", 2)
-    print(f"Crop: {'on' if crop_on else 'off'} (padding={padding})")
-    fringe_passes = getattr(args, "fringe_passes", 2)
-    print(f"Fringe passes: {fringe_passes}")
-    print(f"Files: {file_count}")
-    output_dir = getattr(args, "output_dir", None)
-    if output_dir:
-        print(f"Output: {output_dir}")
-    else:
-        print(f"Output: overwrite in-place")
-    if args.scale:
-        print(f"Scale: {args.scale}px (longest edge)")
-    if getattr(args, "backup", False):
-        print("Backup: on")
-    split_frames_n = getattr(args, "split_frames", None)
-    if split_frames_n:
-        print(f"Split frames: {split_frames_n}")
-    if getattr(args, "report", False):
-        print("Report: _rip_report.json")
-    if dry_run:
-        print("\nMode: DRY RUN — no files will be modified")
-    print("=" * 70)
+def _image_size(path: Path) -> Optional[tuple[int, int]]:
+    """(width, height) from an image's header, or None if it can't be opened."""
+    try:
+        with Image.open(path) as src:
+            return src.size
+    except Exception:
+        return None
 
 
-def _write_report(
-    report_path: Path,
-    file_results: list[dict],
-    summary: dict,
-) -> None:
-    """Write _rip_report.json with per-file results and summary stats.
+def _stack_units(
+    pngs: list[Path], to_rip: list[int], stack_size: int
+) -> list[tuple[list[int], Optional[tuple[int, int]]]]:
+    """Group the indices to rip into --stack units of (indices, (w, h)): runs
+    of up to stack_size consecutive files of one size (files that can't be
+    opened stay alone, with size None)."""
+    units: list[tuple[list[int], Optional[tuple[int, int]]]] = []
+    for i in to_rip:
+        size = _image_size(pngs[i]) if stack_size > 1 else None
+        if size is not None and units and size == units[-1][1] and len(units[-1][0]) < stack_size:
+            units[-1][0].append(i)
+        else:
+            units.append(([i], size))
+    return units
 
-    Uses json.dump with indent=2 for human-readable output. Converts
-    Path objects to POSIX strings for JSON serialization.
+
+def _rip_files_pipelined(
+    pngs: list[Path],
+    args: argparse.Namespace,
+    io_threads: int,
+    report_entries: Optional[list],
+    cache: Optional[dict] = None,
+    cache_root: Optional[Path] = None,
+    thumbnails: Optional[dict] = None,
+    journal: Optional[TextIO] = None,
+    resumed: Optional[dict] = None,
+    stack_size: int = 0,
+) -> list[str]:
+    """Rip pngs one at a time with their file I/O overlapped (--io-threads N).
+
+    Reader threads decode up to N upcoming files while the main thread
+    rips the current one, and writer threads encode and save up to N
+    ripped files behind it. Both queues are bounded, so only a few images
+    are held at once. Each file's lines, report entries, cache record and
+    journal line are released in file order once its writes are done, so
+    the log and _rip_report.json read exactly like a plain serial run.
+    Returns statuses in file order.
+
+    With stack_size (--stack N), up to N consecutive same-sized files are
+    decoded into one (N, H, W, 4) array and have their background removed
+    and bounding boxes found together (_remove_background_stack()) before
+    they are ripped one by one as usual. With io_threads 0 every decode and
+    write is then done in turn on the main thread.
     """
-    report = {
-        "summary": summary,
-        "files": file_results,
-    }
-    try:
-        report_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(report_path, "w", encoding="utf-8") as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
-        print(f"  Report: {report_path}")
-    except (PermissionError, OSError) as e:
-        print(f"  ERROR: Failed to write report {report_path}: {e}")
+    total = len(pngs)
+    want_report = report_entries is not None
+    results: list[str] = []
+
+    # Skips are decided up front (like _rip_files_parallel) so only files
+    # that will really be ripped are prefetched
+    skips: dict[int, tuple[str, str, Optional[list], bool]] = {}
+    to_rip: list[int] = []
+    for i, png in enumerate(pngs):
+        prefix = f"  [{i+1}/{total}] {png.name}:"
+        done = resumed.get(_cache_input_key(png, args)) if resumed else None
+        buffer = io.StringIO()
+        if _journal_is_fresh(done, png, args, cache_root):
+            with contextlib.redirect_stdout(buffer):
+                result = _resumed_skip(png, prefix, done, cache, args)
+            skips[i] = (result, buffer.getvalue(), None, True)
+        elif cache is not None and _cache_is_fresh(cache, png, args, cache_root):
+            entries: Optional[list] = [] if want_report else None
+            with contextlib.redirect_stdout(buffer):
+                result = _cached_skip(png, prefix, entries)
+            skips[i] = (result, buffer.getvalue(), entries, False)
+        else:
+            to_rip.append(i)
+
+    # (index, status or Future of it, captured lines, report entries,
+    # outputs written, thumbnails, input fingerprint) in file order
+    in_flight: deque = deque()
+
+    def finish(item: tuple) -> None:
+        i, status, buffer, entries, outputs, thumbs, input_fp = item
+        png = pngs[i]
+        if isinstance(status, Future):
+            try:
+                status = status.result()
+            except PermissionError as e:
+                with contextlib.redirect_stdout(buffer):
+                    status = _permission_failed(png, f"  [{i+1}/{total}] {png.name}:", e, entries)
+        # Cached skips (no outputs list) keep their existing record
+        record = _cache_record(png, args, status, input_fp, outputs, cache_root) if outputs is not None else None
+        sys.stdout.write(buffer.getvalue())
+        results.append(status)
+        _finish_file(png, args, status, entries, record, report_entries, cache, journal)
+        if thumbnails is not None and thumbs:
+            thumbnails.update(thumbs)
+
+    with contextlib.ExitStack() as pools:
+        readers = writers = None
+        if io_threads:
+            readers = pools.enter_context(ThreadPoolExecutor(io_threads, thread_name_prefix="rip-read"))
+            writers = pools.enter_context(ThreadPoolExecutor(io_threads, thread_name_prefix="rip-write"))
+        upcoming = iter(_stack_units(pngs, to_rip, stack_size))
+        # (unit indices, its stack array or None, decode Futures)
+        decoding: deque = deque()
+        # index -> (decode Future, _remove_background_stack() result or None)
+        ready: dict[int, tuple[Future, Optional[dict]]] = {}
+
+        def decode(png: Path, out: "Optional[np.ndarray]" = None) -> Future:
+            if readers is not None:
+                return readers.submit(_decode_rgba, png, out)
+            future: Future = Future()
+            try:
+                future.set_result(_decode_rgba(png, out))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        def start(unit: list[int], size: Optional[tuple[int, int]]) -> tuple:
+            if len(unit) == 1:
+                return unit, None, [decode(pngs[unit[0]])]
+            w, h = size
+            stack = np.empty((len(unit), h, w, 4), dtype=np.uint8)
+            return unit, stack, [decode(pngs[j], stack[k]) for k, j in enumerate(unit)]
+
+        def prefetch() -> None:
+            while len(decoding) < io_threads:
+                unit = next(upcoming, None)
+                if unit is None:
+                    return
+                decoding.append(start(*unit))
+
+        def take(j: int) -> tuple[Future, Optional[dict]]:
+            if j not in ready:
+                prefetch()
+                unit, stack, futures = decoding.popleft() if decoding else start(*next(upcoming))
+                prefetch()
+                removals: list = [None] * len(unit)
+                if stack is not None:
+                    # Slots of files that failed to decode are ripped along
+                    # with the rest; those files still fail on their own
+                    wait(futures)
+                    removals = _remove_background_stack(stack, _rip_config(args))
+                ready.update(zip(unit, zip(futures, removals)))
+            return ready.pop(j)
+
+        for i, png in enumerate(pngs):
+            if i in skips:
+                result, output, entries, was_resumed = skips[i]
+                if was_resumed:
+                    # Its journal line and report entries are already on disk
+                    while in_flight:
+                        finish(in_flight.popleft())
+                    sys.stdout.write(output)
+                    results.append(result)
+                else:
+                    in_flight.append((i, result, io.StringIO(output), entries, None, None, None))
+            else:
+                decoded, removal = take(i)
+                entries = [] if want_report else None
+                outputs: list[Path] = []
+                thumbs: Optional[dict] = {} if thumbnails is not None else None
+                input_fp = _fingerprint(png) if cache_root is not None else None
+                buffer = io.StringIO()
+                with contextlib.redirect_stdout(buffer):
+                    result = _rip_file(
+                        png, args, f"  [{i+1}/{total}] {png.name}:", entries, outputs, thumbs,
+                        decoded=decoded, write_behind=writers, removal=removal,
+                        before_write=_started_hook(journal, png, args, input_fp, cache_root),
+                    )
+                del decoded
+                in_flight.append((i, result, buffer, entries, outputs, thumbs, input_fp))
+            # Back-pressure: wait on the oldest write once N are queued
+            while in_flight and (len(in_flight) > io_threads
+                                 or not isinstance(in_flight[0][1], Future)
+                                 or in_flight[0][1].done()):
+                finish(in_flight.popleft())
+        while in_flight:
+            finish(in_flight.popleft())
+
+    return results
+
+
+def _is_rip_input(path: Path) -> bool:
+    """False for the ripper's own outputs: previews, split frames, backup originals and atlases."""
+    return ("_preview" not in path.name
+            and "_frame_" not in path.name
+            and "_originals" not in path.parts
+            and ATLAS_DIRNAME not in path.parts)
+
+
+def _discover_pngs(dir_path: Path) -> list[Path]:
+    """Every PNG under dir_path (recursively) that is a rip input, sorted."""
+    return [p for p in sorted(dir_path.rglob("*.png")) if _is_rip_input(p)]
+
+
+def _rip_files(
+    pngs: list[Path],
+    args: argparse.Namespace,
+    report_entries: Optional[list],
+    cache: Optional[dict] = None,
+    cache_root: Optional[Path] = None,
+    thumbnails: Optional[dict] = None,
+    journal: Optional[TextIO] = None,
+    resumed: Optional[dict] = None,
+) -> list[str]:
+    """Rip pngs serially (I/O overlapped on --io-threads threads, same-sized
+    files in --stack groups) or on --jobs worker processes; returns statuses
+    in file order.
+
+    Files that are fresh in the rip cache are skipped, and cache records of
+    ripped files are added to cache. With a journal, each finished file is
+    appended to it, report entries included (they then don't go to
+    report_entries); files done in the resumed journal are skipped.
+    """
+    jobs = _resolve_jobs(args, len(pngs))
+    if jobs > 1:
+        return _rip_files_parallel(
+            pngs, args, jobs, report_entries,
+            cache=cache, cache_root=cache_root, thumbnails=thumbnails,
+            journal=journal, resumed=resumed,
+        )
+    io_threads = _io_threads(args)
+    stack_size = _stack_size(args)
+    if (io_threads > 0 or stack_size > 1) and len(pngs) > 1:
+        return _rip_files_pipelined(
+            pngs, args, io_threads, report_entries,
+            cache=cache, cache_root=cache_root, thumbnails=thumbnails,
+            journal=journal, resumed=resumed, stack_size=stack_size,
+        )
+    results = []
+    for i, png in enumerate(pngs):
+        prefix = f"  [{i+1}/{len(pngs)}] {png.name}:"
+        done = resumed.get(_cache_input_key(png, args)) if resumed else None
+        if _journal_is_fresh(done, png, args, cache_root):
+            results.append(_resumed_skip(png, prefix, done, cache, args))
+            continue
+        entries: Optional[list] = [] if report_entries is not None else None
+        record = None
+        if cache is not None and _cache_is_fresh(cache, png, args, cache_root):
+            result = _cached_skip(png, prefix, entries)
+        else:
+            result, record = _rip_file_tracked(
+                png, args, prefix, entries, cache_root, thumbnails, journal,
+            )
+        _finish_file(png, args, result, entries, record, report_entries, cache, journal)
+        results.append(result)
+    return results
 
 
 def process_directory(dir_path: Path, args: argparse.Namespace) -> None:
     """Process all PNGs in a directory (recursively)."""
-    pngs = sorted(dir_path.rglob("*.png"))
-    # Skip preview files, frame files from previous splits, and backup originals
-    pngs = [p for p in pngs
-            if "_preview" not in p.name
-            and "_frame_" not in p.name
-            and "_originals" not in p.parts]
+    pngs = _discover_pngs(dir_path)
 
     if not pngs:
         print(f"No PNG files found in {dir_path}")
@@ -919,15 +4863,46 @@ def process_directory(dir_path: Path, args: argparse.Namespace) -> None:
         skipped = 0
         would_process = 0
         errors = 0
-        for i, png in enumerate(pngs):
-            result = dry_run_file(png, args, report_entries=report_entries)
-            print(f"  [{i+1}/{len(pngs)}] {png.name}: {result}")
-            if "SKIP" in result:
-                skipped += 1
-            elif "ERROR" in result:
-                errors += 1
-            else:
-                would_process += 1
+
+        # Probes live in the rip cache manifest, checked against size/mtime
+        cache_root = None if getattr(args, "no_cache", False) else _cache_root(args)
+        cache = _load_rip_cache(cache_root) if cache_root is not None else None
+        probes: Optional[dict] = cache.setdefault("probes", {}) if cache is not None else None
+
+        jobs = _resolve_jobs(args, len(pngs))
+        if jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=jobs)
+            want_report = report_entries is not None
+            results = pool.map(
+                _dry_run_worker, pngs, [args] * len(pngs), [want_report] * len(pngs),
+                [probes.get(_cache_input_key(png, args)) if probes is not None else None for png in pngs],
+                chunksize=8,
+            )
+        else:
+            pool = None
+            results = (
+                (dry_run_file(png, args, report_entries=report_entries, probes=probes), None, None)
+                for png in pngs
+            )
+
+        try:
+            for i, (png, (result, entries, probe)) in enumerate(zip(pngs, results)):
+                if entries:
+                    report_entries.extend(entries)
+                if probes is not None and probe is not None:
+                    probes[_cache_input_key(png, args)] = probe
+                print(f"  [{i+1}/{len(pngs)}] {png.name}: {result}")
+                if "SKIP" in result:
+                    skipped += 1
+                elif "ERROR" in result:
+                    errors += 1
+                else:
+                    would_process += 1
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if cache is not None:
+                _save_rip_cache(cache_root, cache)
 
         elapsed = time.time() - start_time
         print("\n" + "=" * 70)
@@ -958,49 +4933,68 @@ def process_directory(dir_path: Path, args: argparse.Namespace) -> None:
             _write_report(report_path, report_entries, summary)
         return
 
-    processed = 0
-    skipped = 0
-    failed = 0
-
-    for i, png in enumerate(pngs):
-        # Auto-detect target size from parent folder name
-        folder_name = png.parent.name
-        auto_size = args.scale or TARGET_SIZES.get(folder_name)
-
-        # Create per-file args with auto-detected scale
-        file_args = argparse.Namespace(**vars(args))
-        file_args.scale = auto_size
-
-        prefix = f"  [{i+1}/{len(pngs)}] {png.name}:"
+    # Records are built for the journal even with --no-cache
+    cache_root = _cache_root(args)
+    cache = None if getattr(args, "no_cache", False) else _load_rip_cache(cache_root)
+
+    journal_path = cache_root / JOURNAL_FILENAME
+    resumed: Optional[dict] = None
+    if getattr(args, "resume", False):
+        resumed = _load_journal(journal_path)
+        print(f"  Resuming from {JOURNAL_FILENAME}: {len(resumed)} file(s) journaled")
+    journal = _open_journal(journal_path, append=resumed is not None)
+    if resumed:
+        recovered = _recover_started_writes(resumed, journal, cache, args, cache_root)
+        if recovered:
+            print(f"  Recovered {recovered} file(s) written in place but not journaled before the interruption")
+
+    # Contact-sheet thumbnails of freshly ripped sprites, keyed by output path
+    want_sheets = not args.no_preview and getattr(args, "preview", "file") == "sheet"
+    thumbnails: Optional[dict] = {} if want_sheets else None
+
+    # --skip-duplicates: near-duplicates of a file in a live category folder
+    # (or of an earlier file) are left out of the rip
+    duplicates: dict[Path, tuple[Path, int]] = {}
+    max_distance: Optional[int] = getattr(args, "skip_duplicates", None)
+    if max_distance is not None:
+        hashes = update_phash_index(dir_path, pngs, _resolve_jobs(args, len(pngs)))
+        duplicates = find_duplicates(pngs, hashes, max_distance, dir_path)
+        print(f"  {len(duplicates)} near-duplicate(s) within {max_distance} bits will be skipped")
 
-        try:
-            result = rip_sprite(
-                png, file_args, progress_prefix=prefix,
-                report_entries=report_entries,
-            )
-            if result == "processed":
-                processed += 1
-            elif result == "failed":
-                failed += 1
-            else:
-                skipped += 1
-        except PermissionError as e:
-            print(f"{prefix} ERROR — Permission denied: {e}")
-            failed += 1
-            if report_entries is not None:
-                report_entries.append({
-                    "input_path": str(png),
-                    "output_path": None,
-                    "status": "failed",
-                    "background_color": None,
-                    "confidence": None,
-                    "pixels_removed": None,
-                    "removal_percentage": None,
-                    "crop_dimensions": None,
-                    "split_frame_count": None,
-                    "warnings": [],
-                    "errors": [f"Permission denied: {e}"],
-                })
+    try:
+        for png in pngs:
+            if png in duplicates:
+                entries: Optional[list] = [] if report_entries is not None else None
+                original, distance = duplicates[png]
+                _duplicate_skip(png, original, distance, dir_path, entries)
+                _finish_file(png, args, "duplicate", entries, None, report_entries, cache, journal)
+        ripped = iter(_rip_files(
+            [png for png in pngs if png not in duplicates],
+            args, report_entries, cache, cache_root, thumbnails, journal, resumed,
+        ))
+        results = ["duplicate" if png in duplicates else next(ripped) for png in pngs]
+    finally:
+        # Save progress even when the run is interrupted
+        if journal is not None:
+            journal.close()
+        if cache is not None:
+            _save_rip_cache(cache_root, cache)
+
+    processed = results.count("processed")
+    failed = results.count("failed")
+    skipped = len(results) - processed - failed
+    cached = results.count("cached")
+    duplicate_count = results.count("duplicate")
+
+    atlases: Optional[list] = None
+    if getattr(args, "atlas", False):
+        print()
+        atlases = _pack_directory_atlases(pngs, results, args)
+
+    sheets: Optional[list] = None
+    if want_sheets:
+        print()
+        sheets = _write_directory_sheets(pngs, results, args, thumbnails)
 
     elapsed = time.time() - start_time
 
@@ -1009,7 +5003,13 @@ def process_directory(dir_path: Path, args: argparse.Namespace) -> None:
     print("=" * 70)
     print(f"  Processed: {processed}")
     print(f"  Skipped:   {skipped}")
+    if cache is not None:
+        print(f"  Cached:    {cached}")
+    if max_distance is not None:
+        print(f"  Duplicate: {duplicate_count}")
     print(f"  Failed:    {failed}")
+    if atlases is not None:
+        print(f"  Atlases:   {sum(len(a['pages']) for a in atlases)} page(s) in {len(atlases)} folder(s)")
     print(f"  Total:     {len(pngs)}")
     print(f"  Elapsed:   {elapsed:.1f}s")
     print("=" * 70)
@@ -1027,7 +5027,277 @@ def process_directory(dir_path: Path, args: argparse.Namespace) -> None:
             "failed": failed,
             "elapsed_seconds": round(elapsed, 2),
         }
-        _write_report(report_path, report_entries, summary)
+        if cache is not None:
+            summary["cached"] = cached
+        if max_distance is not None:
+            summary["duplicates"] = duplicate_count
+        if atlases is not None:
+            summary["atlases"] = atlases
+        if sheets is not None:
+            summary["preview_sheets"] = sheets
+        if journal is not None:
+            keys = {_cache_input_key(png, args) for png in pngs}
+            _write_report(report_path, lambda: _journal_entries(journal_path, keys), summary)
+        else:
+            _write_report(report_path, report_entries, summary)
+
+
+# --watch: rip sprites while the generators are still writing them.
+# Linux uses inotify (through ctypes, no extra dependency); elsewhere, or if
+# inotify is unavailable, the tree is polled.
+WATCH_POLL_SECONDS = 1.0
+WATCH_SETTLE_SECONDS = 0.5  # a file must be quiet this long before it's ripped
+INOTIFY_MODIFY = 0x002
+INOTIFY_CLOSE_WRITE = 0x008
+INOTIFY_MOVED_TO = 0x080
+INOTIFY_CREATE = 0x100
+INOTIFY_OVERFLOW = 0x4000
+INOTIFY_IGNORED = 0x8000
+INOTIFY_ISDIR = 0x40000000
+INOTIFY_MASK = INOTIFY_MODIFY | INOTIFY_CLOSE_WRITE | INOTIFY_MOVED_TO | INOTIFY_CREATE
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (then len bytes of name)
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+
+@functools.lru_cache(maxsize=None)
+def _libc() -> Optional["ctypes.CDLL"]:
+    """libc with inotify support, or None off Linux or when it can't be loaded."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def _inotify_init() -> Optional[int]:
+    """A non-blocking inotify file descriptor, or None to fall back to polling."""
+    libc = _libc()
+    if libc is None:
+        return None
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    return fd if fd >= 0 else None
+
+
+def _inotify_watch_tree(fd: int, root: Path, watches: dict[int, Path]) -> list[Path]:
+    """Watch root and every directory below it, except backups and atlases.
+
+    Returns the PNGs already there: a new directory can fill up before its
+    watch exists.
+    """
+    libc = _libc()
+    found: list[Path] = []
+    for current, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in ("_originals", ATLAS_DIRNAME)]
+        wd = libc.inotify_add_watch(fd, os.fsencode(current), INOTIFY_MASK)
+        if wd >= 0:
+            watches[wd] = Path(current)
+        found.extend(Path(current) / name for name in files if name.endswith(".png"))
+    return found
+
+
+def _inotify_changes(fd: int, watches: dict[int, Path], timeout: float) -> Optional[list[Path]]:
+    """Paths written since the last call, waiting up to timeout for the first event.
+
+    Returns None when the kernel queue overflowed and events were lost.
+    """
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if not ready:
+        return []
+    changed: list[Path] = []
+    while True:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            start = offset + INOTIFY_EVENT.size
+            name = data[start:start + length].rstrip(b"\0")
+            offset = start + length
+            if mask & INOTIFY_OVERFLOW:
+                return None
+            if mask & INOTIFY_IGNORED:
+                watches.pop(wd, None)
+                continue
+            folder = watches.get(wd)
+            if folder is None or not name:
+                continue
+            path = folder / os.fsdecode(name)
+            if not mask & INOTIFY_ISDIR:
+                changed.append(path)
+            elif mask & (INOTIFY_CREATE | INOTIFY_MOVED_TO) and path.name not in ("_originals", ATLAS_DIRNAME):
+                changed.extend(_inotify_watch_tree(fd, path, watches))
+
+
+def _stat_key(path: Path) -> Optional[tuple[int, int]]:
+    """(size, mtime_ns) of path, or None if it's gone."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _image_complete(path: Path) -> bool:
+    """True once an image file ends with its format's trailer.
+
+    PNGs need the IEND chunk and JPEGs (which generators sometimes save
+    under .png) the EOI marker; other data only has to be quiet.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(PNG_SIGNATURE))
+            if f.seek(0, os.SEEK_END) < len(PNG_IEND):
+                return False
+            f.seek(-len(PNG_IEND), os.SEEK_END)
+            tail = f.read()
+    except OSError:
+        return False
+    if head == PNG_SIGNATURE:
+        return tail == PNG_IEND
+    if head[:2] == b"\xff\xd8":
+        return tail[-2:] == b"\xff\xd9"
+    return True
+
+
+def _folder_inputs(folders: set[Path]) -> list[Path]:
+    """Rip inputs directly inside each of folders, sorted."""
+    return sorted(p for folder in folders for p in folder.glob("*.png") if _is_rip_input(p))
+
+
+def watch_directory(dir_path: Path, args: argparse.Namespace) -> None:
+    """
+    --watch: keep ripping PNGs under dir_path as generators write them.
+
+    Starts with a normal directory run to catch up, then waits for new or
+    changed files. A file is ripped once it has been quiet for
+    WATCH_SETTLE_SECONDS and ends with its image trailer, so half-written
+    files are never read. Ready files are ripped as a batch with the usual
+    settings (--jobs, rip cache), and then each affected folder's contact
+    sheet and atlas are rebuilt. Files the watcher itself wrote are ignored.
+    Runs until Ctrl+C; with --report, _rip_report.json is written on exit.
+    """
+    process_directory(dir_path, args)
+
+    use_cache = not getattr(args, "no_cache", False)
+    cache_root = _cache_root(args) if use_cache else None
+    is_report = getattr(args, "report", False)
+    report_entries: Optional[list] = [] if is_report else None
+    want_sheets = not args.no_preview and getattr(args, "preview", "file") == "sheet"
+
+    fd = _inotify_init()
+    watches: dict[int, Path] = {}
+    snapshot: dict[Path, Optional[tuple[int, int]]] = {}
+    if fd is not None:
+        _inotify_watch_tree(fd, dir_path, watches)
+    else:
+        snapshot = {png: _stat_key(png) for png in _discover_pngs(dir_path)}
+    backend = "inotify" if fd is not None else f"polling every {WATCH_POLL_SECONDS:g}s"
+    print(f"\nWATCH {dir_path} ({backend}) — Ctrl+C to stop")
+
+    pending: dict[Path, float] = {}  # path → time of its last change
+    written: dict[Path, Optional[tuple[int, int]]] = {}  # our own outputs → (size, mtime_ns)
+    totals: Counter = Counter()
+    start_time = time.time()
+    try:
+        while True:
+            timeout = WATCH_SETTLE_SECONDS if pending else WATCH_POLL_SECONDS
+            if fd is not None:
+                changed = _inotify_changes(fd, watches, timeout)
+                if changed is None:
+                    print("  WARN: inotify queue overflowed — rescanning")
+                    changed = _discover_pngs(dir_path)
+            else:
+                time.sleep(timeout)
+                current = {png: _stat_key(png) for png in _discover_pngs(dir_path)}
+                changed = [png for png, key in current.items() if snapshot.get(png) != key]
+                snapshot = current
+
+            now = time.monotonic()
+            for path in changed:
+                if path.suffix == ".png" and _is_rip_input(path) and written.get(path) != _stat_key(path):
+                    pending[path] = now
+
+            batch: list[Path] = []
+            for path in sorted(pending):
+                if now - pending[path] < WATCH_SETTLE_SECONDS:
+                    continue
+                if not path.is_file():
+                    del pending[path]
+                elif _image_complete(path):
+                    del pending[path]
+                    batch.append(path)
+                else:
+                    pending[path] = now  # still being written
+            if not batch:
+                continue
+
+            print(f"\n[{time.strftime('%H:%M:%S')}] {len(batch)} new or changed file(s)")
+            cache = _load_rip_cache(cache_root) if cache_root is not None else None
+            thumbnails: Optional[dict] = {} if want_sheets else None
+            try:
+                results = _rip_files(batch, args, report_entries, cache, cache_root, thumbnails)
+            finally:
+                if cache is not None:
+                    _save_rip_cache(cache_root, cache)
+            totals.update(results)
+            for png in batch:
+                output_path = _resolve_output_path(png, args)
+                written[output_path] = _stat_key(output_path)
+
+            # Rebuild sheets/atlases of the touched folders from all their
+            # sprites, leaving out files that are still waiting to be ripped
+            folders = [png for png in _folder_inputs({png.parent for png in batch}) if png not in pending]
+            ripped = dict(zip(batch, results))
+            folder_results = [ripped.get(png, "cached") for png in folders]
+            if getattr(args, "atlas", False):
+                _pack_directory_atlases(folders, folder_results, args)
+            if want_sheets:
+                _write_directory_sheets(folders, folder_results, args, thumbnails)
+    except KeyboardInterrupt:
+        print("\nWatch stopped.")
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+    elapsed = time.time() - start_time
+    processed = totals["processed"]
+    failed = totals["failed"]
+    print("=" * 70)
+    print(f"  Processed: {processed}")
+    print(f"  Skipped:   {sum(totals.values()) - processed - failed}")
+    print(f"  Failed:    {failed}")
+    print(f"  Watched:   {elapsed:.0f}s")
+    print("=" * 70)
+
+    if is_report and report_entries is not None:
+        output_dir = getattr(args, "output_dir", None)
+        report_root = Path(output_dir) if output_dir else dir_path
+        summary = {
+            "mode": "watch",
+            "total": sum(totals.values()),
+            "processed": processed,
+            "skipped": sum(totals.values()) - processed - failed,
+            "failed": failed,
+            "elapsed_seconds": round(elapsed, 2),
+        }
+        _write_report(report_root / "_rip_report.json", report_entries, summary)
+
+
+def _split_frames_arg(value: str) -> "int | str":
+    """argparse type for --split-frames: a frame count or 'auto'."""
+    if value == SPLIT_AUTO:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a frame count or '{SPLIT_AUTO}', got {value!r}")
 
 
 def main() -> None:
@@ -1040,13 +5310,37 @@ Examples:
   python art/rip_sprites.py path/to/image.png        Process a single file
   python art/rip_sprites.py --tolerance 30           Adjust color match tolerance
   python art/rip_sprites.py --scale 64               Downscale to 64px (longest edge)
+  python art/rip_sprites.py --pixel-grid             Downscale to the art's own pixel grid (exact cells)
   python art/rip_sprites.py --no-preview             Skip checkerboard preview
+  python art/rip_sprites.py --preview file           One _preview.png per sprite instead of contact sheets
   python art/rip_sprites.py --crop --split-frames 8  Crop and split into 8 frames
+  python art/rip_sprites.py --split-frames auto      Split at transparent gutters (uneven poses)
+  python art/rip_sprites.py --palette character      Indexed PNGs, character key colors pinned
+  python art/rip_sprites.py --palette art/palettes/  Snap to <character>.hex / <category>.hex palettes
+  python art/rip_sprites.py --encode-profile fast    Quick PNG encodes while iterating on art
   python art/rip_sprites.py --batch 1                Process batch_1/ only
   python art/rip_sprites.py --output-dir out/        Write to separate directory
   python art/rip_sprites.py --backup                 Save originals before overwriting
   python art/rip_sprites.py --dry-run                Preview without making changes
   python art/rip_sprites.py --report                 Generate _rip_report.json
+  python art/rip_sprites.py --profile                Report where the time goes, per stage and file
+  python art/rip_sprites.py --flood-engine bfs       Use the legacy per-pixel flood fill
+  python art/rip_sprites.py --jobs 8                 Rip on 8 worker processes
+  python art/rip_sprites.py --io-threads 0           Read, rip and write strictly one file at a time
+  python art/rip_sprites.py --batch 3 --stack 16     Rip batch_3/'s same-sized sprites 16 at a time
+  python art/rip_sprites.py --tile-threads 8         Rip each 4K boss sheet in row tiles on 8 threads
+  python art/rip_sprites.py --dry-run --bg-detect histogram --bg-clusters 3
+                                                     List the top background shades per file
+  python art/rip_sprites.py --no-cache               Re-rip everything, ignoring .rip_cache.json
+  python art/rip_sprites.py --resume                 Pick up a crashed or interrupted run where it stopped
+  python art/rip_sprites.py --skip-duplicates        Don't rip near-identical copies (batch_N/, archive/, ...)
+  python art/rip_sprites.py --find-duplicates 24     Just list near-duplicate groups (_rip_duplicates.json)
+  python art/rip_sprites.py --tolerance-sweep 20:80:5 path/to/image.png
+                                                     Compare 13 tolerances in one grid, one decode per image
+  python art/rip_sprites.py --watch --jobs 4         Rip sprites while a generation session is running
+  python art/rip_sprites.py --memory-budget 256      Keep each 4K image under 256 MB peak RSS (checked)
+  python art/rip_sprites.py --split-frames 4 --atlas Pack each folder's frames into atlas pages
+                                                     + a SpriteFrames .tres (in <folder>/_atlas/)
         """,
     )
 
@@ -1057,8 +5351,14 @@ Examples:
                         help=f"Color match tolerance for background detection (default: {DEFAULT_TOLERANCE})")
     parser.add_argument("--scale", "-s", type=int, default=None, metavar="N",
                         help="Downscale to N pixels on the longest edge (default: auto from folder name)")
+    parser.add_argument("--pixel-grid", action="store_true",
+                        help="Detect the art's logical pixel grid (cell size + phase) and keep one pixel "
+                             "per cell; --scale then only shrinks sprites still larger than it (needs numpy)")
     parser.add_argument("--no-preview", action="store_true",
                         help="Skip generating checkerboard preview images")
+    parser.add_argument("--preview", choices=PREVIEW_MODES, default="sheet",
+                        help=f"Previews as one labelled contact sheet per folder ({PREVIEW_SHEET_NAME}_NN.png, "
+                             "default) or a _preview.png per sprite (file). Single-file runs always use file")
 
     # Additional processing flags
     parser.add_argument("--crop", action="store_true", default=True,
@@ -1067,8 +5367,9 @@ Examples:
                         help="Disable crop-to-content")
     parser.add_argument("--padding", type=int, default=2, metavar="N",
                         help="Padding pixels around content when cropping (default: 2)")
-    parser.add_argument("--split-frames", type=int, default=None, metavar="N",
-                        help="Split horizontal sprite sheet into N individual frame PNGs")
+    parser.add_argument("--split-frames", type=_split_frames_arg, default=None, metavar="N|auto",
+                        help="Split horizontal sprite sheet into N individual frame PNGs, or 'auto' to "
+                             "find frames by their transparent gutters (tight crops; offsets in the report)")
     parser.add_argument("--output-dir", type=str, default=None, metavar="PATH",
                         help="Write processed sprites to a separate directory instead of overwriting")
     parser.add_argument("--backup", action="store_true",
@@ -1081,12 +5382,131 @@ Examples:
                         help="Number of fringe-cleaning passes (default: 2)")
     parser.add_argument("--report", action="store_true",
                         help="Generate _rip_report.json with per-file processing results")
+    parser.add_argument("--profile", nargs="?", const="time", choices=PROFILE_MODES, default=None,
+                        help="Record per-stage timings in _rip_report.json (implies --report), with "
+                             "p50/p95/max per stage and the slowest files in the summary. "
+                             "'--profile memory' also records tracemalloc allocation peaks (slower)")
+    parser.add_argument("--flood-engine", choices=FLOOD_ENGINES, default="vector",
+                        help="Flood-fill implementation: vector (connected components, default) "
+                             "or bfs (legacy per-pixel queue, for timing comparisons)")
+    parser.add_argument("--bg-detect", choices=BG_DETECT_METHODS, default="sample",
+                        help="Background detection: sample (corner/edge samples, default) or "
+                             "histogram (quantized border-band histogram, robust to noise; needs numpy)")
+    parser.add_argument("--bg-clusters", type=int, default=1, metavar="K",
+                        help="With --bg-detect histogram, report the top K background clusters "
+                             "(for gradient backgrounds; default: 1)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="Rip files on N worker processes, largest first (0 = one per CPU, default: 1)")
+    parser.add_argument("--io-threads", type=int, default=DEFAULT_IO_THREADS, metavar="N",
+                        help="With --jobs 1, decode the next files and save finished ones on N reader "
+                             f"and N writer threads while ripping (0 = off, default: {DEFAULT_IO_THREADS})")
+    parser.add_argument("--stack", type=int, nargs="?", const=DEFAULT_STACK_SIZE, default=None, metavar="N",
+                        help="With --jobs 1, remove the background of up to N consecutive same-sized "
+                             f"images as one array (default N: {DEFAULT_STACK_SIZE}; needs numpy; "
+                             "off with --profile or --memory-budget)")
+    parser.add_argument("--tile-threads", type=int, default=1, metavar="N",
+                        help=f"Rip each image taller than {DEFAULT_BAND_ROWS} rows in horizontal tiles on N "
+                             "threads, for single huge sheets (0 = one per CPU, default: 1 = off; output is "
+                             "identical; not used for --stack groups or with --memory-budget)")
+    parser.add_argument("--palette", default=None, metavar="auto|character|PATH",
+                        help="Save indexed (paletted) PNGs: auto (median cut per sprite), character "
+                             "(pin the key colors of momi/cinnamon/philo sprites), a .hex/.gpl/.png palette "
+                             "file, or a directory of <character>.hex / <category>.hex palettes")
+    parser.add_argument("--palette-colors", type=int, default=DEFAULT_PALETTE_COLORS, metavar="N",
+                        help=f"Colors per derived palette, 2-255 (default: {DEFAULT_PALETTE_COLORS})")
+    parser.add_argument("--encode-profile", choices=list(ENCODE_PROFILES), default=None,
+                        help="How outputs are encoded: fast (zlib level 1, for iteration), release "
+                             "(optimized PNG), webp-lossless (.webp next to the original; Godot imports "
+                             "it natively). Default: Pillow's standard PNG settings")
+    parser.add_argument("--atlas", action="store_true",
+                        help=f"After a directory run, pack each folder's ripped frames into power-of-two "
+                             f"atlas pages plus a Godot SpriteFrames .tres in <folder>/{ATLAS_DIRNAME}/")
+    parser.add_argument("--atlas-size", type=int, default=2048, metavar="N",
+                        help="Maximum atlas page size in pixels, a power of two (default: 2048)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and rip new or changed PNGs as soon as they are completely "
+                             "written (inotify on Linux, polling elsewhere). Ctrl+C to stop")
+    parser.add_argument("--memory-budget", type=float, default=None, metavar="MB",
+                        help="Peak RSS budget per image in MB: full-size work is banded to fit it, and "
+                             "each image's measured peak is printed (and reported) with a warning when over")
+    parser.add_argument("--skip-duplicates", nargs="?", type=int, const=DEFAULT_DUPLICATE_DISTANCE,
+                        default=None, metavar="BITS",
+                        help="Don't rip near-duplicates of another input: perceptual hashes (kept in "
+                             f"{PHASH_INDEX_FILENAME}) within BITS of 256 (default: {DEFAULT_DUPLICATE_DISTANCE}). "
+                             f"Copies in {BATCH_DIR_PREFIX}N/, then {ARCHIVE_DIRNAME}/, yield to category folders")
+    parser.add_argument("--find-duplicates", nargs="?", type=int, const=DEFAULT_DUPLICATE_DISTANCE,
+                        default=None, metavar="BITS",
+                        help="Only index the tree and list near-duplicate groups (writes _rip_duplicates.json)")
+    parser.add_argument("--tolerance-sweep", type=_tolerance_sweep_arg, default=None, metavar="START:STOP[:STEP]",
+                        help="Don't rip: try every tolerance from START to STOP (step "
+                             f"{DEFAULT_SWEEP_STEP}) from one distance map per image, writing a "
+                             f"<name>{SWEEP_PREVIEW_SUFFIX}.png grid and {SWEEP_REPORT_FILENAME}")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue an interrupted directory run: skip files its {JOURNAL_FILENAME} "
+                             "records as done with the same settings (and unchanged since)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Don't skip unchanged files or reuse dry-run probes via {RIP_CACHE_FILENAME} "
+                             "(and don't update it)")
 
     args = parser.parse_args()
 
     # Resolve crop flag (--no-crop overrides --crop default)
     if args.no_crop:
         args.crop = False
+    if args.profile:
+        args.report = True
+
+    if args.watch and (args.dry_run or (args.path and Path(args.path).is_file())):
+        print("ERROR: --watch runs on a directory and can't be combined with --dry-run or a single file")
+        sys.exit(1)
+    for name in ("skip_duplicates", "find_duplicates"):
+        bits = getattr(args, name)
+        if bits is not None and not 0 <= bits < PHASH_GRID * PHASH_GRID:
+            print(f"ERROR: --{name.replace('_', '-')} must be between 0 and {PHASH_GRID * PHASH_GRID - 1} bits (got {bits})")
+            sys.exit(1)
+    if args.resume and (args.dry_run or (args.path and Path(args.path).is_file())):
+        print("ERROR: --resume continues a directory run and can't be combined with --dry-run or a single file")
+        sys.exit(1)
+
+    if args.tolerance_sweep is not None and (args.dry_run or args.watch or args.resume):
+        print("ERROR: --tolerance-sweep writes no sprites and can't be combined with --dry-run, --watch or --resume")
+        sys.exit(1)
+
+    if args.io_threads < 0:
+        print(f"ERROR: --io-threads can't be negative (got {args.io_threads})")
+        sys.exit(1)
+
+    if args.tile_threads < 0:
+        print(f"ERROR: --tile-threads can't be negative (got {args.tile_threads})")
+        sys.exit(1)
+
+    if args.stack is not None and args.stack < 1:
+        print(f"ERROR: --stack needs at least 1 image (got {args.stack})")
+        sys.exit(1)
+
+    if args.memory_budget is not None and args.memory_budget <= 0:
+        print(f"ERROR: --memory-budget must be positive (got {args.memory_budget:g})")
+        sys.exit(1)
+
+    if args.atlas_size < 1 or args.atlas_size & (args.atlas_size - 1):
+        print(f"ERROR: --atlas-size must be a power of two (got {args.atlas_size})")
+        sys.exit(1)
+
+    if not 2 <= args.palette_colors <= 255:
+        print(f"ERROR: --palette-colors must be between 2 and 255 (got {args.palette_colors})")
+        sys.exit(1)
+    if args.palette and args.palette not in PALETTE_MODES:
+        palette_path = Path(args.palette)
+        if not palette_path.exists():
+            print(f"ERROR: Palette not found: {palette_path}")
+            print(f"  Use {' or '.join(PALETTE_MODES)}, a .hex/.gpl/.png file, or a directory of them")
+            sys.exit(1)
+        if palette_path.is_file():
+            try:
+                load_palette_file(palette_path)
+            except (OSError, ValueError) as e:
+                print(f"ERROR: Cannot load palette: {e}")
+                sys.exit(1)
 
     # Resolve processing directory (--batch overrides default)
     if args.batch is not None:
@@ -1109,7 +5529,12 @@ Examples:
 
     if args.path and Path(args.path).is_file():
         image_path = Path(args.path)
+        # Contact sheets are per folder; a single file gets its own preview
+        args.preview = "file"
         args._processing_root = image_path.parent
+        if args.tolerance_sweep is not None:
+            tolerance_sweep_report([image_path], args)
+            return
         is_report = getattr(args, "report", False)
         report_entries: Optional[list] = [] if is_report else None
 
@@ -1141,7 +5566,14 @@ Examples:
         # Default: process target directory recursively
         if target_dir.is_dir():
             args._processing_root = target_dir
-            process_directory(target_dir, args)
+            if args.find_duplicates is not None:
+                find_duplicates_report(target_dir, args)
+            elif args.tolerance_sweep is not None:
+                tolerance_sweep_report(_discover_pngs(target_dir), args)
+            elif args.watch:
+                watch_directory(target_dir, args)
+            else:
+                process_directory(target_dir, args)
         else:
             print(f"No generated/ directory found at {target_dir}")
             print("Run: python art/rip_sprites.py --help")